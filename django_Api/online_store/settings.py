@@ -10,10 +10,18 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/2.1/ref/settings/
 """
 import os
+import sys
+import tempfile
 
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
+# Apps shared by the projects in this repository (perftools) live in its root.
+if os.path.dirname(BASE_DIR) not in sys.path:
+    sys.path.append(os.path.dirname(BASE_DIR))
+
+from perftools import sqlite  # noqa: E402
+
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/2.1/howto/deployment/checklist/
 
@@ -36,9 +44,13 @@ INSTALLED_APPS = [
     'rest_framework',
     'django_filters',
     'store',
+    'perftools',
 ]
 
 MIDDLEWARE = [
+    'perftools.metrics.MetricsMiddleware',
+    'perftools.profiling.ProfilingMiddleware',
+    'perftools.replicas.ReplicaMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -72,9 +84,20 @@ WSGI_APPLICATION = 'online_store.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/2.1/ref/settings/#databases
 DATABASES = {
+    # perftools.sqlite: WAL, immediate transactions, a busy timeout and
+    # connections kept across requests.
+    'default': sqlite.database(os.path.join(BASE_DIR, 'db.sqlite3')),
+    # Read replica for list and detail pages (perftools.replicas), refreshed
+    # from the primary by "manage.py sync_replica --interval 5".
+    'replica': sqlite.database(os.path.join(BASE_DIR, 'db.replica.sqlite3'), TEST={'MIRROR': 'default'}),
+}
+
+DATABASE_ROUTERS = ['perftools.replicas.ReplicaRouter']
+
+# perftools.cache backends count hits and misses for the metrics.
+CACHES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        'BACKEND': 'perftools.cache.LocMemCache',
     }
 }
 
@@ -109,3 +132,9 @@ STATIC_URL = '/static/'
 
 MEDIA_ROOT = os.path.abspath(os.path.join(BASE_DIR, 'store', 'uploads'))
 MEDIA_URL = '/uploads/'
+
+# Runtime metrics served at /metrics; see perftools.metrics.
+METRICS_DIR = os.path.join(tempfile.gettempdir(), 'online_store-metrics')
+
+# Cold start budget in ms for the importtime command; see perftools.coldstart.
+COLD_START_BUDGET_MS = 1000
@@ -3,17 +3,21 @@ from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import path
 
+import perftools.views
 import store.views
-import store.api_views
+from perftools.lazy import LazyView
 
+# The API views pull in DRF's generics, django_filters and the serializers;
+# importing them on the first API request keeps them out of worker boot.
 urlpatterns = [
-    path('api/v1/products', store.api_views.ProductList.as_view()),   # API JSON list of products
-    path('api/v1/products/new', store.api_views.ProductCreate.as_view()), # API endpoint to create a new product
-    #path('api/v1/products/<int:id>/destroy', store.api_views.ProductDestroy.as_view()), # API endpoint to get, update or delete a product
-    path('api/v1/products/<int:id>', store.api_views.ProductRetrieveUpdateDestroy.as_view()), # API endpoint to get, update or delete a product
-    path('api/v1/products/<int:id>/stats', store.api_views.ProductStats.as_view()), # API endpoint to get product stats
+    path('api/v1/products', LazyView('store.api_views.ProductList')),   # API JSON list of products
+    path('api/v1/products/new', LazyView('store.api_views.ProductCreate')), # API endpoint to create a new product
+    #path('api/v1/products/<int:id>/destroy', LazyView('store.api_views.ProductDestroy')), # API endpoint to get, update or delete a product
+    path('api/v1/products/<int:id>', LazyView('store.api_views.ProductRetrieveUpdateDestroy')), # API endpoint to get, update or delete a product
+    path('api/v1/products/<int:id>/stats', LazyView('store.api_views.ProductStats')), # API endpoint to get product stats
     
     path('admin/', admin.site.urls),
+    path('metrics', perftools.views.metrics_view, name='metrics'),     # Prometheus metrics
     path('products/<int:id>/', store.views.show, name='show-product'), # Single product detail page
     path('cart/', store.views.cart, name='shopping-cart'),             # Shopping cart page
     path('', store.views.index, name='list-products'),                 # Product listing page    
@@ -1,3 +1,29 @@
 from django.contrib import admin
 
-# Register your models here.
+from perftools.admin import LargeTableAdmin
+from store.models import Product, ShoppingCart, ShoppingCartItem
+
+
+class ProductAdmin(LargeTableAdmin):
+    list_display = ('name', 'price', 'sale_start', 'sale_end')
+    search_fields = ('^name',)  # On product_name_nocase_idx
+    sortable_by = ()
+    deferred_fields = ('description',)
+
+
+class ShoppingCartAdmin(LargeTableAdmin):
+    list_display = ('id', 'name', 'address')
+    sortable_by = ()
+
+
+class ShoppingCartItemAdmin(LargeTableAdmin):
+    list_display = ('shopping_cart', 'product', 'quantity')
+    list_select_related = ('shopping_cart', 'product')
+    deferred_fields = ('product__description',)
+    raw_id_fields = ('shopping_cart', 'product')
+    sortable_by = ()
+
+
+admin.site.register(Product, ProductAdmin)
+admin.site.register(ShoppingCart, ShoppingCartAdmin)
+admin.site.register(ShoppingCartItem, ShoppingCartItemAdmin)
@@ -4,8 +4,10 @@ from rest_framework.generics import ListAPIView, CreateAPIView, \
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.filters import SearchFilter
 from rest_framework.pagination import LimitOffsetPagination
+from rest_framework.permissions import SAFE_METHODS
 from rest_framework.response import Response
 
+from perftools.replicas import replica_reads
 from store.serializers import ProductSerializer, ProductStatSerializer
 from store.models import Product
 
@@ -18,7 +20,41 @@ class ProductPagination(LimitOffsetPagination):
     max_limit = 100 # A user can request more, but never more than 100.
 
 
-class ProductList(ListAPIView):
+class SparseFieldsMixin:
+    """
+    Lets a client pick the fields of a read: ?fields=id,name,price returns only those, and
+    ?expand=cart_items adds the nested cart items, which are left out otherwise.
+    The queryset only loads the columns the chosen fields read.
+    """
+
+    def query_param_list(self, name, allowed):
+        value = self.request.query_params.get(name)
+        if value is None:
+            return None
+        names = [field.strip() for field in value.split(',') if field.strip()]
+        unknown = [field for field in names if field not in allowed]
+        if unknown:
+            raise ValidationError({name: f"Unknown fields: {', '.join(unknown)}."})
+        return names
+
+    def get_serializer(self, *args, **kwargs):
+        serializer_class = self.get_serializer_class()
+        kwargs.setdefault('expand', self.query_param_list('expand', serializer_class.expandable_fields) or ())
+        # Writes keep every field, so that a ?fields= can't drop submitted data.
+        if self.request.method in SAFE_METHODS:
+            kwargs.setdefault('fields', self.query_param_list('fields', serializer_class.Meta.fields))
+        return super().get_serializer(*args, **kwargs)
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if self.request.method not in SAFE_METHODS:
+            return queryset
+        serializer = self.get_serializer()
+        return queryset.only(*serializer.columns())
+
+
+@replica_reads
+class ProductList(SparseFieldsMixin, ListAPIView):
     """
     API view to list all products.
     """
@@ -85,7 +121,8 @@ class ProductCreate(CreateAPIView):
 #             cache.delete(f'product_data_{products_id}') # Clear the cache for this product
 #         return response
 
-class ProductRetrieveUpdateDestroy(RetrieveUpdateDestroyAPIView):
+@replica_reads
+class ProductRetrieveUpdateDestroy(SparseFieldsMixin, RetrieveUpdateDestroyAPIView):
     """
     API view to get, update or delete a product.
     curl -X GET http:// 
@@ -0,0 +1,83 @@
+import random
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+
+from perftools import seeding
+from store.models import Product, ShoppingCart, ShoppingCartItem
+
+KINDS = ('Headphones', 'Keyboard', 'Backpack', 'Lamp', 'Mug', 'Jacket', 'Sneakers', 'Watch', 'Speaker', 'Chair')
+FIRST_NAMES = ('Kostas', 'Maria', 'Nikos', 'Eleni', 'Giorgos', 'Anna', 'Dimitris', 'Sofia', 'Yannis', 'Katerina')
+CITIES = ('Athens', 'Thessaloniki', 'Patras', 'Heraklion', 'Larissa', 'Volos', 'Ioannina', 'Chania')
+
+
+class Command(BaseCommand):
+    help = (
+        'Fill the database with synthetic products, shopping carts and cart items for '
+        'performance testing. The same --seed and --until always give the same rows.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=100_000)
+        parser.add_argument('--carts', type=int, default=50_000)
+        parser.add_argument('--items-per-cart', type=float, default=3.0, help='Mean items per cart.')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--until', help='Last day of the seeded sale dates, YYYY-MM-DD (default: today).')
+        parser.add_argument('--chunk-size', type=int, default=10_000, help='Rows per bulk_create transaction.')
+
+    def handle(self, *args, **options):
+        if options['chunk_size'] < 1:
+            raise CommandError('--chunk-size must be at least 1.')
+        if options['items_per_cart'] < 1:
+            raise CommandError('--items-per-cart must be at least 1.')
+        rng = random.Random(options['seed'])
+        end = seeding.end_of(options['until'])
+        loader = seeding.Loader(self.stdout, options['chunk_size'])
+        product_ids = []
+        cart_ids = []
+
+        with seeding.bulk_load():
+            loader.load(
+                Product,
+                (self.product(rng, end) for _ in range(options['products'])),
+                after_chunk=lambda chunk: product_ids.extend(product.pk for product in chunk),
+            )
+            loader.load(
+                ShoppingCart,
+                (self.cart(rng) for _ in range(options['carts'])),
+                after_chunk=lambda chunk: cart_ids.extend(cart.pk for cart in chunk),
+            )
+            if product_ids:
+                loader.load(ShoppingCartItem, self.cart_items(rng, cart_ids, product_ids, options['items_per_cart']))
+        self.stdout.write(self.style.SUCCESS(loader.summary()))
+
+    def product(self, rng, end):
+        product = Product(
+            name=f'{seeding.words(rng, 2).title()} {rng.choice(KINDS)}',
+            description=seeding.paragraph(rng, 1, 4),
+            price=seeding.lognormal_price(rng, 40),
+        )
+        # One product in seven has had a sale; half of those are open-ended.
+        if rng.random() < 1 / 7:
+            product.sale_start = seeding.moment(rng, end, 90)
+            if rng.random() < 0.5:
+                product.sale_end = product.sale_start + timedelta(days=rng.randint(1, 30))
+        return product
+
+    def cart(self, rng):
+        return ShoppingCart(
+            name=f'{rng.choice(FIRST_NAMES)} {seeding.words(rng, 1).title()}',
+            address=f'{rng.randint(1, 250)} {seeding.words(rng, 1).title()} Street, {rng.choice(CITIES)}',
+        )
+
+    def cart_items(self, rng, cart_ids, product_ids, mean):
+        for cart_id in cart_ids:
+            # Cart sizes are geometric; a few popular products are in most carts.
+            count = min(1 + int(rng.expovariate(1 / (mean - 1))) if mean > 1 else 1, 50)
+            products = {product_ids[seeding.zipf_index(rng, len(product_ids))] for _ in range(count)}
+            for product_id in products:
+                yield ShoppingCartItem(
+                    shopping_cart_id=cart_id,
+                    product_id=product_id,
+                    quantity=1 + int(rng.expovariate(2)),
+                )
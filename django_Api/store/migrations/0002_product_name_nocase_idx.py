@@ -0,0 +1,21 @@
+# Generated by Django 5.2.1 on 2026-10-19 10:48
+
+import django.db.models.functions.comparison
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("store", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="product",
+            index=models.Index(
+                django.db.models.functions.comparison.Collate("name", "NOCASE"),
+                name="product_name_nocase_idx",
+            ),
+        ),
+    ]
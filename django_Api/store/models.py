@@ -1,6 +1,7 @@
 
 from django.utils import timezone
 from django.db import models
+from django.db.models.functions import Collate
 
 """"
 Class	            Role
@@ -34,6 +35,10 @@ class Product(models.Model):
     sale_end = models.DateTimeField(blank=True, null=True, default=None)
     photo = models.ImageField(blank=True, null=True, default=None, upload_to='products')
 
+    class Meta:
+        # Backs the admin's case-insensitive name prefix search.
+        indexes = [models.Index(Collate('name', 'NOCASE'), name='product_name_nocase_idx')]
+
     def is_on_sale(self):
         now = timezone.now()
         if self.sale_start:
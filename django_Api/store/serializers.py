@@ -36,7 +36,35 @@ class ProductStatSerializer(serializers.Serializer):
         )
     )
 
+class ProductListSerializer(serializers.ListSerializer):
+    """
+    Loads the cart items of a whole page of products in one query, rather than one query per product.
+    """
+    def to_representation(self, data):
+        products = list(data.all() if hasattr(data, 'all') else data)
+        if 'cart_items' in self.child.fields:
+            items = {}
+            for item in ShoppingCartItem.objects.filter(product__in=products):
+                items.setdefault(item.product_id, []).append(item)
+            self.child.batched_cart_items = items
+        return super().to_representation(products)
+
+
 class ProductSerializer(serializers.ModelSerializer):
+    """
+    Takes the response fields as keyword arguments: `fields` keeps only the named fields, and
+    `expand` adds the expandable_fields, which are left out otherwise.
+    """
+    expandable_fields = ('cart_items',)
+    # The model columns read by the fields that aren't columns themselves.
+    computed_columns = {
+        'is_on_sale': ('sale_start', 'sale_end'),
+        'current_price': ('price', 'sale_start', 'sale_end'),
+        'cart_items': (),
+        'warranty': (),
+    }
+    batched_cart_items = None
+
     is_on_sale = serializers.BooleanField(read_only=True)
     current_price = serializers.FloatField(read_only=True)
     description = serializers.CharField(min_length=2, max_length=500)
@@ -67,9 +95,29 @@ class ProductSerializer(serializers.ModelSerializer):
         model = Product # The model we are serializing
         fields = ('id', 'name', 'description', 'price', 'sale_start', 'sale_end',
                   'is_on_sale', 'current_price', 'cart_items', 'photo', 'warranty') # Which fields to include in the JSON output.
+        list_serializer_class = ProductListSerializer
+
+    def __init__(self, *args, fields=None, expand=(), **kwargs):
+        super().__init__(*args, **kwargs)
+        for name in self.expandable_fields:
+            if name not in expand:
+                self.fields.pop(name)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+    def columns(self):
+        """The Product columns read by the fields of this serializer."""
+        columns = {'id'}
+        for name in self.fields:
+            columns.update(self.computed_columns.get(name, (name,)))
+        return columns
 
     def get_cart_items(self, instance):
-        items = ShoppingCartItem.objects.filter(product=instance)
+        if self.batched_cart_items is not None:
+            items = self.batched_cart_items.get(instance.pk, [])
+        else:
+            items = ShoppingCartItem.objects.filter(product=instance)
         return CartItemSerializer(items, many=True).data
 
     def update(self, instance, validated_data):
@@ -107,7 +155,7 @@ Type "help", "copyright", "credits" or "license" for more information.
 >>> cart.save()
 >>> item = ShoppingCartItem(shopping_cart=cart, product=product, quantity=5)
 >>> item.save()
->>> serializer = ProductSerializer(product)
+>>> serializer = ProductSerializer(product, expand=['cart_items'])
 >>> print(json.dump(serializer.data, indent=2))
 
 """
\ No newline at end of file
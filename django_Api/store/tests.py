@@ -1,10 +1,25 @@
+import json
 import os.path
+import subprocess
+import sys
+from io import StringIO
+from unittest import mock
+
 from django.conf import settings
+from django.contrib import admin
+from django.contrib.auth.models import User
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import RequestFactory, SimpleTestCase, TestCase
+from django.test.utils import CaptureQueriesContext
 
+from django.urls import resolve
 from rest_framework.test import APITestCase
 from decimal import Decimal
 
-from store.models import Product
+from perftools import coldstart
+from perftools.replicas import reads_from_replica
+from store.models import Product, ShoppingCart, ShoppingCartItem
 
 class ProductCreateTestCase(APITestCase):
     def test_create_product(self):
@@ -59,6 +74,52 @@ class ProductListTestCase(APITestCase):
         self.assertEqual(response.data['count'], products_count)
         self.assertEqual(len(response.data['results']), products_count)
 
+    def test_read_views_may_use_the_replica(self):
+        for url in ['/api/v1/products', '/api/v1/products/1', '/', '/products/1/']:
+            self.assertTrue(reads_from_replica(resolve(url).func), url)
+        self.assertFalse(reads_from_replica(resolve('/api/v1/products/new').func))
+
+
+class ProductFieldsTestCase(APITestCase):
+    def setUp(self):
+        cart = ShoppingCart.objects.create(name='Kostas', address='Athens, GR')
+        for number in range(3):
+            product = Product.objects.create(name=f'Product {number}', description='A long description', price=10)
+            ShoppingCartItem.objects.create(shopping_cart=cart, product=product, quantity=2)
+        Product.objects.create(name='Not in a cart', description='A long description', price=20)
+        self.product = product
+
+    def test_sparse_fields(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/v1/products', {'fields': 'id,name,price', 'limit': 100})
+        self.assertEqual(response.status_code, 200)
+        for product in response.data['results']:
+            self.assertEqual(set(product), {'id', 'name', 'price'})
+        self.assertFalse(any('"description"' in query['sql'] for query in queries))
+        self.assertFalse(any('store_shoppingcartitem' in query['sql'] for query in queries))
+
+        response = self.client.get(f'/api/v1/products/{self.product.id}', {'fields': 'name,current_price'})
+        self.assertEqual(set(response.data), {'name', 'current_price'})
+
+    def test_cart_items_are_expanded_on_request(self):
+        response = self.client.get(f'/api/v1/products/{self.product.id}')
+        self.assertIn('description', response.data)
+        self.assertNotIn('cart_items', response.data)
+
+        response = self.client.get(f'/api/v1/products/{self.product.id}', {'expand': 'cart_items'})
+        self.assertEqual(response.data['cart_items'], [{'product': self.product.id, 'quantity': 2}])
+
+        # The count, the page and the cart items of the whole page.
+        with self.assertNumQueries(3):
+            response = self.client.get('/api/v1/products', {'expand': 'cart_items', 'limit': 100})
+        self.assertEqual(sum(len(product['cart_items']) for product in response.data['results']), 3)
+
+    def test_unknown_fields(self):
+        response = self.client.get('/api/v1/products', {'fields': 'id,secret'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('secret', str(response.data['fields']))
+        response = self.client.get('/api/v1/products', {'expand': 'description'})
+        self.assertEqual(response.status_code, 400)
 
 
 class ProductUpdateTestCase(APITestCase):
@@ -103,3 +164,63 @@ class ProductUpdateTestCase(APITestCase):
             self.assertTrue(updated.photo.path.startswith(expected_photo))
         finally:
             os.remove(updated.photo.path)
+
+
+class ProductAdminTestCase(TestCase):
+    def test_changelist_and_search(self):
+        user = User.objects.create_superuser('admin', password='pw')
+        Product.objects.create(name='Mineral Water', description='Still', price=1)
+        self.client.force_login(user)
+        response = self.client.get('/admin/store/product/', {'q': 'mineral'})
+        self.assertContains(response, 'Mineral Water')
+
+        model_admin = admin.site._registry[Product]
+        request = RequestFactory().get('/')
+        request.user = user
+        products, _ = model_admin.get_search_results(request, model_admin.get_queryset(request), 'min')
+        self.assertIn('product_name_nocase_idx', products.explain())
+
+
+class SeedCommandTestCase(TestCase):
+    def seed(self):
+        out = StringIO()
+        call_command('seed', products=50, carts=20, seed=7, until='2026-01-31', chunk_size=8, stdout=out)
+        return out.getvalue()
+
+    def test_seed_is_deterministic(self):
+        output = self.seed()
+        self.seed()
+        self.assertIn('rows/sec', output)
+        products = list(Product.objects.order_by('pk').values_list('name', 'description', 'price', 'sale_start', 'sale_end'))
+        self.assertEqual(len(products), 100)
+        self.assertEqual(products[:50], products[50:])
+        self.assertEqual(ShoppingCart.objects.count(), 40)
+        self.assertGreaterEqual(ShoppingCartItem.objects.count(), 40)
+
+
+class ColdStartTestCase(SimpleTestCase):
+    def test_cold_start_over_budget_fails(self):
+        # The budget is checked against a fixed measurement, not this machine's.
+        load = (settings.COLD_START_BUDGET_MS + 1) / 1000
+        result = {'module': 'online_store.wsgi', 'process': load, 'import': load, 'urls': 0.0, 'modules': []}
+        with mock.patch.object(coldstart, 'measure', return_value=result):
+            with mock.patch.object(coldstart, 'import_times', return_value={}):
+                with self.assertRaisesMessage(CommandError, f'over the {settings.COLD_START_BUDGET_MS}ms budget'):
+                    call_command('importtime', runs=1, stdout=StringIO())
+
+
+class LazyApiViewsTestCase(SimpleTestCase):
+    def test_api_modules_are_not_loaded_at_boot(self):
+        # A fresh interpreter, as this one has imported them for other tests.
+        script = (
+            'import json, sys, django; django.setup(); from django.urls import reverse; '
+            'reverse("list-products"); print(json.dumps(sorted(sys.modules)))'
+        )
+        result = subprocess.run(
+            [sys.executable, '-c', script], cwd=settings.BASE_DIR, capture_output=True, text=True, check=True,
+            env={**os.environ, 'DJANGO_SETTINGS_MODULE': settings.SETTINGS_MODULE},
+        )
+        modules = json.loads(result.stdout)
+        self.assertIn('online_store.urls', modules)
+        for module in ('store.api_views', 'store.serializers', 'rest_framework.generics'):
+            self.assertNotIn(module, modules)
@@ -1,7 +1,9 @@
 from django.shortcuts import render
 
+from perftools.replicas import replica_reads
 from store.models import Product, ShoppingCart
 
+@replica_reads
 def index(request):
     #This view displays the product listing page.
     context = {
@@ -9,6 +11,7 @@ def index(request):
     }
     return render(request, 'store/product_list.html', context)
 
+@replica_reads
 def show(request, id):
     #This view displays the details of a single product.
     context = {
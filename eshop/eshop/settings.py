@@ -10,11 +10,19 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
+import sys
+import tempfile
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
+# Apps shared by the projects in this repository (perftools) live in its root.
+if str(BASE_DIR.parent) not in sys.path:
+    sys.path.append(str(BASE_DIR.parent))
+
+from perftools import sqlite  # noqa: E402
 
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/5.2/howto/deployment/checklist/
@@ -38,9 +46,13 @@ INSTALLED_APPS = [
     "django.contrib.messages",
     "django.contrib.staticfiles",
     "store",
+    "perftools",
 ]
 
 MIDDLEWARE = [
+    "perftools.metrics.MetricsMiddleware",
+    "perftools.profiling.ProfilingMiddleware",
+    "perftools.replicas.ReplicaMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -74,12 +86,23 @@ WSGI_APPLICATION = "eshop.wsgi.application"
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
 DATABASES = {
-    "default": {
-        "ENGINE": "django.db.backends.sqlite3",
-        "NAME": BASE_DIR / "db.sqlite3",
-    }
+    # perftools.sqlite: WAL, immediate transactions, a busy timeout and
+    # connections kept across requests.
+    "default": sqlite.database(
+        BASE_DIR / "db.sqlite3",
+        # A file-backed test database gives the checkout concurrency tests
+        # real SQLite locking instead of shared-cache table locks.
+        TEST={"NAME": BASE_DIR / "test_db.sqlite3"},
+    ),
+    # Read replica for list and detail pages (perftools.replicas), refreshed
+    # from the primary by "manage.py sync_replica --interval 5".
+    "replica": sqlite.database(
+        BASE_DIR / "db.replica.sqlite3", TEST={"MIRROR": "default"}
+    ),
 }
 
+DATABASE_ROUTERS = ["perftools.replicas.ReplicaRouter"]
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -121,3 +144,17 @@ STATIC_URL = "static/"
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
+
+# Postings, i.e. (token, item) pairs, past which the in-process item search
+# index stops indexing descriptions. Names are always indexed, so this bounds
+# the description part of the index, not its memory.
+SEARCH_INDEX_DESCRIPTION_POSTINGS = 5_000_000
+
+# Receipts sent by the task worker are printed to the console in development.
+EMAIL_BACKEND = "django.core.mail.backends.console.EmailBackend"
+
+# Runtime metrics served at /metrics; see perftools.metrics.
+METRICS_DIR = os.path.join(tempfile.gettempdir(), "eshop-metrics")
+
+# Cold start budget in ms for the importtime command; see perftools.coldstart.
+COLD_START_BUDGET_MS = 1000
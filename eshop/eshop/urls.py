@@ -17,8 +17,11 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path, include
 
+import perftools.views
+
 urlpatterns = [
     path("admin/", admin.site.urls),
+    path("metrics", perftools.views.metrics_view, name="metrics"),
     path("", include("store.urls")),
     path("accounts/", include("django.contrib.auth.urls")),
 ]
@@ -1,6 +1,44 @@
 from django.contrib import admin
-from .models import Item, CartItem, Purchase
 
-admin.site.register(Item)
-admin.site.register(CartItem)
-admin.site.register(Purchase)
+from perftools.admin import LargeTableAdmin
+from .models import Item, CartItem, Purchase, Task
+
+
+class ItemAdmin(LargeTableAdmin):
+    list_display = ("name", "sku", "price", "stock", "updated_at")
+    # Name prefixes and exact skus, on the item_*_nocase_idx indexes.
+    search_fields = ("^name", "=sku")
+    date_hierarchy = "updated_at"
+    ordering = ("-updated_at",)
+    sortable_by = ("updated_at",)
+    deferred_fields = ("description",)
+
+
+class CartItemAdmin(LargeTableAdmin):
+    list_display = ("user", "item", "quantity")
+    list_select_related = ("user", "item")
+    deferred_fields = ("item__description",)
+    raw_id_fields = ("user", "item")
+    sortable_by = ()
+
+
+class PurchaseAdmin(LargeTableAdmin):
+    list_display = ("id", "user", "total", "timestamp")
+    list_select_related = ("user",)
+    date_hierarchy = "timestamp"
+    ordering = ("-timestamp",)
+    sortable_by = ("timestamp",)
+    raw_id_fields = ("user", "items")
+
+
+class TaskAdmin(LargeTableAdmin):
+    list_display = ("name", "status", "attempts", "run_at", "created_at")
+    list_filter = ("status",)
+    sortable_by = ()
+    deferred_fields = ("payload", "last_error")
+
+
+admin.site.register(Item, ItemAdmin)
+admin.site.register(CartItem, CartItemAdmin)
+admin.site.register(Purchase, PurchaseAdmin)
+admin.site.register(Task, TaskAdmin)
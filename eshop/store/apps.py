@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class StoreConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "store"
+
+    def ready(self):
+        from . import search  # noqa: F401  Connects the search index signals.
+        from . import tasks  # noqa: F401  Registers the queue handlers.
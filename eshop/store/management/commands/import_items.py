@@ -0,0 +1,158 @@
+import csv
+import json
+import time
+from itertools import islice
+from pathlib import Path
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from store.models import Item
+
+UPDATE_FIELDS = ("name", "description", "price", "stock")
+DEFAULTS = {"stock": 0}
+
+
+def read_csv(source):
+    reader = csv.DictReader(source)
+    for line_no, row in enumerate(reader, start=2):
+        yield line_no, row, None
+
+
+def read_ndjson(source):
+    for line_no, line in enumerate(source, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as exc:
+            yield line_no, line.rstrip("\n"), f"Invalid JSON: {exc}"
+            continue
+        if not isinstance(row, dict):
+            yield line_no, row, "Expected a JSON object."
+            continue
+        yield line_no, row, None
+
+
+READERS = {"csv": read_csv, "ndjson": read_ndjson}
+
+
+def clean_row(row):
+    """Validate a raw row against the Item fields and return an unsaved Item."""
+    values = {}
+    errors = {}
+    for name in ("sku",) + UPDATE_FIELDS:
+        value = row.get(name)
+        if value in (None, "") and name in DEFAULTS:
+            value = DEFAULTS[name]
+        field = Item._meta.get_field(name)
+        try:
+            if name == "sku" and value in (None, ""):
+                raise ValidationError("A sku is required to upsert an item.")
+            values[name] = field.clean(value, None)
+        except ValidationError as exc:
+            errors[name] = exc.messages
+    if errors:
+        raise ValidationError(errors)
+    return Item(**values)
+
+
+class Command(BaseCommand):
+    help = (
+        "Stream a CSV or NDJSON inventory file into Item, upserting rows by sku "
+        "in chunks. Rejected rows are written to a side file."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="CSV or NDJSON file to import.")
+        parser.add_argument(
+            "--format",
+            choices=sorted(READERS),
+            help="Input format. Defaults to the file extension.",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=2000,
+            help="Rows validated and upserted per transaction.",
+        )
+        parser.add_argument(
+            "--rejects",
+            help="Where rejected rows are written (default: <path>.rejects.ndjson).",
+        )
+
+    def handle(self, *args, **options):
+        path = Path(options["path"])
+        if not path.exists():
+            raise CommandError(f"{path} does not exist.")
+        fmt = options["format"] or path.suffix.lstrip(".").lower()
+        if fmt == "jsonl":
+            fmt = "ndjson"
+        if fmt not in READERS:
+            raise CommandError(f"Cannot infer the format of {path}; pass --format.")
+        chunk_size = options["chunk_size"]
+        if chunk_size < 1:
+            raise CommandError("--chunk-size must be at least 1.")
+        rejects_path = Path(options["rejects"] or f"{path}.rejects.ndjson")
+
+        seen = upserted = rejected = 0
+        rejects = None
+        start = time.monotonic()
+        with open(path, newline="", encoding="utf-8") as source:
+            rows = READERS[fmt](source)
+            try:
+                while True:
+                    chunk = list(islice(rows, chunk_size))
+                    if not chunk:
+                        break
+                    items = {}
+                    for line_no, row, error in chunk:
+                        seen += 1
+                        if error is None:
+                            try:
+                                item = clean_row(row)
+                            except ValidationError as exc:
+                                error = exc.message_dict
+                            else:
+                                # Last row wins when a sku repeats within a chunk.
+                                items[item.sku] = item
+                                continue
+                        if rejects is None:
+                            rejects = open(rejects_path, "w", encoding="utf-8")
+                        rejects.write(
+                            json.dumps({"line": line_no, "row": row, "errors": error})
+                            + "\n"
+                        )
+                        rejected += 1
+                    if items:
+                        with transaction.atomic():
+                            Item.objects.bulk_create(
+                                items.values(),
+                                update_conflicts=True,
+                                unique_fields=["sku"],
+                                update_fields=UPDATE_FIELDS + ("updated_at",),
+                            )
+                        upserted += len(items)
+                    elapsed = max(time.monotonic() - start, 1e-6)
+                    self.stdout.write(
+                        f"{seen:,} rows read, {upserted:,} upserted, "
+                        f"{rejected:,} rejected ({seen / elapsed:,.0f} rows/sec)"
+                    )
+            finally:
+                if rejects is not None:
+                    rejects.close()
+
+        elapsed = max(time.monotonic() - start, 1e-6)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Imported {upserted:,} of {seen:,} rows in {elapsed:.1f}s "
+                f"({seen / elapsed:,.0f} rows/sec)."
+            )
+        )
+        if rejected:
+            self.stdout.write(
+                self.style.WARNING(
+                    f"{rejected:,} rejected rows written to {rejects_path}"
+                )
+            )
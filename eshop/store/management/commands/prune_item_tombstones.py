@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from store.search import prune_tombstones
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete the records of item deletions older than the search indexes "
+        "sync from. Run it periodically, e.g. hourly from cron."
+    )
+
+    def handle(self, *args, **options):
+        deleted = prune_tombstones()
+        self.stdout.write(self.style.SUCCESS(f"Pruned {deleted:,} item tombstones."))
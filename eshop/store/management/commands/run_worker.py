@@ -0,0 +1,67 @@
+import multiprocessing
+import os
+import socket
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from store.queue import work
+
+
+def start_worker(index, poll_interval, once):
+    # Forked children must not share the parent's database connection.
+    connections.close_all()
+    worker_id = f"{socket.gethostname()}:{os.getpid()}:{index}"
+    try:
+        work(worker_id, poll_interval=poll_interval, once=once)
+    except KeyboardInterrupt:
+        pass
+
+
+class Command(BaseCommand):
+    help = "Run background task workers for the database-backed task queue."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--processes",
+            type=int,
+            default=1,
+            help="Number of worker processes to run.",
+        )
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=1.0,
+            help="Seconds to sleep when the queue is empty.",
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Exit once no task is due instead of polling forever.",
+        )
+
+    def handle(self, *args, **options):
+        processes = options["processes"]
+        if processes < 1:
+            raise CommandError("--processes must be at least 1.")
+        args = (options["poll_interval"], options["once"])
+        self.stdout.write(f"Starting {processes} worker process(es).")
+        if processes == 1:
+            start_worker(0, *args)
+            return
+
+        context = multiprocessing.get_context("fork")
+        connections.close_all()
+        workers = [
+            context.Process(target=start_worker, args=(index,) + args)
+            for index in range(processes)
+        ]
+        for worker in workers:
+            worker.start()
+        try:
+            for worker in workers:
+                worker.join()
+        except KeyboardInterrupt:
+            for worker in workers:
+                worker.terminate()
+                worker.join()
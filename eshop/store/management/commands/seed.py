@@ -0,0 +1,171 @@
+import random
+from collections import defaultdict
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from perftools import seeding
+from store.models import CartItem, Item, Purchase, PurchaseLine, PurchaseSummary
+
+KINDS = (
+    "Tee",
+    "Hoodie",
+    "Cap",
+    "Mug",
+    "Poster",
+    "Notebook",
+    "Sticker",
+    "Tote",
+    "Socks",
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Fill the database with synthetic users, items, cart items and purchases "
+        "for performance testing. The same --seed and --until always give the "
+        "same rows."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=10_000)
+        parser.add_argument("--items", type=int, default=100_000)
+        parser.add_argument(
+            "--purchases", type=int, default=50_000, help="Purchases across all users."
+        )
+        parser.add_argument(
+            "--carts",
+            type=float,
+            default=0.3,
+            help="Fraction of users with items in their cart.",
+        )
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument(
+            "--until",
+            help="Last day of the seeded purchase dates, YYYY-MM-DD (default: today).",
+        )
+        parser.add_argument(
+            "--prefix", default="seed", help="Prefix of the usernames and skus."
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=10_000,
+            help="Rows per bulk_create transaction.",
+        )
+
+    def handle(self, *args, **options):
+        if options["chunk_size"] < 1:
+            raise CommandError("--chunk-size must be at least 1.")
+        prefix = options["prefix"]
+        if Item.objects.filter(sku__startswith=f"{prefix}-").exists():
+            raise CommandError(
+                f"Items with skus {prefix}-* already exist; pass another --prefix."
+            )
+        rng = random.Random(options["seed"])
+        end = seeding.end_of(options["until"])
+        loader = seeding.Loader(self.stdout, options["chunk_size"])
+        user_ids = []
+        items = []  # (pk, name, price) of every seeded item
+        summaries = defaultdict(lambda: [0, Decimal(0), None])
+
+        with seeding.bulk_load(), seeding.preserve_dates(Item, Purchase):
+            loader.load(
+                User,
+                seeding.users(rng, options["users"], end, prefix),
+                after_chunk=lambda chunk: user_ids.extend(user.pk for user in chunk),
+            )
+            loader.load(
+                Item,
+                (self.item(rng, end, prefix, n) for n in range(options["items"])),
+                after_chunk=lambda chunk: items.extend(
+                    (item.pk, item.name, item.price) for item in chunk
+                ),
+            )
+            if user_ids and items:
+                loader.load(
+                    CartItem, self.cart_items(rng, user_ids, items, options["carts"])
+                )
+                loader.load(
+                    Purchase,
+                    self.purchases(rng, end, user_ids, items, options["purchases"]),
+                    after_chunk=lambda chunk: self.save_lines(chunk, summaries),
+                )
+                loader.load(
+                    PurchaseSummary,
+                    (
+                        PurchaseSummary(
+                            user_id=user_id,
+                            order_count=count,
+                            lifetime_spend=spend,
+                            last_purchase_at=last,
+                        )
+                        for user_id, (count, spend, last) in summaries.items()
+                    ),
+                )
+        self.stdout.write(self.style.SUCCESS(loader.summary()))
+
+    def item(self, rng, end, prefix, number):
+        return Item(
+            sku=f"{prefix}-{number:08d}",
+            name=f"{seeding.words(rng, 2).title()} {rng.choice(KINDS)}"[:100],
+            description=seeding.paragraph(rng, 1, 3),
+            price=Decimal(str(seeding.lognormal_price(rng, 20, 0.8, high=999_999))),
+            # Most items are in stock, some are sold out.
+            stock=0 if rng.random() < 0.05 else int(rng.expovariate(1 / 200)),
+            updated_at=seeding.moment(rng, end, 365),
+        )
+
+    def cart_items(self, rng, user_ids, items, fraction):
+        for user_id in user_ids:
+            if rng.random() >= fraction:
+                continue
+            count = min(1 + int(rng.expovariate(1 / 2)), 20)
+            picked = {seeding.zipf_index(rng, len(items)) for _ in range(count)}
+            for index in picked:
+                yield CartItem(
+                    user_id=user_id,
+                    item_id=items[index][0],
+                    quantity=1 + int(rng.expovariate(2)),
+                )
+
+    def purchases(self, rng, end, user_ids, items, count):
+        for _ in range(count):
+            # A few customers place most of the orders.
+            user_id = user_ids[seeding.zipf_index(rng, len(user_ids))]
+            lines = []
+            for index in {
+                seeding.zipf_index(rng, len(items))
+                for _ in range(1 + int(rng.expovariate(1 / 1.5)))
+            }:
+                item_id, name, price = items[index]
+                lines.append(
+                    PurchaseLine(
+                        item_id=item_id,
+                        name=name,
+                        quantity=1 + int(rng.expovariate(2)),
+                        price=price,
+                    )
+                )
+            purchase = Purchase(
+                user_id=user_id,
+                timestamp=seeding.moment(rng, end, 365),
+                total=sum(line.subtotal for line in lines),
+            )
+            purchase.seeded_lines = lines
+            yield purchase
+
+    def save_lines(self, purchases, summaries):
+        lines = []
+        for purchase in purchases:
+            for line in purchase.seeded_lines:
+                line.purchase = purchase
+                lines.append(line)
+            summary = summaries[purchase.user_id]
+            summary[0] += 1
+            summary[1] += purchase.total
+            if summary[2] is None or purchase.timestamp > summary[2]:
+                summary[2] = purchase.timestamp
+        PurchaseLine.objects.bulk_create(lines)
+        return len(lines)
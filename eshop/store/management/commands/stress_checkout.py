@@ -0,0 +1,69 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from store import stress
+
+
+class Command(BaseCommand):
+    help = (
+        "Simulate concurrent logged-in users adding to cart and checking out, "
+        "then verify the stock and cart invariants and report throughput."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=20)
+        parser.add_argument("--items", type=int, default=5)
+        parser.add_argument("--stock", type=int, default=1000)
+        parser.add_argument(
+            "--iterations", type=int, default=10, help="Checkouts per user."
+        )
+        parser.add_argument(
+            "--concurrency", type=int, default=8, help="Threads or processes."
+        )
+        parser.add_argument(
+            "--sessions",
+            type=int,
+            default=2,
+            help="Concurrent clients per user, so carts are contended.",
+        )
+        parser.add_argument(
+            "--processes",
+            action="store_true",
+            help="Run users in forked processes instead of threads.",
+        )
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument(
+            "--keep", action="store_true", help="Keep the generated users and items."
+        )
+
+    def handle(self, *args, **options):
+        names = ("users", "items", "concurrency", "sessions")
+        if min(options[name] for name in names) < 1:
+            raise CommandError(
+                "--users, --items, --concurrency and --sessions must be positive."
+            )
+        report = stress.run(
+            users=options["users"],
+            items=options["items"],
+            stock=options["stock"],
+            iterations=options["iterations"],
+            concurrency=options["concurrency"],
+            sessions=options["sessions"],
+            processes=options["processes"],
+            seed=options["seed"],
+            keep=options["keep"],
+        )
+        self.stdout.write(
+            f"{report['checkouts']:,} checkouts, {report['errors']:,} errors "
+            f"in {report['elapsed']:.2f}s"
+        )
+        self.stdout.write(
+            f"{report['checkouts_per_sec']:,.1f} checkouts/sec, "
+            f"p50 {report['p50'] * 1000:.1f}ms, p99 {report['p99'] * 1000:.1f}ms"
+        )
+        if report["violations"]:
+            for violation in report["violations"]:
+                self.stderr.write(violation)
+            raise CommandError(
+                f"{len(report['violations'])} invariant violation(s) found."
+            )
+        self.stdout.write(self.style.SUCCESS("All invariants hold."))
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.1 on 2026-10-19 09:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("store", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="item",
+            name="sku",
+            field=models.CharField(blank=True, max_length=64, null=True, unique=True),
+        ),
+    ]
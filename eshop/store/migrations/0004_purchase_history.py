@@ -0,0 +1,99 @@
+# Generated by Django 5.2.1 on 2026-10-19 09:37
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Max
+
+
+def backfill_summaries(apps, schema_editor):
+    # Line items of earlier purchases were deleted with the cart, so only the
+    # order count and last purchase date can be recovered.
+    Purchase = apps.get_model("store", "Purchase")
+    PurchaseSummary = apps.get_model("store", "PurchaseSummary")
+    rows = (
+        Purchase.objects.values("user_id")
+        .annotate(order_count=Count("id"), last_purchase_at=Max("timestamp"))
+        .order_by()
+    )
+    PurchaseSummary.objects.bulk_create(
+        (PurchaseSummary(**row) for row in rows.iterator()), batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("auth", "0012_alter_user_first_name_max_length"),
+        ("store", "0003_task"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PurchaseLine",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("name", models.CharField(max_length=100)),
+                ("quantity", models.PositiveIntegerField()),
+                ("price", models.DecimalField(decimal_places=2, max_digits=8)),
+            ],
+        ),
+        migrations.CreateModel(
+            name="PurchaseSummary",
+            fields=[
+                (
+                    "user",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="purchase_summary",
+                        serialize=False,
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+                ("order_count", models.PositiveIntegerField(default=0)),
+                (
+                    "lifetime_spend",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=14),
+                ),
+                ("last_purchase_at", models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name="purchase",
+            name="total",
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=12),
+        ),
+        migrations.AddIndex(
+            model_name="purchase",
+            index=models.Index(
+                fields=["user", "-timestamp", "-id"],
+                name="store_purch_user_id_e2b687_idx",
+            ),
+        ),
+        migrations.AddField(
+            model_name="purchaseline",
+            name="item",
+            field=models.ForeignKey(
+                null=True, on_delete=django.db.models.deletion.SET_NULL, to="store.item"
+            ),
+        ),
+        migrations.AddField(
+            model_name="purchaseline",
+            name="purchase",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="lines",
+                to="store.purchase",
+            ),
+        ),
+        migrations.RunPython(backfill_summaries, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.1 on 2026-10-19 09:38
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Min, Sum
+
+
+def merge_duplicate_cart_items(apps, schema_editor):
+    CartItem = apps.get_model("store", "CartItem")
+    duplicates = (
+        CartItem.objects.values("user_id", "item_id")
+        .annotate(rows=Count("id"), keep=Min("id"), quantity=Sum("quantity"))
+        .filter(rows__gt=1)
+        .order_by()
+    )
+    for row in duplicates:
+        lines = CartItem.objects.filter(user_id=row["user_id"], item_id=row["item_id"])
+        lines.exclude(pk=row["keep"]).delete()
+        lines.filter(pk=row["keep"]).update(quantity=row["quantity"])
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("store", "0004_purchase_history"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_cart_items, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="cartitem",
+            constraint=models.UniqueConstraint(
+                fields=("user", "item"), name="unique_cart_item"
+            ),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.1 on 2026-10-19 09:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("store", "0005_unique_cart_item"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="item",
+            name="updated_at",
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+    ]
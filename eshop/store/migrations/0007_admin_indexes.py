@@ -0,0 +1,34 @@
+# Generated by Django 5.2.1 on 2026-10-19 10:48
+
+import django.db.models.functions.comparison
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("store", "0006_item_updated_at"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="item",
+            index=models.Index(
+                django.db.models.functions.comparison.Collate("name", "NOCASE"),
+                name="item_name_nocase_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="item",
+            index=models.Index(
+                django.db.models.functions.comparison.Collate("sku", "NOCASE"),
+                name="item_sku_nocase_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="purchase",
+            index=models.Index(fields=["timestamp"], name="purchase_timestamp_idx"),
+        ),
+    ]
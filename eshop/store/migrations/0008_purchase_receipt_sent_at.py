@@ -0,0 +1,18 @@
+# Generated by Django 5.2.1 on 2026-10-19 11:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("store", "0007_admin_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="purchase",
+            name="receipt_sent_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
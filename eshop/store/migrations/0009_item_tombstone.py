@@ -0,0 +1,29 @@
+# Generated by Django 5.2.1 on 2026-10-19 11:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("store", "0008_purchase_receipt_sent_at"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ItemTombstone",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("item_id", models.BigIntegerField()),
+                ("deleted_at", models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+        ),
+    ]
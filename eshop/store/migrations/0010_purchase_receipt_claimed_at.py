@@ -0,0 +1,18 @@
+# Generated by Django 5.2.1 on 2026-10-19 12:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("store", "0009_item_tombstone"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="purchase",
+            name="receipt_claimed_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
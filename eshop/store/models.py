@@ -1,24 +1,136 @@
 from django.db import models
+from django.db.models.functions import Collate
+from django.utils import timezone
 from django.contrib.auth.models import User
 
 
 class Item(models.Model):
+    # Natural key used by the bulk inventory import to upsert rows.
+    sku = models.CharField(max_length=64, unique=True, null=True, blank=True)
     name = models.CharField(max_length=100)
     description = models.TextField()
     price = models.DecimalField(max_digits=8, decimal_places=2)
     stock = models.PositiveIntegerField(default=0)
+    # Lets each process's search index pick up edits made by other processes.
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    class Meta:
+        # Back the admin's case-insensitive name prefix and sku searches.
+        indexes = [
+            models.Index(Collate("name", "NOCASE"), name="item_name_nocase_idx"),
+            models.Index(Collate("sku", "NOCASE"), name="item_sku_nocase_idx"),
+        ]
 
     def __str__(self):
         return self.name
 
 
+class ItemTombstone(models.Model):
+    """A deleted Item, for the search indexes of other processes to sync."""
+
+    item_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+
 class CartItem(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     item = models.ForeignKey(Item, on_delete=models.CASCADE)
     quantity = models.PositiveIntegerField(default=1)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["user", "item"], name="unique_cart_item")
+        ]
+
 
 class Purchase(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     items = models.ManyToManyField(CartItem)
     timestamp = models.DateTimeField(auto_now_add=True)
+    total = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    # Set by the send_receipt task, so a redelivered task doesn't mail twice.
+    # A worker claims the receipt while it sends it; the claim lapses like a
+    # task's lease if the worker dies.
+    receipt_claimed_at = models.DateTimeField(null=True, blank=True)
+    receipt_sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # Backs the per-user purchase history, newest first.
+            models.Index(fields=["user", "-timestamp", "-id"]),
+            # Backs the admin changelist's ordering and date hierarchy.
+            models.Index(fields=["timestamp"], name="purchase_timestamp_idx"),
+        ]
+
+
+class PurchaseLine(models.Model):
+    """What was bought in a purchase, kept after the cart items are cleared."""
+
+    purchase = models.ForeignKey(
+        Purchase, related_name="lines", on_delete=models.CASCADE
+    )
+    item = models.ForeignKey(Item, null=True, on_delete=models.SET_NULL)
+    name = models.CharField(max_length=100)
+    quantity = models.PositiveIntegerField()
+    price = models.DecimalField(max_digits=8, decimal_places=2)
+
+    @property
+    def subtotal(self):
+        return self.price * self.quantity
+
+
+class PurchaseSummary(models.Model):
+    """Per-user purchase totals, updated incrementally at checkout."""
+
+    user = models.OneToOneField(
+        User,
+        primary_key=True,
+        related_name="purchase_summary",
+        on_delete=models.CASCADE,
+    )
+    order_count = models.PositiveIntegerField(default=0)
+    lifetime_spend = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    last_purchase_at = models.DateTimeField(null=True, blank=True)
+
+    @classmethod
+    def record(cls, purchase):
+        summary, _ = cls.objects.get_or_create(user_id=purchase.user_id)
+        cls.objects.filter(pk=summary.pk).update(
+            order_count=models.F("order_count") + 1,
+            lifetime_spend=models.F("lifetime_spend") + purchase.total,
+            last_purchase_at=purchase.timestamp,
+        )
+
+
+class Task(models.Model):
+    """A unit of background work, claimed and run by the run_worker command."""
+
+    PENDING = "pending"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+    STATUS_CHOICES = [
+        (PENDING, "Pending"),
+        (RUNNING, "Running"),
+        (DONE, "Done"),
+        (FAILED, "Failed"),
+    ]
+
+    name = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict, blank=True)
+    # Enqueueing twice with the same key is a no-op.
+    key = models.CharField(max_length=200, unique=True, null=True, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    run_at = models.DateTimeField(default=timezone.now)
+    locked_by = models.CharField(max_length=100, blank=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["status", "run_at"])]
+
+    def __str__(self):
+        return f"{self.name} ({self.status})"
@@ -0,0 +1,129 @@
+"""
+A small database-backed task queue.
+
+Views enqueue work with ``enqueue()`` and return straight away; the
+``run_worker`` management command claims and runs the tasks. Delivery is
+at-least-once, so handlers must be safe to run twice.
+"""
+import logging
+import random
+import time
+import traceback
+from datetime import timedelta
+
+from django.db import connection, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import Task
+
+logger = logging.getLogger(__name__)
+
+HANDLERS = {}
+
+# A running task whose worker has not finished it within the lease is
+# assumed dead and becomes claimable again.
+LEASE = timedelta(minutes=5)
+BACKOFF_BASE = 5  # seconds
+BACKOFF_MAX = 3600  # seconds
+
+
+def task(name):
+    """Register the decorated function as the handler for ``name``."""
+
+    def register(func):
+        HANDLERS[name] = func
+        return func
+
+    return register
+
+
+def enqueue(name, payload=None, key=None, delay=0, max_attempts=5):
+    """Queue ``name`` to run with ``payload`` as keyword arguments."""
+    fields = {
+        "name": name,
+        "payload": payload or {},
+        "run_at": timezone.now() + timedelta(seconds=delay),
+        "max_attempts": max_attempts,
+    }
+    if key is None:
+        return Task.objects.create(**fields)
+    task, _ = Task.objects.get_or_create(key=key, defaults=fields)
+    return task
+
+
+def backoff(attempts):
+    """Seconds to wait before retrying a task that has failed ``attempts`` times."""
+    delay = min(BACKOFF_BASE * 2 ** (attempts - 1), BACKOFF_MAX)
+    return delay + random.uniform(0, delay / 10)
+
+
+def claimable(now):
+    return Q(status=Task.PENDING, run_at__lte=now) | Q(
+        status=Task.RUNNING, locked_at__lt=now - LEASE
+    )
+
+
+def claim(worker_id):
+    """Lock the next due task for ``worker_id`` and return it, or None."""
+    now = timezone.now()
+    queryset = Task.objects.filter(claimable(now)).order_by("run_at", "id")
+    claimed = {
+        "status": Task.RUNNING,
+        "locked_by": worker_id,
+        "locked_at": now,
+        "attempts": F("attempts") + 1,
+    }
+    if connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            task = queryset.select_for_update(skip_locked=True).first()
+            if task is None:
+                return None
+            Task.objects.filter(pk=task.pk).update(**claimed)
+        task.refresh_from_db()
+        return task
+    # SQLite has no row locks: claim by compare-and-swap instead, so only one
+    # worker's UPDATE can match a row that is still claimable.
+    for pk in queryset.values_list("pk", flat=True)[:10]:
+        if Task.objects.filter(claimable(now), pk=pk).update(**claimed):
+            return Task.objects.get(pk=pk)
+    return None
+
+
+def run(task):
+    """Run a claimed task and record the outcome."""
+    handler = HANDLERS.get(task.name)
+    try:
+        if handler is None:
+            raise LookupError(f"No handler registered for task {task.name!r}.")
+        handler(**task.payload)
+    except Exception:
+        error = traceback.format_exc()
+        logger.warning("Task %s (%s) failed:\n%s", task.pk, task.name, error)
+        if task.attempts >= task.max_attempts:
+            status, run_at = Task.FAILED, task.run_at
+        else:
+            status = Task.PENDING
+            run_at = timezone.now() + timedelta(seconds=backoff(task.attempts))
+        Task.objects.filter(pk=task.pk, locked_by=task.locked_by).update(
+            status=status, run_at=run_at, locked_by="", locked_at=None, last_error=error
+        )
+        return False
+    Task.objects.filter(pk=task.pk, locked_by=task.locked_by).update(
+        status=Task.DONE, locked_by="", locked_at=None, last_error=""
+    )
+    return True
+
+
+def work(worker_id, poll_interval=1.0, once=False):
+    """Claim and run tasks until interrupted, or until the queue is empty if ``once``."""
+    processed = 0
+    while True:
+        task = claim(worker_id)
+        if task is None:
+            if once:
+                return processed
+            time.sleep(poll_interval)
+            continue
+        run(task)
+        processed += 1
@@ -0,0 +1,351 @@
+"""
+In-process search index over Item names and descriptions.
+
+Every token is kept in a sorted vocabulary, so prefix lookups (autocomplete
+and the last word of a query) are a bisect. Typos are handled with a
+trigram index over the same vocabulary. The index is built by the first
+search in a worker, off the import path so it doesn't slow worker startup,
+and kept current by Item signals in this process. It catches up with
+edits made by other processes through Item.updated_at, and with their
+deletions through ItemTombstone rows.
+
+Searches only hold the index lock for in-memory work. Syncs read the
+database first and then apply the changes under the lock. Rebuilds load a
+fresh index and swap it in.
+"""
+
+import bisect
+import heapq
+import logging
+import re
+import threading
+import time
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import Item, ItemTombstone
+
+logger = logging.getLogger(__name__)
+
+TOKEN_RE = re.compile(r"\w+")
+NAME_WEIGHT = 3
+DESCRIPTION_WEIGHT = 1
+# Short prefixes expand to many tokens; stop once this many postings are in.
+MAX_PREFIX_TOKENS = 50
+MAX_PREFIX_POSTINGS = 1000
+MIN_SIMILARITY = 0.4
+# Tombstones older than this are pruned by the prune_item_tombstones
+# command. An index that hasn't synced for longer may have missed
+# deletions, and is rebuilt.
+TOMBSTONE_RETENTION = timedelta(days=1)
+
+
+def tokenize(text):
+    return TOKEN_RE.findall(text.lower())
+
+
+def trigrams(token):
+    padded = f"  {token} "
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+class SearchIndex:
+    # The attributes holding the index, swapped in whole by build().
+    STATE = (
+        "built",
+        "postings",
+        "vocabulary",
+        "grams",
+        "gram_counts",
+        "documents",
+        "posting_count",
+        "synced_at",
+        "tombstone_id",
+        "swept_at",
+        "descriptions_capped",
+    )
+
+    def __init__(self, description_postings=None, refresh_interval=None):
+        if description_postings is None:
+            description_postings = getattr(
+                settings, "SEARCH_INDEX_DESCRIPTION_POSTINGS", 5_000_000
+            )
+        if refresh_interval is None:
+            refresh_interval = getattr(settings, "SEARCH_INDEX_REFRESH_SECONDS", 30)
+        # Descriptions are only indexed while the index holds fewer postings
+        # than this; names always are.
+        self.description_postings = description_postings
+        self.refresh_interval = refresh_interval
+        self.lock = threading.RLock()  # Guards the STATE.
+        self.build_lock = threading.Lock()  # One build at a time.
+        self.clear()
+
+    def clear(self):
+        with self.lock:
+            self.built = False
+            self.postings = defaultdict(dict)  # token -> {item id: weight}
+            self.vocabulary = []  # sorted tokens
+            self.grams = defaultdict(set)  # trigram -> tokens
+            self.gram_counts = {}  # token -> number of trigrams
+            self.documents = {}  # item id -> (name, tokens, updated_at)
+            self.posting_count = 0
+            self.synced_at = None  # latest Item.updated_at seen
+            self.tombstone_id = 0  # latest ItemTombstone seen
+            self.swept_at = None  # when the last sync started
+            self.descriptions_capped = False
+            self.checked_at = 0.0
+
+    # Building and incremental updates
+
+    def build(self, unless_built=False):
+        """Rebuild the index from the database and swap it in."""
+        with self.build_lock:
+            if unless_built and self.built:
+                return  # Built by another thread while this one waited.
+            fresh = SearchIndex(self.description_postings, self.refresh_interval)
+            fresh.load()
+            with self.lock:
+                for name in self.STATE:
+                    setattr(self, name, getattr(fresh, name))
+                self.checked_at = time.monotonic()
+        # Pick up what this process wrote while the fresh index loaded.
+        self.sync()
+
+    def load(self):
+        """Fill an empty index from the database."""
+        self.swept_at = timezone.now()
+        last_tombstone = (
+            ItemTombstone.objects.using(DEFAULT_DB_ALIAS).order_by("-pk").first()
+        )
+        if last_tombstone is not None:
+            self.tombstone_id = last_tombstone.pk
+        rows = Item.objects.using(DEFAULT_DB_ALIAS).values_list(
+            "pk", "name", "description", "updated_at"
+        )
+        for pk, name, description, updated_at in rows.iterator(chunk_size=2000):
+            self.add(pk, name, description, updated_at)
+            if self.synced_at is None or updated_at > self.synced_at:
+                self.synced_at = updated_at
+        self.built = True
+
+    def rebuild_in_background(self):
+        def rebuild():
+            try:
+                self.build()
+            except DatabaseError:
+                logger.warning("Item search index not rebuilt.", exc_info=True)
+
+        if not self.build_lock.locked():
+            threading.Thread(target=rebuild, daemon=True).start()
+
+    def add(self, pk, name, description, updated_at=None):
+        with self.lock:
+            document = self.documents.get(pk)
+            if (
+                document is not None
+                and updated_at is not None
+                and document[2] is not None
+                and document[2] > updated_at
+            ):
+                return  # A sync read the row before a newer save got here.
+            self.remove(pk)
+            weights = {}
+            for token in tokenize(name):
+                weights[token] = NAME_WEIGHT
+            description_tokens = set(tokenize(description)) - weights.keys()
+            if self.posting_count + len(weights) + len(description_tokens) <= (
+                self.description_postings
+            ):
+                weights.update(dict.fromkeys(description_tokens, DESCRIPTION_WEIGHT))
+            elif not self.descriptions_capped:
+                self.descriptions_capped = True
+                logger.warning(
+                    "Item search index reached SEARCH_INDEX_DESCRIPTION_POSTINGS "
+                    "(%s); only the names of further items are indexed.",
+                    self.description_postings,
+                )
+            for token, weight in weights.items():
+                postings = self.postings[token]
+                if not postings:
+                    bisect.insort(self.vocabulary, token)
+                    grams = trigrams(token)
+                    self.gram_counts[token] = len(grams)
+                    for gram in grams:
+                        self.grams[gram].add(token)
+                postings[pk] = weight
+            self.posting_count += len(weights)
+            self.documents[pk] = (name, tuple(weights), updated_at)
+
+    def remove(self, pk):
+        with self.lock:
+            document = self.documents.pop(pk, None)
+            if document is None:
+                return
+            for token in document[1]:
+                postings = self.postings[token]
+                postings.pop(pk, None)
+                if not postings:
+                    del self.postings[token]
+                    del self.vocabulary[bisect.bisect_left(self.vocabulary, token)]
+                    del self.gram_counts[token]
+                    for gram in trigrams(token):
+                        self.grams[gram].discard(token)
+            self.posting_count -= len(document[1])
+
+    def sync(self):
+        """Apply the edits and deletions made since the last sync."""
+        with self.lock:
+            synced_at, tombstone_id, swept_at = (
+                self.synced_at,
+                self.tombstone_id,
+                self.swept_at,
+            )
+        now = timezone.now()
+        # Read from the primary: a lagging replica would skip rows for good.
+        changed = Item.objects.using(DEFAULT_DB_ALIAS)
+        if synced_at is not None:
+            # >= as rows saved in the same instant may not all have been read.
+            changed = changed.filter(updated_at__gte=synced_at)
+        rows = list(changed.values_list("pk", "name", "description", "updated_at"))
+        # Tombstones after rows, so a row deleted in between is removed again.
+        tombstones = list(
+            ItemTombstone.objects.using(DEFAULT_DB_ALIAS)
+            .filter(pk__gt=tombstone_id)
+            .order_by("pk")
+            .values_list("pk", "item_id")
+        )
+        with self.lock:
+            for pk, name, description, updated_at in rows:
+                self.add(pk, name, description, updated_at)
+                if self.synced_at is None or updated_at > self.synced_at:
+                    self.synced_at = updated_at
+            for tombstone_id, item_id in tombstones:
+                self.remove(item_id)
+                self.tombstone_id = max(self.tombstone_id, tombstone_id)
+            self.swept_at = now
+        if swept_at is not None and now - swept_at > TOMBSTONE_RETENTION:
+            self.rebuild_in_background()
+
+    def refresh(self):
+        """Build on first use and pick up writes from other processes."""
+        if not self.built:
+            self.build(unless_built=True)
+            return
+        with self.lock:
+            now = time.monotonic()
+            if now - self.checked_at < self.refresh_interval:
+                return
+            self.checked_at = now
+        self.sync()
+
+    # Queries
+
+    def prefix_tokens(self, prefix):
+        start = bisect.bisect_left(self.vocabulary, prefix)
+        tokens = []
+        for token in self.vocabulary[start : start + MAX_PREFIX_TOKENS]:
+            if not token.startswith(prefix):
+                break
+            tokens.append(token)
+        return tokens
+
+    def similar_tokens(self, term, limit=5):
+        grams = trigrams(term)
+        shared = defaultdict(int)
+        for gram in grams:
+            for token in self.grams.get(gram, ()):
+                shared[token] += 1
+        scored = []
+        for token, count in shared.items():
+            similarity = count / (len(grams) + self.gram_counts[token] - count)
+            if similarity >= MIN_SIMILARITY:
+                scored.append((similarity, token))
+        scored.sort(reverse=True)
+        return scored[:limit]
+
+    def match(self, term, prefix):
+        """Return {item id: score} for one query term."""
+        candidates = []
+        if term in self.postings:
+            candidates.append((term, 2.0))
+        if prefix:
+            volume = 0
+            for token in self.prefix_tokens(term):
+                if volume >= MAX_PREFIX_POSTINGS:
+                    break
+                if token != term:
+                    candidates.append((token, 1.0))
+                    volume += len(self.postings[token])
+        if not candidates and len(term) >= 3:
+            candidates = [
+                (token, similarity * 0.5)
+                for similarity, token in self.similar_tokens(term)
+            ]
+        scores = {}
+        for token, boost in candidates:
+            for pk, weight in self.postings[token].items():
+                score = weight * boost
+                if score > scores.get(pk, 0):
+                    scores[pk] = score
+        return scores
+
+    def search(self, query, limit=1000):
+        """Return the ids of items matching every word of ``query``, best first."""
+        terms = tokenize(query)
+        if not terms:
+            return []
+        self.refresh()
+        with self.lock:
+            totals = None
+            for position, term in enumerate(terms):
+                scores = self.match(term, prefix=position == len(terms) - 1)
+                if totals is None:
+                    totals = scores
+                else:
+                    totals = {
+                        pk: total + scores[pk]
+                        for pk, total in totals.items()
+                        if pk in scores
+                    }
+                if not totals:
+                    return []
+        ranked = heapq.nsmallest(
+            limit, totals.items(), key=lambda entry: (-entry[1], entry[0])
+        )
+        return [pk for pk, _ in ranked]
+
+    def suggest(self, query, limit=10):
+        """Return item names for autocomplete."""
+        ids = self.search(query, limit=limit)
+        with self.lock:
+            return [self.documents[pk][0] for pk in ids if pk in self.documents]
+
+
+index = SearchIndex()
+
+
+def prune_tombstones():
+    """Delete the tombstones older than TOMBSTONE_RETENTION; returns how many."""
+    cutoff = timezone.now() - TOMBSTONE_RETENTION
+    deleted, _ = ItemTombstone.objects.filter(deleted_at__lt=cutoff).delete()
+    return deleted
+
+
+@receiver(post_save, sender=Item)
+def index_item(sender, instance, **kwargs):
+    if index.built:
+        index.add(instance.pk, instance.name, instance.description, instance.updated_at)
+
+
+@receiver(post_delete, sender=Item)
+def unindex_item(sender, instance, using, **kwargs):
+    # Leaves a trace for the indexes of other processes to sync from.
+    ItemTombstone.objects.using(using).create(item_id=instance.pk)
+    if index.built:
+        index.remove(instance.pk)
@@ -0,0 +1,199 @@
+"""
+Concurrency stress test and benchmark for the add_to_cart/buy_items flow.
+
+Simulated users each get their own logged-in test client and hammer the
+eshop URLconf from threads or forked processes. Afterwards the database is
+checked for the invariants checkout has to keep under contention:
+
+* stock never goes negative,
+* every unit taken out of stock shows up in a purchase line, and
+* every successful add_to_cart is either still in a cart or was bought.
+"""
+
+import multiprocessing
+import random
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import connections
+from django.db.models import Sum
+from django.test import Client
+from django.urls import reverse
+
+from .models import CartItem, Item, PurchaseLine, Task
+
+PREFIX = "stress-"
+
+
+def create_fixtures(users, items, stock):
+    run_id = f"{PREFIX}{time.time_ns()}"
+    User.objects.bulk_create(
+        User(username=f"{run_id}-{index}") for index in range(users)
+    )
+    Item.objects.bulk_create(
+        Item(
+            name=f"{run_id}-{index}",
+            description="Stress test item",
+            price="1.00",
+            stock=stock,
+        )
+        for index in range(items)
+    )
+    user_ids = list(
+        User.objects.filter(username__startswith=run_id).values_list("pk", flat=True)
+    )
+    item_ids = list(
+        Item.objects.filter(name__startswith=run_id).values_list("pk", flat=True)
+    )
+    return user_ids, item_ids
+
+
+def delete_fixtures(user_ids, item_ids):
+    purchase_ids = PurchaseLine.objects.filter(item_id__in=item_ids).values_list(
+        "purchase_id", flat=True
+    )
+    Task.objects.filter(key__in=[f"receipt:{pk}" for pk in purchase_ids]).delete()
+    User.objects.filter(pk__in=user_ids).delete()
+    Item.objects.filter(pk__in=item_ids).delete()
+
+
+def client_host():
+    for host in settings.ALLOWED_HOSTS:
+        if host != "*" and not host.startswith("."):
+            return host
+    return "localhost"
+
+
+def simulate_user(user_id, item_ids, iterations, seed):
+    """Add a few random items and check out, ``iterations`` times."""
+    rng = random.Random(seed)
+    client = Client(HTTP_HOST=client_host())
+    added = Counter()
+    latencies = []
+    checkouts = errors = 0
+    try:
+        client.force_login(User.objects.get(pk=user_id))
+        for _ in range(iterations):
+            for item_id in rng.sample(item_ids, k=min(3, len(item_ids))):
+                try:
+                    response = client.post(reverse("add_to_cart", args=[item_id]))
+                except Exception:
+                    errors += 1
+                    continue
+                if response.status_code == 302:
+                    added[item_id] += 1
+                else:
+                    errors += 1
+            start = time.perf_counter()
+            try:
+                response = client.post(reverse("buy"))
+            except Exception:
+                errors += 1
+                continue
+            latencies.append(time.perf_counter() - start)
+            # 409: some lines were out of stock and stayed in the cart.
+            if response.status_code in (302, 409):
+                checkouts += 1
+            else:
+                errors += 1
+    except Exception:
+        errors += 1
+    finally:
+        connections.close_all()
+    return {
+        "added": added,
+        "latencies": latencies,
+        "checkouts": checkouts,
+        "errors": errors,
+    }
+
+
+def check_invariants(user_ids, item_ids, stock, results):
+    """Return a list of human-readable invariant violations."""
+    violations = []
+    sold = dict(
+        PurchaseLine.objects.filter(item_id__in=item_ids)
+        .values("item_id")
+        .annotate(total=Sum("quantity"))
+        .values_list("item_id", "total")
+    )
+    in_carts = dict(
+        CartItem.objects.filter(user_id__in=user_ids, item_id__in=item_ids)
+        .values("item_id")
+        .annotate(total=Sum("quantity"))
+        .values_list("item_id", "total")
+    )
+    added = sum((result["added"] for result in results), Counter())
+    for item in Item.objects.filter(pk__in=item_ids):
+        if item.stock < 0:
+            violations.append(f"Item {item.pk} has negative stock ({item.stock}).")
+        taken = stock - item.stock
+        if taken != sold.get(item.pk, 0):
+            violations.append(
+                f"Item {item.pk}: {taken} taken from stock but "
+                f"{sold.get(item.pk, 0)} purchased."
+            )
+        accounted = sold.get(item.pk, 0) + in_carts.get(item.pk, 0)
+        if added[item.pk] != accounted:
+            violations.append(
+                f"Item {item.pk}: {added[item.pk]} added to carts but "
+                f"{accounted} purchased or still in a cart."
+            )
+    return violations
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def run(
+    users=20,
+    items=5,
+    stock=1000,
+    iterations=10,
+    concurrency=8,
+    sessions=2,
+    processes=False,
+    seed=0,
+    keep=False,
+):
+    """
+    Run the stress test and return a report dict. Each user is simulated by
+    ``sessions`` concurrent clients, like a shopper with several open tabs.
+    """
+    user_ids, item_ids = create_fixtures(users, items, stock)
+    jobs = [
+        (user_id, item_ids, iterations, seed + index)
+        for index, user_id in enumerate(user_ids * sessions)
+    ]
+    start = time.perf_counter()
+    if processes:
+        # Children must open their own connections after the fork.
+        connections.close_all()
+        with multiprocessing.get_context("fork").Pool(concurrency) as pool:
+            results = pool.starmap(simulate_user, jobs)
+    else:
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            results = list(executor.map(lambda job: simulate_user(*job), jobs))
+    elapsed = time.perf_counter() - start
+
+    latencies = [latency for result in results for latency in result["latencies"]]
+    checkouts = sum(result["checkouts"] for result in results)
+    report = {
+        "checkouts": checkouts,
+        "errors": sum(result["errors"] for result in results),
+        "elapsed": elapsed,
+        "checkouts_per_sec": checkouts / elapsed if elapsed else 0.0,
+        "p50": percentile(latencies, 0.50),
+        "p99": percentile(latencies, 0.99),
+        "violations": check_invariants(user_ids, item_ids, stock, results),
+    }
+    if not keep:
+        delete_fixtures(user_ids, item_ids)
+    return report
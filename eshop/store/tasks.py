@@ -0,0 +1,41 @@
+"""Background work run by the task queue after a purchase."""
+
+from django.contrib.auth.models import User
+from django.core.mail import send_mail
+from django.db.models import Q
+from django.utils import timezone
+
+from . import queue
+from .models import Purchase
+from .queue import task
+
+
+@task("store.send_receipt")
+def send_receipt(purchase_id, user_id, lines):
+    user = User.objects.filter(pk=user_id).first()
+    if user is None or not user.email:
+        return
+    body = "\n".join(
+        f"{quantity} x {name} - €{price}" for name, quantity, price in lines
+    )
+    # Claim the receipt, send it, then mark it sent, each step committed on
+    # its own so no transaction stays open while the mail server is slow. A
+    # second delivery of the task finds the receipt sent or claimed.
+    now = timezone.now()
+    claimed = (
+        Purchase.objects.filter(pk=purchase_id, receipt_sent_at__isnull=True)
+        .filter(
+            Q(receipt_claimed_at__isnull=True)
+            | Q(receipt_claimed_at__lt=now - queue.LEASE)
+        )
+        .update(receipt_claimed_at=now)
+    )
+    if not claimed:
+        return
+    try:
+        send_mail(f"Your receipt for order #{purchase_id}", body, None, [user.email])
+    except Exception:
+        # Free the receipt for the task's retry.
+        Purchase.objects.filter(pk=purchase_id).update(receipt_claimed_at=None)
+        raise
+    Purchase.objects.filter(pk=purchase_id).update(receipt_sent_at=timezone.now())
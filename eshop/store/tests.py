@@ -1,3 +1,407 @@
-from django.test import TestCase
+import importlib
+import json
+import tempfile
+from decimal import Decimal
+from io import StringIO
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from django.contrib import admin
+from django.contrib.auth.models import User
+from django.core import mail
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import RequestFactory, TestCase, TransactionTestCase
+from django.urls import resolve, reverse
+from django.utils import timezone
+
+from perftools.replicas import reads_from_replica
+from store import queue, stress, tasks
+from store.search import TOMBSTONE_RETENTION, SearchIndex, index
+from store.models import (
+    CartItem,
+    Item,
+    ItemTombstone,
+    Purchase,
+    PurchaseLine,
+    PurchaseSummary,
+    Task,
+)
+
+
+class ImportItemsCommandTestCase(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def write(self, name, content):
+        path = Path(self.tmp.name) / name
+        path.write_text(content, encoding="utf-8")
+        return path
+
+    def test_csv_import_upserts_by_sku(self):
+        Item.objects.create(sku="A-1", name="Old name", description="", price=1)
+        path = self.write(
+            "items.csv",
+            "sku,name,description,price,stock\n"
+            "A-1,Apple,Fresh,1.50,10\n"
+            "B-2,Banana,Ripe,0.25,\n",
+        )
+        call_command("import_items", str(path), chunk_size=1, stdout=StringIO())
+
+        self.assertEqual(Item.objects.count(), 2)
+        apple = Item.objects.get(sku="A-1")
+        self.assertEqual(apple.name, "Apple")
+        self.assertEqual(apple.price, Decimal("1.50"))
+        self.assertEqual(apple.stock, 10)
+        self.assertEqual(Item.objects.get(sku="B-2").stock, 0)
+
+    def test_ndjson_rejects_are_written_to_side_file(self):
+        path = self.write(
+            "items.ndjson",
+            '{"sku": "C-3", "name": "Cherry", "description": "Red", "price": "3.00", "stock": 4}\n'
+            '{"sku": "D-4", "name": "Date", "description": "Sweet", "price": "x"}\n'
+            "not json\n"
+            '{"name": "No sku", "description": "", "price": "1.00"}\n',
+        )
+        out = StringIO()
+        call_command("import_items", str(path), stdout=out)
+
+        self.assertEqual(list(Item.objects.values_list("sku", flat=True)), ["C-3"])
+        rejects = Path(f"{path}.rejects.ndjson").read_text().splitlines()
+        self.assertEqual([json.loads(line)["line"] for line in rejects], [2, 3, 4])
+        self.assertIn("price", json.loads(rejects[0])["errors"])
+        self.assertIn("3 rejected rows", out.getvalue())
+
+
+class TaskQueueTestCase(TestCase):
+    def setUp(self):
+        self.calls = []
+        queue.HANDLERS["test.record"] = lambda **kwargs: self.calls.append(kwargs)
+        self.addCleanup(queue.HANDLERS.pop, "test.record")
+
+    def test_enqueue_with_key_is_idempotent(self):
+        first = queue.enqueue("test.record", {"n": 1}, key="once")
+        second = queue.enqueue("test.record", {"n": 2}, key="once")
+        self.assertEqual(first.pk, second.pk)
+        self.assertEqual(Task.objects.count(), 1)
+
+    def test_claimed_task_is_run_once(self):
+        queue.enqueue("test.record", {"n": 1})
+        self.assertEqual(queue.work("test-worker", once=True), 1)
+        self.assertEqual(self.calls, [{"n": 1}])
+        self.assertEqual(Task.objects.get().status, Task.DONE)
+        self.assertIsNone(queue.claim("test-worker"))
+
+    def test_failed_task_is_retried_with_backoff(self):
+        queued = queue.enqueue("test.missing", max_attempts=2)
+        with self.assertLogs("store.queue", "WARNING"):
+            self.assertFalse(queue.run(queue.claim("test-worker")))
+        queued.refresh_from_db()
+        self.assertEqual(queued.status, Task.PENDING)
+        self.assertGreater(queued.run_at, timezone.now())
+        self.assertIn("No handler registered", queued.last_error)
+
+        Task.objects.update(run_at=timezone.now())
+        with self.assertLogs("store.queue", "WARNING"):
+            queue.run(queue.claim("test-worker"))
+        queued.refresh_from_db()
+        self.assertEqual(queued.status, Task.FAILED)
+        self.assertEqual(queued.attempts, 2)
+
+    def test_buy_items_enqueues_receipt(self):
+        user = User.objects.create_user("buyer", "buyer@example.com", "pw")
+        item = Item.objects.create(name="Tea", description="Green", price=3, stock=5)
+        CartItem.objects.create(user=user, item=item, quantity=2)
+        self.client.force_login(user)
+
+        self.client.post(reverse("buy"))
+        self.assertEqual(mail.outbox, [])
+        self.assertEqual(Task.objects.get().name, "store.send_receipt")
+
+        queue.work("test-worker", once=True)
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertIn("2 x Tea", mail.outbox[0].body)
+
+        # A redelivered task doesn't mail the receipt again.
+        task = Task.objects.get()
+        queue.HANDLERS[task.name](**task.payload)
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertIsNotNone(Purchase.objects.get().receipt_sent_at)
+
+    def test_receipt_is_sent_outside_a_transaction(self):
+        user = User.objects.create_user("buyer", "buyer@example.com", "pw")
+        purchase = Purchase.objects.create(user=user)
+        depth = len(connection.atomic_blocks)  # The test case's own.
+        depths = []
+
+        def send_mail(*args):
+            depths.append(len(connection.atomic_blocks))
+            raise OSError("Mail server down")
+
+        with mock.patch.object(tasks, "send_mail", side_effect=send_mail):
+            with self.assertRaises(OSError):
+                tasks.send_receipt(purchase.pk, user.pk, [])
+        self.assertEqual(depths, [depth])
+        purchase.refresh_from_db()
+        self.assertIsNone(purchase.receipt_claimed_at)
+
+        # The retry sends it; a live claim keeps a concurrent delivery out.
+        tasks.send_receipt(purchase.pk, user.pk, [])
+        Purchase.objects.filter(pk=purchase.pk).update(receipt_sent_at=None)
+        tasks.send_receipt(purchase.pk, user.pk, [])
+        self.assertEqual(len(mail.outbox), 1)
+
+
+class PurchaseHistoryTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("buyer", password="pw")
+        self.item = Item.objects.create(
+            name="Tea", description="Green", price="2.50", stock=100
+        )
+        self.client.force_login(self.user)
+
+    def buy(self, quantity):
+        CartItem.objects.create(user=self.user, item=self.item, quantity=quantity)
+        self.client.post(reverse("buy"))
+
+    def test_checkout_records_lines_and_summary(self):
+        self.buy(2)
+        self.buy(1)
+
+        summary = PurchaseSummary.objects.get(user=self.user)
+        self.assertEqual(summary.order_count, 2)
+        self.assertEqual(summary.lifetime_spend, Decimal("7.50"))
+        latest = Purchase.objects.latest("timestamp")
+        self.assertEqual(summary.last_purchase_at, latest.timestamp)
+        self.assertEqual(
+            list(latest.lines.values_list("name", "quantity")), [("Tea", 1)]
+        )
+
+    def test_history_is_cursor_paginated(self):
+        for _ in range(25):
+            self.buy(1)
+
+        response = self.client.get(reverse("purchase_history"))
+        first_page = response.context["purchases"]
+        self.assertEqual(len(first_page), 20)
+        response = self.client.get(
+            reverse("purchase_history"), {"cursor": response.context["next_cursor"]}
+        )
+        second_page = response.context["purchases"]
+        self.assertEqual(len(second_page), 5)
+        self.assertIsNone(response.context["next_cursor"])
+        ids = [purchase.pk for purchase in first_page + second_page]
+        self.assertEqual(
+            ids,
+            list(
+                Purchase.objects.order_by("-timestamp", "-pk").values_list(
+                    "pk", flat=True
+                )
+            ),
+        )
+
+
+class CheckoutConcurrencyTestCase(TransactionTestCase):
+    def test_invariants_hold_under_contention(self):
+        report = stress.run(users=3, items=2, stock=20, iterations=4, concurrency=6)
+        self.assertEqual(report["violations"], [])
+        self.assertGreater(report["checkouts"], 0)
+
+    def test_out_of_stock_lines_stay_in_cart(self):
+        user = User.objects.create_user("buyer", password="pw")
+        item = Item.objects.create(name="Tea", description="Green", price=1, stock=1)
+        CartItem.objects.create(user=user, item=item, quantity=2)
+        self.client.force_login(user)
+
+        response = self.client.post(reverse("buy"))
+        self.assertContains(response, "Not enough stock of Tea;", status_code=409)
+        self.assertFalse(Purchase.objects.exists())
+        self.assertEqual(CartItem.objects.get().quantity, 2)
+        item.refresh_from_db()
+        self.assertEqual(item.stock, 1)
+
+    def test_lines_in_stock_are_bought_alongside(self):
+        user = User.objects.create_user("buyer", password="pw")
+        tea = Item.objects.create(name="Tea", description="Green", price=1, stock=1)
+        cup = Item.objects.create(name="Cup", description="Blue", price=4, stock=3)
+        CartItem.objects.create(user=user, item=tea, quantity=2)
+        CartItem.objects.create(user=user, item=cup, quantity=1)
+        self.client.force_login(user)
+
+        response = self.client.post(reverse("buy"))
+        self.assertContains(response, "Your order was placed.", status_code=409)
+        self.assertContains(response, "Not enough stock of Tea;", status_code=409)
+        self.assertEqual(
+            list(PurchaseLine.objects.values_list("name", flat=True)), ["Cup"]
+        )
+        self.assertEqual(CartItem.objects.get().item, tea)
+
+
+class SearchIndexTestCase(TestCase):
+    def setUp(self):
+        index.clear()
+        self.addCleanup(index.clear)
+        self.tea = Item.objects.create(
+            name="Green Tea", description="Loose leaf sencha", price=3
+        )
+        self.coffee = Item.objects.create(
+            name="Coffee", description="Dark roast, pairs well with tea cake", price=5
+        )
+
+    def test_index_is_built_by_the_first_search(self):
+        with self.assertNumQueries(0):
+            importlib.reload(importlib.import_module("eshop.wsgi"))
+        self.assertFalse(index.built)
+        self.assertEqual(index.search("coffee"), [self.coffee.pk])
+        self.assertTrue(index.built)
+
+    def test_prefix_and_typo_matches(self):
+        self.assertEqual(index.search("gre"), [self.tea.pk])
+        self.assertEqual(index.search("sench"), [self.tea.pk])
+        self.assertEqual(index.search("cofee"), [self.coffee.pk])
+        # Name matches rank above description matches.
+        self.assertEqual(index.search("tea"), [self.tea.pk, self.coffee.pk])
+        self.assertEqual(index.search("green roast"), [])
+
+    def test_signals_update_a_built_index(self):
+        index.search("tea")
+        self.tea.name = "Black Tea"
+        self.tea.save()
+        self.assertEqual(index.search("black"), [self.tea.pk])
+        self.assertEqual(index.search("green"), [])
+        self.coffee.delete()
+        self.assertEqual(index.search("coffee"), [])
+
+    def test_sync_picks_up_other_processes(self):
+        index.search("tea")
+        # What another process leaves behind when it edits and deletes items.
+        Item.objects.filter(pk=self.tea.pk).update(
+            name="Black Tea", updated_at=timezone.now()
+        )
+        ItemTombstone.objects.create(item_id=self.coffee.pk)
+        with self.assertNumQueries(0):
+            index.refresh()  # Not due yet.
+        index.sync()
+        self.assertEqual(index.search("black"), [self.tea.pk])
+        self.assertEqual(index.search("coffee"), [])
+
+        # Tombstones may have been pruned since a sync this old.
+        index.swept_at -= TOMBSTONE_RETENTION * 2
+        with mock.patch.object(index, "rebuild_in_background") as rebuild:
+            index.sync()
+        rebuild.assert_called_once()
+
+    def test_tombstones_are_pruned_by_command_only(self):
+        old = ItemTombstone.objects.create(item_id=self.coffee.pk)
+        ItemTombstone.objects.filter(pk=old.pk).update(
+            deleted_at=timezone.now() - TOMBSTONE_RETENTION * 2
+        )
+        recent = ItemTombstone.objects.create(item_id=self.tea.pk)
+        index.search("tea")
+        index.sync()
+        self.assertEqual(ItemTombstone.objects.count(), 2)
+
+        out = StringIO()
+        call_command("prune_item_tombstones", stdout=out)
+        self.assertIn("Pruned 1 item tombstones.", out.getvalue())
+        self.assertEqual(list(ItemTombstone.objects.all()), [recent])
+
+    def test_description_cap_keeps_names_only(self):
+        capped = SearchIndex(description_postings=4)
+        with self.assertLogs("store.search", "WARNING"):
+            capped.build()
+        self.assertEqual(capped.search("coffee"), [self.coffee.pk])
+        self.assertEqual(capped.search("green"), [self.tea.pk])
+        self.assertEqual(capped.search("sencha"), [])
+
+    def test_search_view_paginates_through_item_list(self):
+        for number in range(25):
+            Item.objects.create(name=f"Tea blend {number}", description="Tea", price=1)
+        response = self.client.get(reverse("search"), {"q": "tea", "page": 2})
+        self.assertTemplateUsed(response, "store/item_list.html")
+        self.assertEqual(response.context["page_obj"].paginator.count, 27)
+        self.assertEqual(len(response.context["items"]), 7)
+
+        response = self.client.get(reverse("search_suggestions"), {"q": "gree"})
+        self.assertEqual(response.json(), {"suggestions": ["Green Tea"]})
+
+    def test_read_views_may_use_the_replica(self):
+        for name in ("item_list", "search"):
+            self.assertTrue(reads_from_replica(resolve(reverse(name)).func), name)
+        self.assertFalse(reads_from_replica(resolve(reverse("buy")).func))
+
+
+class SeedCommandTestCase(TestCase):
+    def seed(self, prefix):
+        out = StringIO()
+        call_command(
+            "seed",
+            users=20,
+            items=50,
+            purchases=30,
+            seed=3,
+            until="2026-01-31",
+            prefix=prefix,
+            chunk_size=7,
+            stdout=out,
+        )
+        return out.getvalue()
+
+    def test_seed_is_deterministic_and_consistent(self):
+        self.assertIn("rows/sec", self.seed("a"))
+        self.seed("b")
+
+        def rows(prefix):
+            return list(
+                Item.objects.filter(sku__startswith=f"{prefix}-")
+                .order_by("pk")
+                .values_list("name", "price", "stock", "updated_at")
+            )
+
+        self.assertEqual(len(rows("a")), 50)
+        self.assertEqual(rows("a"), rows("b"))
+        self.assertEqual(User.objects.filter(username__startswith="a-").count(), 20)
+        self.assertEqual(Purchase.objects.count(), 60)
+        for purchase in Purchase.objects.prefetch_related("lines"):
+            self.assertEqual(
+                purchase.total, sum(line.subtotal for line in purchase.lines.all())
+            )
+        summary = PurchaseSummary.objects.order_by("-order_count").first()
+        purchases = Purchase.objects.filter(user=summary.user_id)
+        self.assertEqual(summary.order_count, purchases.count())
+        self.assertEqual(
+            summary.last_purchase_at, purchases.order_by("-timestamp")[0].timestamp
+        )
+        self.assertGreater(PurchaseLine.objects.count(), 0)
+
+    def test_existing_prefix_is_refused(self):
+        self.seed("a")
+        with self.assertRaises(CommandError):
+            self.seed("a")
+
+
+class ItemAdminTestCase(TestCase):
+    def setUp(self):
+        self.admin_user = User.objects.create_superuser("admin", password="pw")
+        Item.objects.create(
+            sku="TEA-1", name="Green Tea", description="Sencha", price=3
+        )
+        Item.objects.create(sku="COF-1", name="Coffee", description="Dark", price=5)
+
+    def test_changelist(self):
+        self.client.force_login(self.admin_user)
+        response = self.client.get(reverse("admin:store_item_changelist"))
+        self.assertContains(response, "Green Tea")
+        self.assertContains(response, "Coffee")
+
+    def test_search_uses_the_indexes(self):
+        model_admin = admin.site._registry[Item]
+        request = RequestFactory().get("/")
+        request.user = self.admin_user
+        queryset = model_admin.get_queryset(request)
+        items, _ = model_admin.get_search_results(request, queryset, "tea-1")
+        self.assertEqual([item.name for item in items], ["Green Tea"])
+        plan = items.explain()
+        self.assertIn("item_name_nocase_idx", plan)
+        self.assertIn("item_sku_nocase_idx", plan)
@@ -3,8 +3,11 @@ from . import views
 
 urlpatterns = [
     path("", views.item_list, name="item_list"),
+    path("search/", views.search, name="search"),
+    path("search/suggest/", views.search_suggestions, name="search_suggestions"),
     path("cart/", views.cart_view, name="cart"),
     path("buy/", views.buy_items, name="buy"),
+    path("purchases/", views.purchase_history, name="purchase_history"),
     path("add/<int:item_id>/", views.add_to_cart, name="add_to_cart"),
     path("signup/", views.signup, name="signup"),
 ]
@@ -1,6 +1,16 @@
+from django.core.paginator import Paginator
+from django.http import JsonResponse
 from django.shortcuts import render, redirect, get_object_or_404
-from .models import Item, CartItem, Purchase
+from .models import Item, CartItem, Purchase, PurchaseLine, PurchaseSummary
 from django.contrib.auth.decorators import login_required
+from django.db import transaction
+from django.db.models import F
+
+from .queue import enqueue
+from .search import index
+
+from perftools.pagination import keyset_page
+from perftools.replicas import replica_reads
 
 from django.contrib.auth.forms import UserCreationForm
 from django.contrib.auth import login
@@ -18,18 +28,43 @@ def signup(request):
     return render(request, "registration/signup.html", {"form": form})
 
 
+@replica_reads
 def item_list(request):
     items = Item.objects.all()
     return render(request, "store/item_list.html", {"items": items})
 
 
+@replica_reads
+def search(request):
+    query = request.GET.get("q", "").strip()
+    page = Paginator(index.search(query), 20).get_page(request.GET.get("page"))
+    found = Item.objects.in_bulk(page.object_list)
+    items = [found[pk] for pk in page.object_list if pk in found]
+    return render(
+        request,
+        "store/item_list.html",
+        {"items": items, "page_obj": page, "query": query},
+    )
+
+
+def search_suggestions(request):
+    query = request.GET.get("q", "").strip()
+    return JsonResponse({"suggestions": index.suggest(query)})
+
+
 @login_required
 def add_to_cart(request, item_id):
     item = get_object_or_404(Item, id=item_id)
-    cart_item, created = CartItem.objects.get_or_create(user=request.user, item=item)
-    if not created:
-        cart_item.quantity += 1
-    cart_item.save()
+    while True:
+        cart_item, created = CartItem.objects.get_or_create(
+            user=request.user, item=item
+        )
+        # Increment in SQL so concurrent adds are not lost. Zero rows means a
+        # checkout removed the line in the meantime, so create it again.
+        if created or CartItem.objects.filter(pk=cart_item.pk).update(
+            quantity=F("quantity") + 1
+        ):
+            break
     return redirect("cart")
 
 
@@ -39,11 +74,95 @@ def cart_view(request):
     return render(request, "store/cart.html", {"cart_items": cart_items})
 
 
+# What checkout_line() did with a cart line.
+BOUGHT = "bought"
+GONE = "gone"  # Another checkout bought it first.
+OUT_OF_STOCK = "out_of_stock"
+
+
+def checkout_line(cart_item):
+    """Take one cart line's quantity out of the cart and out of stock."""
+    quantity = cart_item.quantity
+    # Claim the line first so two concurrent checkouts cannot both buy it.
+    if not CartItem.objects.filter(pk=cart_item.pk, quantity__gte=quantity).update(
+        quantity=F("quantity") - quantity
+    ):
+        return GONE
+    if not Item.objects.filter(pk=cart_item.item_id, stock__gte=quantity).update(
+        stock=F("stock") - quantity
+    ):
+        # Out of stock: leave the line in the cart.
+        CartItem.objects.filter(pk=cart_item.pk).update(
+            quantity=F("quantity") + quantity
+        )
+        return OUT_OF_STOCK
+    return BOUGHT
+
+
 @login_required
 def buy_items(request):
-    cart_items = CartItem.objects.filter(user=request.user)
-    if cart_items.exists():
-        purchase = Purchase.objects.create(user=request.user)
-        purchase.items.set(cart_items)
-        cart_items.delete()  # Clear cart
+    # Read the cart before the transaction, which holds SQLite's write lock
+    # from its first statement (transaction_mode IMMEDIATE).
+    cart_items = list(CartItem.objects.filter(user=request.user).select_related("item"))
+    lines = []
+    out_of_stock = []
+    with transaction.atomic():
+        for cart_item in cart_items:
+            outcome = checkout_line(cart_item)
+            if outcome == BOUGHT:
+                lines.append(
+                    PurchaseLine(
+                        item=cart_item.item,
+                        name=cart_item.item.name,
+                        quantity=cart_item.quantity,
+                        price=cart_item.item.price,
+                    )
+                )
+            elif outcome == OUT_OF_STOCK:
+                out_of_stock.append(cart_item.item.name)
+        if lines:
+            purchase = Purchase.objects.create(
+                user=request.user, total=sum(line.subtotal for line in lines)
+            )
+            for line in lines:
+                line.purchase = purchase
+            PurchaseLine.objects.bulk_create(lines)
+            PurchaseSummary.record(purchase)
+            CartItem.objects.filter(user=request.user, quantity=0).delete()
+            # Receipts and other follow-up work run in the task worker.
+            enqueue(
+                "store.send_receipt",
+                {
+                    "purchase_id": purchase.pk,
+                    "user_id": request.user.pk,
+                    "lines": [
+                        (line.name, line.quantity, str(line.price)) for line in lines
+                    ],
+                },
+                key=f"receipt:{purchase.pk}",
+            )
+    if out_of_stock:
+        # The lines in stock were bought; the others stay in the cart.
+        cart_items = CartItem.objects.filter(user=request.user)
+        return render(
+            request,
+            "store/cart.html",
+            {"cart_items": cart_items, "out_of_stock": out_of_stock, "bought": lines},
+            status=409,
+        )
     return redirect("item_list")
+
+
+@login_required
+def purchase_history(request):
+    purchases, next_cursor = keyset_page(
+        Purchase.objects.filter(user=request.user).prefetch_related("lines"),
+        "timestamp",
+        cursor=request.GET.get("cursor"),
+    )
+    summary = PurchaseSummary.objects.filter(user=request.user).first()
+    return render(
+        request,
+        "store/purchase_history.html",
+        {"purchases": purchases, "summary": summary, "next_cursor": next_cursor},
+    )
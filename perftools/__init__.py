@@ -0,0 +1,5 @@
+"""
+Performance tooling shared by the online_store, eshop and smartnotes
+projects. Each project's settings puts the repository root on sys.path so
+this app can be listed in INSTALLED_APPS.
+"""
@@ -0,0 +1,189 @@
+"""
+ModelAdmin parts for changelists over tables with millions of rows.
+
+Django's default changelist counts every row twice per page, once for the
+paginator and once for the unfiltered total, sorts on whichever column was
+clicked, and lists the date hierarchy's years, months or days with a
+DISTINCT over every row. LargeTableAdmin instead:
+
+- counts exactly up to EstimatedCountPaginator.exact_count_limit rows,
+  estimates past that, and skips the unfiltered total and filter facets;
+- defers the ``deferred_fields`` the changelist doesn't show;
+- matches a search as a whole, and sorts and pages at most
+  ``search_limit`` of its matches;
+- finds the date hierarchy's range and periods with one index seek on its
+  field per period listed, outside of searches.
+
+Subclasses should order on an indexed column and keep ``sortable_by`` to
+indexed columns, index the ``date_hierarchy`` field, and search with
+prefix (^) or exact (=) lookups on case-insensitive indexes, e.g.
+``Index(Collate('title', 'NOCASE'))`` on SQLite, so every query of a page
+is an index range scan.
+"""
+import datetime
+import functools
+
+from django.conf import settings
+from django.contrib import admin
+from django.core.paginator import Paginator
+from django.db.models import F, Max, Min
+from django.utils import timezone
+from django.utils.functional import cached_property
+
+
+def estimated_rows(queryset):
+    """
+    The number of rows in the queryset's table, estimated from its highest
+    primary key. Deleted rows make it an overestimate.
+    """
+    highest = queryset.model._default_manager.using(queryset.db).aggregate(highest=Max('pk'))['highest']
+    return highest if isinstance(highest, int) else queryset.count()
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Counts up to ``exact_count_limit`` rows. Past that, an unfiltered list
+    reports the table's estimated size and a filtered one stops counting,
+    so a page costs at most a bounded count.
+    """
+
+    exact_count_limit = 10_000
+
+    @cached_property
+    def count(self):
+        limit = self.exact_count_limit
+        count = self.object_list.order_by()[:limit + 1].count()
+        if count <= limit or self.object_list.query.has_filters():
+            return count
+        return max(count, estimated_rows(self.object_list))
+
+
+def period_start(value, kind):
+    """The start of the year, month or day of a date or naive datetime."""
+    if kind == 'year':
+        value = value.replace(month=1, day=1)
+    elif kind == 'month':
+        value = value.replace(day=1)
+    if isinstance(value, datetime.datetime):
+        value = value.replace(hour=0, minute=0, second=0, microsecond=0)
+    return value
+
+
+def next_period(start, kind):
+    if kind == 'year':
+        return start.replace(year=start.year + 1)
+    if kind == 'month':
+        return start.replace(year=start.year + start.month // 12, month=start.month % 12 + 1)
+    return start + datetime.timedelta(days=1)
+
+
+class IndexedDatesMixin:
+    """
+    The QuerySet methods behind the admin's date hierarchy, answered with
+    index seeks on the date field instead of scans of the whole table.
+    """
+
+    def aggregate(self, *args, **kwargs):
+        # MIN and MAX together in one query defeat SQLite's index lookup
+        # for either.
+        if args or not kwargs or self.query.is_sliced or self.query.distinct or not all(
+            type(aggregate) in (Min, Max) and aggregate.filter is None
+            and isinstance(aggregate.get_source_expressions()[0], F)
+            for aggregate in kwargs.values()
+        ):
+            return super().aggregate(*args, **kwargs)
+        result = {}
+        for name, aggregate in kwargs.items():
+            field = aggregate.get_source_expressions()[0].name
+            ordering = field if isinstance(aggregate, Min) else f'-{field}'
+            values = self.filter(**{f'{field}__isnull': False}).order_by(ordering)
+            result[name] = values.values_list(field, flat=True).first()
+        return result
+
+    def dates(self, field_name, kind, order='ASC'):
+        if kind not in ('year', 'month', 'day'):
+            return super().dates(field_name, kind, order)
+        tzinfo = timezone.get_current_timezone() if settings.USE_TZ else None
+        return self._periods(field_name, kind, order, tzinfo, as_dates=True)
+
+    def datetimes(self, field_name, kind, order='ASC', tzinfo=None):
+        if kind not in ('year', 'month', 'day'):
+            return super().datetimes(field_name, kind, order, tzinfo)
+        if not settings.USE_TZ:
+            tzinfo = None
+        elif tzinfo is None:
+            tzinfo = timezone.get_current_timezone()
+        return self._periods(field_name, kind, order, tzinfo)
+
+    def _periods(self, field_name, kind, order, tzinfo, as_dates=False):
+        """A list of the periods that have rows, one index seek per period."""
+        values = self.order_by(field_name).values_list(field_name, flat=True)
+        periods = []
+        value = values.filter(**{f'{field_name}__isnull': False}).first()
+        while value is not None:
+            if not isinstance(value, datetime.datetime):
+                start = period_start(value, kind)
+                periods.append(start)
+                boundary = next_period(start, kind)
+            else:
+                if tzinfo is not None:
+                    value = timezone.localtime(value, tzinfo).replace(tzinfo=None)
+                start = period_start(value, kind)
+                boundary = next_period(start, kind)
+                if tzinfo is not None:
+                    start, boundary = timezone.make_aware(start, tzinfo), timezone.make_aware(boundary, tzinfo)
+                periods.append(start.date() if as_dates else start)
+            value = values.filter(**{f'{field_name}__gte': boundary}).first()
+        return periods[::-1] if order == 'DESC' else periods
+
+
+@functools.cache
+def indexed_dates_class(queryset_class):
+    return type(f'IndexedDates{queryset_class.__name__}', (IndexedDatesMixin, queryset_class), {})
+
+
+def with_indexed_dates(queryset):
+    if isinstance(queryset, IndexedDatesMixin):
+        return queryset
+    queryset = queryset._chain()
+    queryset.__class__ = indexed_dates_class(type(queryset))
+    return queryset
+
+
+def without_indexed_dates(queryset):
+    if not isinstance(queryset, IndexedDatesMixin):
+        return queryset
+    queryset = queryset._chain()
+    queryset.__class__ = type(queryset).__bases__[1]
+    return queryset
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    show_facets = admin.ShowFacets.NEVER
+    # Columns the changelist never shows; the change form loads them itself.
+    deferred_fields = ()
+    # Matches of a search that are sorted and paged; a short prefix can
+    # match most of the table.
+    search_limit = 5_000
+
+    def get_queryset(self, request):
+        queryset = super().get_queryset(request)
+        if self.deferred_fields:
+            queryset = queryset.defer(*self.deferred_fields)
+        return with_indexed_dates(queryset)
+
+    def get_search_results(self, request, queryset, search_term):
+        search_term = search_term.strip()
+        if not search_term:
+            return super().get_search_results(request, queryset, search_term)
+        # Django matches each word on its own, and with prefix lookups every
+        # word has to start the field. Match the whole search instead.
+        if '"' not in search_term and '\\' not in search_term:
+            search_term = f'"{search_term}"'
+        matches, _ = super().get_search_results(request, queryset, search_term)
+        queryset = queryset.filter(pk__in=matches.order_by().values('pk')[:self.search_limit])
+        # Every seek for a date period would run the search again; a single
+        # pass over the bounded matches is cheaper.
+        return without_indexed_dates(queryset), False
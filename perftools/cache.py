@@ -0,0 +1,27 @@
+"""
+Cache backends that report hits and misses to perftools.metrics.
+
+Use them in CACHES in place of the Django backend of the same name. Reads
+outside a request are not counted. Only get() is instrumented: that covers
+get_many() on backends using BaseCache.get_many, which calls get() per key,
+and a backend with its own get_many() would need to count it too.
+"""
+from django.core.cache.backends.locmem import LocMemCache as BaseLocMemCache
+
+from . import metrics
+
+MISSING = object()
+
+
+class InstrumentedCacheMixin:
+    def get(self, key, default=None, version=None):
+        value = super().get(key, MISSING, version)
+        if value is MISSING:
+            metrics.record_cache(0, 1)
+            return default
+        metrics.record_cache(1, 0)
+        return value
+
+
+class LocMemCache(InstrumentedCacheMixin, BaseLocMemCache):
+    pass
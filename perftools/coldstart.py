@@ -0,0 +1,88 @@
+"""
+Cold-start measurement for a project's WSGI/ASGI entry point.
+
+Each measurement runs a fresh interpreter that imports the entry module,
+which sets Django up, and then loads the URLconf, as a worker does before
+it serves its first request. One more run under ``python -X importtime``
+gives the breakdown of where the import time goes.
+
+The importtime command fails when the median of the import and URLconf
+times exceeds COLD_START_BUDGET_MS, if set.
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+from django.conf import settings
+
+# __import__ rather than importlib.import_module, which -X importtime doesn't see.
+SCRIPT = '''
+import json, sys, time
+start = time.perf_counter()
+__import__(sys.argv[1])
+imported = time.perf_counter()
+from django.urls import get_resolver
+get_resolver().url_patterns
+loaded = time.perf_counter()
+print(json.dumps({"import": imported - start, "urls": loaded - imported, "modules": sorted(sys.modules)}))
+'''
+
+
+def entry_module(entry):
+    """The dotted path of the project's ``wsgi`` or ``asgi`` module."""
+    if entry == 'wsgi' and getattr(settings, 'WSGI_APPLICATION', None):
+        return settings.WSGI_APPLICATION.rpartition('.')[0]
+    return f'{settings.SETTINGS_MODULE.rpartition(".")[0]}.{entry}'
+
+
+def run(module, *options):
+    env = {**os.environ, 'DJANGO_SETTINGS_MODULE': settings.SETTINGS_MODULE, 'PYTHONWARNINGS': 'ignore'}
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, *options, '-c', SCRIPT, module],
+        cwd=settings.BASE_DIR, env=env, capture_output=True, text=True, check=True,
+    )
+    elapsed = time.perf_counter() - start
+    return elapsed, json.loads(result.stdout.splitlines()[-1]), result.stderr
+
+
+def measure(entry='wsgi', runs=5):
+    """
+    Return the median times, in seconds, of ``runs`` cold starts: ``process``
+    from spawning the interpreter to a loaded URLconf, ``import`` for the
+    entry module and ``urls`` for the URLconf. ``modules`` lists the modules
+    loaded by then.
+    """
+    module = entry_module(entry)
+    samples = [run(module) for _ in range(runs)]
+    return {
+        'module': module,
+        'process': statistics.median(elapsed for elapsed, _, _ in samples),
+        'import': statistics.median(data['import'] for _, data, _ in samples),
+        'urls': statistics.median(data['urls'] for _, data, _ in samples),
+        'modules': samples[-1][1]['modules'],
+    }
+
+
+def import_times(entry='wsgi'):
+    """Return ``{module: (self µs, cumulative µs)}`` from one run under -X importtime."""
+    _, _, stderr = run(entry_module(entry), '-X', 'importtime')
+    times = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_time, cumulative, name = line[len('import time:'):].split('|')
+        times[name.strip()] = (int(self_time), int(cumulative))
+    return times
+
+
+def by_package(times):
+    """Total self time per top-level package, in µs."""
+    totals = defaultdict(int)
+    for name, (self_time, _) in times.items():
+        totals[name.partition('.')[0]] += self_time
+    return dict(totals)
@@ -0,0 +1,45 @@
+"""
+Views that are imported on their first request rather than when the URLconf
+loads, so a worker can boot without the modules behind its heavier routes.
+"""
+from django.utils.module_loading import import_string
+
+
+class LazyView:
+    """
+    Stands in for the view at dotted ``path`` in a URLconf. Class-based views
+    are built with ``as_view(**initkwargs)``. Attributes that middleware reads
+    off views, such as ``csrf_exempt``, are taken from the real view, which
+    imports it on first access. Those the resolver reads when reverse() first
+    runs are not: ``__module__`` and ``__name__`` come from ``path``, and
+    ``view_class`` is only there once the view has been imported.
+    """
+
+    def __init__(self, path, **initkwargs):
+        self.path = path
+        self.__module__, _, self.__name__ = path.rpartition('.')
+        self.__qualname__ = self.__name__
+        self.initkwargs = initkwargs
+        self._view = None
+
+    @property
+    def view(self):
+        if self._view is None:
+            view = import_string(self.path)
+            self._view = view.as_view(**self.initkwargs) if hasattr(view, 'as_view') else view
+        return self._view
+
+    def __call__(self, request, *args, **kwargs):
+        return self.view(request, *args, **kwargs)
+
+    def __getattr__(self, name):
+        # Only reached for attributes the instance doesn't have. Leave other
+        # dunder lookups (copy, pickle) alone.
+        if name.startswith('__') and name != '__wrapped__':
+            raise AttributeError(name)
+        if name == 'view_class' and self._view is None:
+            raise AttributeError(name)
+        return getattr(self.view, name)
+
+    def __repr__(self):
+        return f'<LazyView {self.path}>'
@@ -0,0 +1,85 @@
+import statistics
+import time
+
+from django.contrib import admin
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.models import Max
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from perftools.admin import LargeTableAdmin
+
+
+class Command(BaseCommand):
+    help = (
+        'Time admin changelists as a superuser: the first page, drilldowns into the '
+        'latest year and month of the date hierarchy, and any --query given.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'models', nargs='*', metavar='app_label.ModelName',
+            help='Default: every model registered with a LargeTableAdmin.',
+        )
+        parser.add_argument(
+            '--query', action='append', default=[],
+            help='A query string to time as well, e.g. "q=abc". Repeatable.',
+        )
+        parser.add_argument('--runs', type=int, default=5, help='Requests to take the median of.')
+        parser.add_argument('--budget', type=float, help='Fail when a median exceeds this many ms.')
+
+    def handle(self, *args, **options):
+        if options['runs'] < 1:
+            raise CommandError('--runs must be at least 1.')
+        registry = {
+            model._meta.label_lower: model_admin for model, model_admin in admin.site._registry.items()
+        }
+        if options['models']:
+            try:
+                admins = [registry[label.lower()] for label in options['models']]
+            except KeyError as e:
+                raise CommandError(f'{e.args[0]} is not registered with the admin.')
+        else:
+            admins = [model_admin for model_admin in registry.values() if isinstance(model_admin, LargeTableAdmin)]
+        user = get_user_model()(is_active=True, is_staff=True, is_superuser=True)
+
+        slowest = 0.0
+        for model_admin in admins:
+            self.stdout.write(self.style.MIGRATE_HEADING(model_admin.model._meta.label))
+            for query in self.queries(model_admin, user) + options['query']:
+                elapsed, queries = self.time(model_admin, user, query, options['runs'])
+                slowest = max(slowest, elapsed)
+                self.stdout.write(f'  {elapsed * 1000:7.1f}ms {queries:3} queries  ?{query}')
+        if options['budget'] is not None and slowest * 1000 > options['budget']:
+            raise CommandError(f'Slowest changelist took {slowest * 1000:.0f}ms, over {options["budget"]:.0f}ms.')
+
+    def queries(self, model_admin, user):
+        queries = ['']
+        field = model_admin.date_hierarchy
+        if field:
+            request = RequestFactory().get('/')
+            request.user = user
+            latest = model_admin.get_queryset(request).aggregate(latest=Max(field))['latest']
+            if latest is not None:
+                if timezone.is_aware(latest):
+                    latest = timezone.localtime(latest)
+                queries.append(f'{field}__year={latest.year}')
+                queries.append(f'{field}__year={latest.year}&{field}__month={latest.month}')
+        return queries
+
+    def time(self, model_admin, user, query, runs):
+        samples = []
+        for _ in range(runs):
+            request = RequestFactory().get(f'/admin/changelist/?{query}')
+            request.user = user
+            with CaptureQueriesContext(connections[DEFAULT_DB_ALIAS]) as captured:
+                start = time.perf_counter()
+                response = model_admin.changelist_view(request)
+                response.render()
+                samples.append(time.perf_counter() - start)
+            if response.status_code != 200:
+                raise CommandError(f'?{query} answered {response.status_code}.')
+        return statistics.median(samples), len(captured)
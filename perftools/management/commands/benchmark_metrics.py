@@ -0,0 +1,53 @@
+import time
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.http import HttpResponse
+from django.test import RequestFactory
+from django.urls import ResolverMatch
+
+from perftools import metrics
+
+
+class Command(BaseCommand):
+    help = 'Measure the per-request overhead of MetricsMiddleware.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=20000)
+        parser.add_argument('--queries', type=int, default=2, help='SQL queries run by the benchmark view.')
+
+    def handle(self, *args, **options):
+        def view(request):
+            with connection.cursor() as cursor:
+                for _ in range(options['queries']):
+                    cursor.execute('SELECT 1')
+            cache.get('benchmark')
+            return HttpResponse()
+
+        request = RequestFactory().get('/benchmark/')
+        request.resolver_match = ResolverMatch(view, (), {}, url_name='benchmark')
+        dump_interval = metrics.registry.dump_interval
+        metrics.registry.dump_interval = float('inf')  # Keep the benchmark out of METRICS_DIR.
+        try:
+            bare = self.time(view, request, options['requests'])
+            # Created afterwards, as it installs the query timer on the connection.
+            middleware = metrics.MetricsMiddleware(view)
+            measured = self.time(middleware, request, options['requests'])
+        finally:
+            metrics.registry.dump_interval = dump_interval
+            metrics.registry.clear()
+        self.stdout.write(
+            f'{options["requests"]:,} requests with {options["queries"]} queries each: '
+            f'{bare * 1e6:.1f}µs bare, {measured * 1e6:.1f}µs with metrics'
+        )
+        self.stdout.write(self.style.SUCCESS(f'Overhead: {(measured - bare) * 1e6:.1f}µs per request'))
+
+    def time(self, handler, request, count):
+        best = float('inf')
+        for _ in range(3):
+            start = time.perf_counter()
+            for _ in range(count):
+                handler(request)
+            best = min(best, (time.perf_counter() - start) / count)
+        return best
@@ -0,0 +1,137 @@
+import os
+import random
+import sqlite3
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import closing
+
+from django.core.management.base import BaseCommand, CommandError
+
+from perftools import replicas
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare the throughput of a mixed read/write SQLite workload with every '
+        'query on one database file against reads on a replica copied by the '
+        'backup API, as sync_replica does.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=50_000)
+        parser.add_argument('--readers', type=int, default=4, help='Processes reading list pages.')
+        parser.add_argument('--writers', type=int, default=2, help='Processes writing single rows.')
+        parser.add_argument(
+            '--write-rate', type=float, default=200.0, help='Writes per second, across the writers.'
+        )
+        parser.add_argument('--seconds', type=float, default=3.0, help='Duration of each run.')
+        parser.add_argument(
+            '--sync-interval', type=float, default=1.0, help='Seconds between replica copies.'
+        )
+
+    def handle(self, *args, **options):
+        if options['rows'] < 1 or options['readers'] < 1 or options['writers'] < 1:
+            raise CommandError('--rows, --readers and --writers must be at least 1.')
+        if options['write_rate'] <= 0:
+            raise CommandError('--write-rate must be positive.')
+        with tempfile.TemporaryDirectory() as directory:
+            primary = os.path.join(directory, 'primary.sqlite3')
+            replica = os.path.join(directory, 'replica.sqlite3')
+            self.create(primary, options['rows'])
+            replicas.sync(primary, replica)
+            results = {
+                'primary only': self.run(primary, primary, None, options),
+                'replica reads': self.run(primary, replica, options['sync_interval'], options),
+            }
+        for label, result in results.items():
+            line = (
+                f'{label:>13}: {result["reads"]:9,.0f} reads/s {result["writes"]:7,.0f} writes/s, '
+                f'write p95 {result["write_p95"] * 1000:.1f}ms'
+            )
+            if result['copies']:
+                line += f' ({result["copies"]} copies)'
+            self.stdout.write(line)
+        primary, replica = results.values()
+        self.stdout.write(self.style.SUCCESS(f'Replica reads: x{replica["reads"] / primary["reads"]:.2f} read throughput'))
+
+    def create(self, path, rows):
+        with closing(sqlite3.connect(path)) as db:
+            db.execute('CREATE TABLE item (id INTEGER PRIMARY KEY, name TEXT, price INTEGER, stock INTEGER)')
+            db.executemany(
+                'INSERT INTO item (name, price, stock) VALUES (?, ?, ?)',
+                ((f'Item {n}', n % 1000, 100) for n in range(rows)),
+            )
+            db.commit()
+
+    def run(self, primary, read_from, sync_interval, options):
+        # Processes rather than threads, like the workers of an app server,
+        # so the GIL doesn't decide who gets to run.
+        start = time.time() + 0.5  # Past the workers' startup.
+        until = start + options['seconds']
+        jobs = [(read_pages, read_from, options['rows'], start, until, n) for n in range(options['readers'])]
+        interval = options['writers'] / options['write_rate']
+        jobs += [
+            (write_rows, primary, options['rows'], start, until, -n, interval)
+            for n in range(1, options['writers'] + 1)
+        ]
+        if sync_interval is not None:
+            jobs.append((copy_replica, primary, read_from, start, until, sync_interval))
+        with ProcessPoolExecutor(len(jobs)) as pool:
+            futures = [pool.submit(*job) for job in jobs]
+            totals = {'read': 0, 'write': 0, 'sync': 0}
+            latencies = []
+            for future in futures:
+                kind, done, times = future.result()
+                totals[kind] += done
+                latencies += times
+        latencies.sort()
+        return {
+            'reads': totals['read'] / options['seconds'],
+            'writes': totals['write'] / options['seconds'],
+            'write_p95': latencies[int(len(latencies) * 0.95)] if latencies else 0.0,
+            'copies': totals['sync'],
+        }
+
+
+def wait_until(moment):
+    time.sleep(max(moment - time.time(), 0))
+
+
+def read_pages(path, rows, start, until, seed):
+    rng = random.Random(seed)
+    done = 0
+    with closing(sqlite3.connect(path, timeout=30, isolation_level=None)) as db:
+        wait_until(start)
+        while time.time() < until:
+            # A page of a catalog list.
+            db.execute(
+                'SELECT id, name, price FROM item WHERE id > ? ORDER BY id LIMIT 20', (rng.randrange(rows),)
+            ).fetchall()
+            done += 1
+    return 'read', done, []
+
+
+def write_rows(path, rows, start, until, seed, interval):
+    # Writes arrive at a fixed rate, as orders and likes do, rather than as
+    # fast as the database takes them; latency counts from when one was due.
+    rng = random.Random(seed)
+    latencies = []
+    with closing(sqlite3.connect(path, timeout=30, isolation_level=None)) as db:
+        due = start + rng.random() * interval
+        while due < until:
+            wait_until(due)
+            db.execute('UPDATE item SET stock = stock - 1 WHERE id = ?', (rng.randrange(1, rows + 1),))
+            latencies.append(time.time() - due)
+            due += interval
+    return 'write', len(latencies), latencies
+
+
+def copy_replica(primary, replica, start, until, interval):
+    copies = 0
+    wait_until(start)
+    while time.time() + interval < until:
+        time.sleep(interval)
+        replicas.sync(primary, replica)
+        copies += 1
+    return 'sync', copies, []
@@ -0,0 +1,125 @@
+import os
+import random
+import sqlite3
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import closing
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, OperationalError, connections, transaction
+from django.db.utils import load_backend
+
+from perftools import sqlite
+
+ALIAS = 'benchmark'
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare checkout-like write throughput on Django's bare SQLite configuration "
+        'against the perftools.sqlite profile, with readers running alongside.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10_000)
+        parser.add_argument('--writers', type=int, default=4, help='Processes running write transactions.')
+        parser.add_argument('--readers', type=int, default=2, help='Processes reading list pages.')
+        parser.add_argument('--seconds', type=float, default=3.0, help='Duration of each run.')
+
+    def handle(self, *args, **options):
+        if options['rows'] < 1 or options['writers'] < 1 or options['readers'] < 0:
+            raise CommandError('--rows and --writers must be at least 1, --readers at least 0.')
+        profiles = {
+            # What the projects used before: rollback journal, DEFERRED
+            # transactions, a 5s busy timeout and a connection per request.
+            'bare': {'OPTIONS': {}, 'CONN_MAX_AGE': 0, 'CONN_HEALTH_CHECKS': False},
+            'perftools.sqlite': {},
+        }
+        results = {}
+        with tempfile.TemporaryDirectory() as directory:
+            for label, overrides in profiles.items():
+                path = os.path.join(directory, f'{len(results)}.sqlite3')
+                self.create(path, options['rows'])
+                results[label] = self.run(sqlite.database(path, **overrides), options)
+        for label, result in results.items():
+            self.stdout.write(
+                f'{label:>16}: {result["writes"]:7,.0f} writes/s (p95 {result["write_p95"] * 1000:.1f}ms, '
+                f'{result["errors"]} "database is locked"), {result["reads"]:8,.0f} reads/s'
+            )
+        bare, tuned = results.values()
+        self.stdout.write(self.style.SUCCESS(f'Write throughput: x{tuned["writes"] / max(bare["writes"], 1):.2f}'))
+
+    def create(self, path, rows):
+        with closing(sqlite3.connect(path)) as db:
+            db.execute('CREATE TABLE item (id INTEGER PRIMARY KEY, name TEXT, price INTEGER, stock INTEGER)')
+            db.execute('CREATE TABLE sale (id INTEGER PRIMARY KEY, item_id INTEGER, price INTEGER, at REAL)')
+            db.executemany(
+                'INSERT INTO item (name, price, stock) VALUES (?, ?, ?)',
+                ((f'Item {n}', n % 1000, 1_000_000) for n in range(rows)),
+            )
+            db.commit()
+
+    def run(self, settings_dict, options):
+        # Processes, as the workers of an app server, each with its own
+        # connections opened by Django's backend with the profile's settings.
+        start = time.time() + 0.5  # Past the workers' startup.
+        until = start + options['seconds']
+        jobs = [('write', n) for n in range(options['writers'])]
+        jobs += [('read', -n) for n in range(1, options['readers'] + 1)]
+        totals = {'write': 0, 'read': 0}
+        errors = 0
+        latencies = []
+        with ProcessPoolExecutor(len(jobs)) as pool:
+            futures = [
+                pool.submit(work, kind, settings_dict, options['rows'], start, until, seed) for kind, seed in jobs
+            ]
+            for (kind, _), future in zip(jobs, futures):
+                done, failed, times = future.result()
+                totals[kind] += done
+                errors += failed
+                if kind == 'write':
+                    latencies += times
+        latencies.sort()
+        return {
+            'writes': totals['write'] / options['seconds'],
+            'reads': totals['read'] / options['seconds'],
+            'write_p95': latencies[int(len(latencies) * 0.95)] if latencies else 0.0,
+            'errors': errors,
+        }
+
+
+def work(kind, settings_dict, rows, start, until, seed):
+    """Run requests of one ``kind`` until ``until``; return (done, failed, latencies)."""
+    settings_dict = {**connections.settings[DEFAULT_DB_ALIAS], 'TEST': {}, **settings_dict}
+    connection = load_backend(settings_dict['ENGINE']).DatabaseWrapper(settings_dict, ALIAS)
+    connections[ALIAS] = connection  # For transaction.atomic(using=ALIAS).
+    rng = random.Random(seed)
+    failed = 0
+    latencies = []
+    time.sleep(max(start - time.time(), 0))
+    while time.time() < until:
+        began = time.time()
+        try:
+            if kind == 'write':
+                # A checkout: read the stock, take one off it, record the sale.
+                with transaction.atomic(using=ALIAS), connection.cursor() as cursor:
+                    item = rng.randrange(1, rows + 1)
+                    cursor.execute('SELECT price, stock FROM item WHERE id = %s', [item])
+                    price, stock = cursor.fetchone()
+                    cursor.execute('UPDATE item SET stock = %s WHERE id = %s', [stock - 1, item])
+                    cursor.execute('INSERT INTO sale (item_id, price, at) VALUES (%s, %s, %s)', [item, price, began])
+            else:
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        'SELECT id, name, price FROM item WHERE id > %s ORDER BY id LIMIT 20', [rng.randrange(rows)]
+                    )
+                    cursor.fetchall()
+            latencies.append(time.time() - began)
+        except OperationalError:
+            failed += 1
+        finally:
+            # What Django does when a request finishes.
+            connection.close_if_unusable_or_obsolete()
+    connection.close()
+    return len(latencies), failed, latencies
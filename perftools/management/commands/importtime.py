@@ -0,0 +1,50 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from perftools import coldstart
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure the cold start of this project's WSGI or ASGI entry point, up to a "
+        'loaded URLconf, and break the import time down by package and module.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--entry', choices=['wsgi', 'asgi'], default='wsgi')
+        parser.add_argument('--runs', type=int, default=5, help='Cold starts to take the median of.')
+        parser.add_argument('--top', type=int, default=15, help='Packages and modules listed.')
+        parser.add_argument(
+            '--budget', type=float,
+            help='Fail when the median in-process load time exceeds this many ms '
+                 '(default: settings.COLD_START_BUDGET_MS).',
+        )
+
+    def handle(self, *args, **options):
+        if options['runs'] < 1:
+            raise CommandError('--runs must be at least 1.')
+        result = coldstart.measure(options['entry'], options['runs'])
+        load = (result['import'] + result['urls']) * 1000
+        self.stdout.write(self.style.MIGRATE_HEADING(f'{result["module"]} (median of {options["runs"]} runs)'))
+        self.stdout.write(
+            f'  process start to URLconf loaded: {result["process"] * 1000:.0f}ms\n'
+            f'  import {result["module"]}: {result["import"] * 1000:.0f}ms\n'
+            f'  load URLconf: {result["urls"] * 1000:.0f}ms\n'
+            f'  modules loaded: {len(result["modules"])}'
+        )
+
+        times = coldstart.import_times(options['entry'])
+        self.stdout.write(self.style.MIGRATE_HEADING('Import time by package (self, -X importtime)'))
+        packages = sorted(coldstart.by_package(times).items(), key=lambda item: -item[1])
+        for package, total in packages[:options['top']]:
+            self.stdout.write(f'  {total / 1000:8.1f}ms  {package}')
+        self.stdout.write(self.style.MIGRATE_HEADING('Slowest modules (cumulative)'))
+        modules = sorted(times.items(), key=lambda item: -item[1][1])
+        for name, (self_time, cumulative) in modules[:options['top']]:
+            self.stdout.write(f'  {cumulative / 1000:8.1f}ms  {name} (self {self_time / 1000:.1f}ms)')
+
+        budget = options['budget'] or getattr(settings, 'COLD_START_BUDGET_MS', None)
+        if budget is not None:
+            if load > budget:
+                raise CommandError(f'Cold start took {load:.0f}ms, over the {budget:.0f}ms budget.')
+            self.stdout.write(self.style.SUCCESS(f'Cold start {load:.0f}ms, within the {budget:.0f}ms budget.'))
@@ -0,0 +1,69 @@
+import io
+import pstats
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand, CommandError
+
+from perftools import profiling
+
+
+class Profile:
+    """Hands a stored stats dict to pstats.Stats, which expects a profiler."""
+
+    def __init__(self, stats):
+        self.stats = stats
+
+    def create_stats(self):
+        pass
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(int(len(values) * fraction), len(values) - 1)]
+
+
+class Command(BaseCommand):
+    help = 'Aggregate the profiles written by ProfilingMiddleware into per-view hot-function reports.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dir', help='Profile directory (default: settings.PROFILING_DIR).')
+        parser.add_argument('--view', help='Only report views whose name contains this.')
+        parser.add_argument('--sort', default='cumulative', choices=['cumulative', 'tottime', 'calls'])
+        parser.add_argument('--limit', type=int, default=15, help='Functions shown per view.')
+        parser.add_argument('--queries', type=int, default=5, help='SQL statements shown per view.')
+
+    def handle(self, *args, **options):
+        views = defaultdict(lambda: {'durations': [], 'queries': defaultdict(lambda: [0, 0.0]), 'stats': None})
+        for record in profiling.read_profiles(options['dir']):
+            if options['view'] and options['view'] not in record['view']:
+                continue
+            view = views[record['view']]
+            view['durations'].append(record['duration'])
+            for sql, (count, seconds) in record['queries'].items():
+                view['queries'][sql][0] += count
+                view['queries'][sql][1] += seconds
+            if view['stats'] is None:
+                view['stats'] = pstats.Stats(Profile(record['stats']))
+            else:
+                view['stats'].add(Profile(record['stats']))
+        if not views:
+            raise CommandError('No profiles found.')
+
+        # Slowest views first, by total time spent in them.
+        for name, view in sorted(views.items(), key=lambda item: -sum(item[1]['durations'])):
+            durations = view['durations']
+            query_count = sum(count for count, _ in view['queries'].values())
+            query_time = sum(seconds for _, seconds in view['queries'].values())
+            self.stdout.write(self.style.MIGRATE_HEADING(f'{name}'))
+            self.stdout.write(
+                f'{len(durations)} requests, mean {sum(durations) / len(durations) * 1000:.1f}ms, '
+                f'p95 {percentile(durations, 0.95) * 1000:.1f}ms, '
+                f'{query_count / len(durations):.1f} queries / {query_time / len(durations) * 1000:.1f}ms SQL per request'
+            )
+            slowest = sorted(view['queries'].items(), key=lambda item: -item[1][1])[:options['queries']]
+            for sql, (count, seconds) in slowest:
+                self.stdout.write(f'  {seconds * 1000:9.1f}ms {count:6}x  {sql[:160]}')
+            output = io.StringIO()
+            view['stats'].stream = output
+            view['stats'].strip_dirs().sort_stats(options['sort']).print_stats(options['limit'])
+            self.stdout.write(output.getvalue())
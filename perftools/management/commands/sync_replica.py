@@ -0,0 +1,34 @@
+import time
+
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS
+
+from perftools import replicas
+
+
+class Command(BaseCommand):
+    help = (
+        'Copy the primary SQLite database onto the replica file with the backup API, '
+        'once or every --interval seconds.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, help='Keep copying, every this many seconds.')
+
+    def handle(self, *args, **options):
+        alias = replicas.replica_alias()
+        if alias is None:
+            raise CommandError('No replica database is configured (settings.REPLICA_DATABASE).')
+        try:
+            source, target = replicas.sqlite_path(DEFAULT_DB_ALIAS), replicas.sqlite_path(alias)
+        except ImproperlyConfigured as e:
+            raise CommandError(e)
+        if source == target:
+            raise CommandError(f"Database '{alias}' is the primary itself.")
+        while True:
+            elapsed = replicas.sync(source, target)
+            self.stdout.write(f'Copied {source} to {target} in {elapsed * 1000:.0f}ms')
+            if options['interval'] is None:
+                break
+            time.sleep(max(options['interval'] - elapsed, 0))
@@ -0,0 +1,244 @@
+"""
+Per-view runtime metrics in the Prometheus text format.
+
+MetricsMiddleware records, per resolved URL name, a latency histogram,
+response counts by status class, the number and time of SQL queries and
+the cache hits and misses seen through perftools.cache backends.
+
+Each process keeps its counters in a fixed-size list per view, updated
+under a lock held for a handful of additions. Every METRICS_DUMP_INTERVAL
+seconds (5) a process writes its counters to its own file in METRICS_DIR,
+which the worker processes of a host share and which should differ per
+project; the metrics view merges the files of all processes when it is
+scraped. Files not rewritten for METRICS_STALE_SECONDS (an hour) are
+those of stopped processes and are removed. Routes without a name are
+recorded under their view's dotted path, and unresolved requests under
+"<unresolved>", so the number of series stays bounded by the URLconf.
+
+Scrapes must send "Authorization: Bearer <METRICS_TOKEN>". Without a
+token the metrics are only served while DEBUG is on.
+"""
+import atexit
+import json
+import os
+import tempfile
+import threading
+import time
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+from .profiling import view_name
+
+# Upper bounds of the latency histogram buckets, in seconds.
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STATUSES = ('1xx', '2xx', '3xx', '4xx', '5xx')
+# Layout of a view's counter list.
+BUCKET = 0
+SUM = BUCKET + len(BUCKETS) + 1  # The last bucket is +Inf.
+COUNT = SUM + 1
+STATUS = COUNT + 1
+QUERIES = STATUS + len(STATUSES)
+QUERY_SECONDS = QUERIES + 1
+CACHE_HITS = QUERY_SECONDS + 1
+CACHE_MISSES = CACHE_HITS + 1
+SIZE = CACHE_MISSES + 1
+
+
+def metrics_dir():
+    return os.fspath(getattr(settings, 'METRICS_DIR', os.path.join(tempfile.gettempdir(), 'django-metrics')))
+
+
+class RequestState(threading.local):
+    """Counters of the request running in the current thread, if any."""
+
+    active = False
+    queries = 0
+    query_seconds = 0.0
+    cache_hits = 0
+    cache_misses = 0
+
+
+state = RequestState()
+
+
+def query_timer(execute, sql, params, many, context):
+    if not state.active:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        state.queries += 1
+        state.query_seconds += time.perf_counter() - start
+
+
+def install_query_timer(connection, **kwargs):
+    # Kept first in the list, as execute_wrapper() blocks pop the last one
+    # when they exit, and the connection may be opened inside one.
+    if query_timer not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, query_timer)
+
+
+def record_cache(hits, misses):
+    """Called by perftools.cache backends."""
+    if state.active:
+        state.cache_hits += hits
+        state.cache_misses += misses
+
+
+class Registry:
+    def __init__(self, dump_interval=None):
+        if dump_interval is None:
+            dump_interval = getattr(settings, 'METRICS_DUMP_INTERVAL', 5)
+        self.dump_interval = dump_interval
+        self.lock = threading.Lock()
+        self.views = {}  # view name -> counter list laid out as above
+        self.dumped_at = time.monotonic()
+
+    def record(self, view, duration, status, queries, query_seconds, cache_hits, cache_misses):
+        bucket = 0
+        while bucket < len(BUCKETS) and duration > BUCKETS[bucket]:
+            bucket += 1
+        with self.lock:
+            counters = self.views.get(view)
+            if counters is None:
+                counters = self.views[view] = [0] * SIZE
+            counters[BUCKET + bucket] += 1
+            counters[SUM] += duration
+            counters[COUNT] += 1
+            counters[STATUS + min(max(status // 100, 1), 5) - 1] += 1
+            counters[QUERIES] += queries
+            counters[QUERY_SECONDS] += query_seconds
+            counters[CACHE_HITS] += cache_hits
+            counters[CACHE_MISSES] += cache_misses
+        if time.monotonic() - self.dumped_at >= self.dump_interval:
+            self.dump()
+
+    def snapshot(self):
+        with self.lock:
+            return {view: list(counters) for view, counters in self.views.items()}
+
+    def dump(self, directory=None):
+        """Write this process's counters to its file in ``directory``."""
+        self.dumped_at = time.monotonic()
+        directory = directory or metrics_dir()
+        os.makedirs(directory, exist_ok=True)
+        # Threads may dump at once: each writes its own temporary file, and
+        # collect() skips them, as they don't end in .json.
+        fd, temporary = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w') as file:
+                json.dump(self.snapshot(), file)
+            os.replace(temporary, os.path.join(directory, f'{os.getpid()}.json'))
+        except BaseException:
+            os.remove(temporary)
+            raise
+
+    def clear(self):
+        with self.lock:
+            self.views.clear()
+
+
+registry = Registry()
+atexit.register(lambda: registry.views and registry.dump())
+
+
+def collect(directory=None, stale_seconds=None):
+    """Merge the counters dumped by every live process."""
+    directory = directory or metrics_dir()
+    if stale_seconds is None:
+        stale_seconds = getattr(settings, 'METRICS_STALE_SECONDS', 3600)
+    views = {}
+    try:
+        names = os.listdir(directory)
+    except FileNotFoundError:
+        return views
+    for name in names:
+        if not name.endswith('.json'):
+            continue
+        path = os.path.join(directory, name)
+        try:
+            if time.time() - os.path.getmtime(path) > stale_seconds:
+                os.remove(path)
+                continue
+            with open(path) as file:
+                snapshot = json.load(file)
+        except (OSError, ValueError):
+            continue  # Removed or replaced while reading.
+        for view, counters in snapshot.items():
+            if len(counters) != SIZE:
+                continue  # Written with another layout.
+            merged = views.setdefault(view, [0] * SIZE)
+            for index, value in enumerate(counters):
+                merged[index] += value
+    return views
+
+
+def escape_label(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def render(views):
+    """Format merged counters in the Prometheus text exposition format."""
+    lines = []
+
+    def family(name, kind, help, samples):
+        lines.append(f'# HELP {name} {help}')
+        lines.append(f'# TYPE {name} {kind}')
+        lines.extend(samples)
+
+    labels = {view: f'view="{escape_label(view)}"' for view in views}
+    ordered = sorted(views.items())
+    histogram = []
+    for view, counters in ordered:
+        cumulative = 0
+        for index, bound in enumerate(BUCKETS + ('+Inf',)):
+            cumulative += counters[BUCKET + index]
+            histogram.append(f'django_request_duration_seconds_bucket{{{labels[view]},le="{bound}"}} {cumulative}')
+        histogram.append(f'django_request_duration_seconds_sum{{{labels[view]}}} {counters[SUM]}')
+        histogram.append(f'django_request_duration_seconds_count{{{labels[view]}}} {counters[COUNT]}')
+    family('django_request_duration_seconds', 'histogram', 'Request latency by view.', histogram)
+    family('django_responses_total', 'counter', 'Responses by view and status class.', [
+        f'django_responses_total{{{labels[view]},status="{status}"}} {counters[STATUS + index]}'
+        for view, counters in ordered
+        for index, status in enumerate(STATUSES)
+        if counters[STATUS + index]
+    ])
+    for name, index, help in (
+        ('django_db_queries_total', QUERIES, 'SQL queries run by view.'),
+        ('django_db_query_seconds_total', QUERY_SECONDS, 'Time spent in SQL queries by view.'),
+        ('django_cache_hits_total', CACHE_HITS, 'Cache hits by view.'),
+        ('django_cache_misses_total', CACHE_MISSES, 'Cache misses by view.'),
+    ):
+        family(name, 'counter', help, [f'{name}{{{labels[view]}}} {counters[index]}' for view, counters in ordered])
+    return '\n'.join(lines) + '\n'
+
+
+class MetricsMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+        # Time queries on every connection opened from now on, and on those
+        # already open in this thread, without a wrapper block per request.
+        connection_created.connect(install_query_timer)
+        for connection in connections.all(initialized_only=True):
+            install_query_timer(connection)
+
+    def __call__(self, request):
+        state.active = True
+        state.queries = state.cache_hits = state.cache_misses = 0
+        state.query_seconds = 0.0
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+            status = response.status_code
+            return response
+        except Exception:
+            status = 500
+            raise
+        finally:
+            state.active = False
+            registry.record(
+                view_name(request), time.perf_counter() - start, status,
+                state.queries, state.query_seconds, state.cache_hits, state.cache_misses,
+            )
@@ -0,0 +1,49 @@
+"""
+Keyset ("cursor") pagination for newest-first listings.
+
+Unlike OFFSET pagination, fetching a page costs the same no matter how deep
+it is: the cursor is the sort key of the last row shown, a timestamp and
+the primary key, and the next page is read from the index starting just
+after it.
+"""
+import base64
+import binascii
+from datetime import datetime
+
+from django.db.models import Q
+
+
+def encode_cursor(timestamp, pk):
+    raw = f'{timestamp.isoformat()}|{pk}'.encode()
+    return base64.urlsafe_b64encode(raw).decode()
+
+
+def decode_cursor(cursor):
+    """Return ``(timestamp, pk)`` for a cursor, or None if it is malformed."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        timestamp, pk = raw.split('|')
+        return datetime.fromisoformat(timestamp), int(pk)
+    except (binascii.Error, UnicodeError, ValueError):
+        return None
+
+
+def keyset_page(queryset, field, cursor=None, page_size=20):
+    """
+    Return one page of ``queryset`` ordered by ``-field, -pk`` and the cursor
+    of the next page (None on the last page).
+    """
+    queryset = queryset.order_by(f'-{field}', '-pk')
+    position = decode_cursor(cursor) if cursor else None
+    if position is not None:
+        timestamp, pk = position
+        queryset = queryset.filter(
+            Q(**{f'{field}__lt': timestamp}) | Q(**{field: timestamp, 'pk__lt': pk})
+        )
+    rows = list(queryset[:page_size + 1])
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        last = rows[-1]
+        next_cursor = encode_cursor(getattr(last, field), last.pk)
+    return rows, next_cursor
@@ -0,0 +1,151 @@
+"""
+Sampling request profiler.
+
+ProfilingMiddleware runs a sample of requests under cProfile and times the
+SQL they execute. A request is profiled when:
+
+* a random draw falls under PROFILING_SAMPLE_RATE (0, the default,
+  disables sampling), or
+* it carries the PROFILING_HEADER header (X-Profile) with the value of
+  PROFILING_HEADER_TOKEN. The header is ignored while no token is set, so
+  clients can't switch profiling on unless they have been given the token.
+
+Each profile is written to PROFILING_DIR (BASE_DIR/profiles) as one
+zlib-compressed marshal file holding the request metadata, its SQL timings
+aggregated per statement and the cProfile stats. Only the
+PROFILING_MAX_FILES (500) newest files are kept. The profile_report
+command aggregates them per view.
+
+Requests that are not profiled pay one random draw and a header lookup.
+"""
+import cProfile
+import marshal
+import os
+import random
+import secrets
+import time
+import zlib
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+SUFFIX = '.prof'
+
+
+def sample_rate():
+    return getattr(settings, 'PROFILING_SAMPLE_RATE', 0.0)
+
+
+def profile_dir():
+    return os.fspath(getattr(settings, 'PROFILING_DIR', os.path.join(settings.BASE_DIR, 'profiles')))
+
+
+def max_files():
+    return getattr(settings, 'PROFILING_MAX_FILES', 500)
+
+
+class QueryTimer:
+    """A connection.execute_wrapper that totals time per SQL statement."""
+
+    def __init__(self):
+        self.queries = {}  # sql -> [count, seconds]
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            entry = self.queries.setdefault(sql, [0, 0.0])
+            entry[0] += 1
+            entry[1] += time.perf_counter() - start
+
+
+def should_profile(request):
+    token = getattr(settings, 'PROFILING_HEADER_TOKEN', '')
+    if token:
+        value = request.headers.get(getattr(settings, 'PROFILING_HEADER', 'X-Profile'))
+        if value is not None and secrets.compare_digest(value.encode(), token.encode()):
+            return True
+    rate = sample_rate()
+    return rate > 0 and random.random() < rate
+
+
+def view_name(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return '<unresolved>'
+    return match.view_name or match._func_path
+
+
+def write_profile(record, directory=None, keep=None):
+    """Write one profile record and drop the oldest files past the retention limit."""
+    directory = directory or profile_dir()
+    keep = max_files() if keep is None else keep
+    os.makedirs(directory, exist_ok=True)
+    # Names start with the time in microseconds, so they sort oldest first.
+    name = f'{time.time_ns() // 1000:017d}-{os.getpid()}{SUFFIX}'
+    path = os.path.join(directory, name)
+    with open(path + '.tmp', 'wb') as file:
+        file.write(zlib.compress(marshal.dumps(record)))
+    os.replace(path + '.tmp', path)
+    names = profile_names(directory)
+    for old in names[:max(len(names) - keep, 0)]:
+        try:
+            os.remove(os.path.join(directory, old))
+        except FileNotFoundError:
+            pass  # Removed by another worker.
+    return path
+
+
+def profile_names(directory):
+    try:
+        return sorted(name for name in os.listdir(directory) if name.endswith(SUFFIX))
+    except FileNotFoundError:
+        return []
+
+
+def read_profiles(directory=None):
+    """Yield the profile records in ``directory``, oldest first."""
+    directory = directory or profile_dir()
+    for name in profile_names(directory):
+        try:
+            with open(os.path.join(directory, name), 'rb') as file:
+                yield marshal.loads(zlib.decompress(file.read()))
+        except (OSError, ValueError, EOFError, zlib.error):
+            continue  # Removed while reading, or truncated.
+
+
+class ProfilingMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not should_profile(request):
+            return self.get_response(request)
+
+        timer = QueryTimer()
+        profiler = cProfile.Profile()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(timer))
+            start = time.perf_counter()
+            profiler.enable()
+            try:
+                response = self.get_response(request)
+            finally:
+                profiler.disable()
+            duration = time.perf_counter() - start
+
+        profiler.create_stats()
+        write_profile({
+            'view': view_name(request),
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'time': time.time(),
+            'duration': duration,
+            'queries': timer.queries,
+            'stats': profiler.stats,
+        })
+        return response
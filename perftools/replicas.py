@@ -0,0 +1,159 @@
+"""
+Read replica routing with read-your-writes.
+
+ReplicaRouter sends reads to the REPLICA_DATABASE alias ('replica') only
+inside requests that ReplicaMiddleware has let onto the replica: GET and
+HEAD requests to views marked with @replica_reads. Every other read, and
+every write, uses the primary. Reads inside a transaction on the primary
+stay on it, and so does the rest of a request once it has written.
+
+A request that writes sets the REPLICA_PIN_COOKIE cookie (primary_pin),
+which keeps that client's reads on the primary for REPLICA_PIN_SECONDS
+(10), so users see their own changes even though the replica lags behind.
+The window must be longer than the replica's lag, for SQLite the interval
+between sync_replica runs.
+
+With SQLite the replica is a second database file, refreshed from the
+primary with the backup API by the sync_replica command. Until the replica
+file exists, reads fall back to the primary.
+"""
+import contextvars
+import os
+import sqlite3
+import time
+from contextlib import closing
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import DEFAULT_DB_ALIAS, connections
+
+_routing = contextvars.ContextVar('replica_routing', default=None)
+# Replica aliases known to be there; they don't go away once they are.
+_available = set()
+
+
+def replica_alias():
+    alias = getattr(settings, 'REPLICA_DATABASE', 'replica')
+    return alias if alias in settings.DATABASES else None
+
+
+def pin_cookie():
+    return getattr(settings, 'REPLICA_PIN_COOKIE', 'primary_pin')
+
+
+def pin_seconds():
+    return getattr(settings, 'REPLICA_PIN_SECONDS', 10)
+
+
+def available(alias):
+    """Whether the replica ``alias`` can be read, i.e. its SQLite file exists."""
+    if alias in _available:
+        return True
+    connection = connections[alias]
+    if connection.vendor == 'sqlite' and not connection.is_in_memory_db():
+        if not os.path.exists(connection.settings_dict['NAME']):
+            return False
+    _available.add(alias)
+    return True
+
+
+def replica_reads(view):
+    """Mark a view function or class as safe to serve from the replica."""
+    view.replica_reads = True
+    return view
+
+
+def reads_from_replica(view_func):
+    return bool(
+        getattr(view_func, 'replica_reads', False)
+        or getattr(getattr(view_func, 'view_class', None), 'replica_reads', False)
+    )
+
+
+class Routing:
+    """Routing state of the request running in the current context."""
+
+    def __init__(self, pinned):
+        self.pinned = pinned
+        self.replica = False
+        self.wrote = False
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        routing = _routing.get()
+        if routing is None or not routing.replica:
+            return None
+        instance = hints.get('instance')
+        if instance is not None and instance._state.db:
+            return None  # Related objects come from where the instance did.
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return None
+        alias = replica_alias()
+        return alias if alias and available(alias) else None
+
+    def db_for_write(self, model, **hints):
+        routing = _routing.get()
+        if routing is not None:
+            routing.replica = False
+            routing.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        aliases = {DEFAULT_DB_ALIAS, replica_alias()}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # The replica gets its schema from the primary's copy.
+        if db == replica_alias():
+            return False
+        return None
+
+
+class ReplicaMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        routing = Routing(pinned=pin_cookie() in request.COOKIES)
+        token = _routing.set(routing)
+        try:
+            response = self.get_response(request)
+        finally:
+            _routing.reset(token)
+        if routing.wrote:
+            response.set_cookie(
+                pin_cookie(), '1', max_age=pin_seconds(), httponly=True, samesite='Lax',
+                secure=settings.SESSION_COOKIE_SECURE,
+            )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        routing = _routing.get()
+        if (
+            routing is not None and not routing.pinned and not routing.wrote
+            and request.method in ('GET', 'HEAD') and reads_from_replica(view_func)
+        ):
+            routing.replica = True
+
+
+def sqlite_path(alias):
+    connection = connections[alias]
+    if connection.vendor != 'sqlite' or connection.is_in_memory_db():
+        raise ImproperlyConfigured(f"Database '{alias}' is not an SQLite database file.")
+    return os.fspath(connection.settings_dict['NAME'])
+
+
+def sync(source, target, timeout=30):
+    """
+    Copy the SQLite database ``source`` onto ``target`` with the backup API
+    and return the seconds it took. The copy is a consistent snapshot; writers
+    to the source and readers of the target wait for it, up to ``timeout``.
+    """
+    start = time.perf_counter()
+    with closing(sqlite3.connect(source, timeout=timeout)) as src:
+        with closing(sqlite3.connect(target, timeout=timeout)) as dst:
+            src.backup(dst)
+    return time.perf_counter() - start
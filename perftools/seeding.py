@@ -0,0 +1,197 @@
+"""
+Helpers for the projects' ``seed`` commands, which fill a database with
+synthetic rows for performance testing.
+
+Rows are generated by a random.Random seeded from the command line, against
+a fixed end date, so the same arguments always produce the same data. They
+are written with bulk_create one chunk per transaction, inside bulk_load(),
+which relaxes SQLite's durability settings for the duration of the load.
+"""
+import math
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from itertools import islice
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import CommandError
+from django.db import connections, transaction
+
+WORDS = (
+    'alpha amber anchor apple arrow atlas autumn bamboo basic beacon berry blade bloom bolt breeze bright '
+    'bronze cactus canvas carbon cedar charm citrus classic cloud cobalt comet compact copper coral cosmic '
+    'crystal daily delta desert dream drift eagle echo ember emerald epic falcon feather fern fiesta flame '
+    'flash forest fossil frost galaxy garden giant glacier globe golden granite harbor harvest hazel horizon '
+    'indigo iron island ivory jade jasmine jungle kinetic lagoon lemon lunar magnet maple marble meadow metro '
+    'mint mosaic nebula noble nova oasis ocean olive onyx orbit orchid pacific panda pearl pepper pixel '
+    'planet polar prime quartz quest radiant rapid raven river rocket royal ruby sage sapphire scarlet '
+    'shadow sierra silver solar spark spice spring steel stone storm summit sunset swift tango thunder '
+    'tidal timber topaz tropic tulip turbo ultra urban valley velvet vintage violet vista wave willow '
+    'winter wonder zen zephyr'
+).split()
+
+
+def words(rng, count):
+    return ' '.join(rng.choices(WORDS, k=count))
+
+
+def between(rng, low, high):
+    """A random integer in [low, high]; cheaper than randint() in generation loops."""
+    return low + int(rng.random() * (high - low + 1))
+
+
+def sentence(rng, low=6, high=16):
+    text = words(rng, between(rng, low, high))
+    return f'{text[0].upper()}{text[1:]}.'
+
+
+def paragraph(rng, low=2, high=6):
+    lengths = [between(rng, 6, 16) for _ in range(between(rng, low, high))]
+    tokens = rng.choices(WORDS, k=sum(lengths))
+    sentences = []
+    start = 0
+    for length in lengths:
+        text = ' '.join(tokens[start:start + length])
+        sentences.append(f'{text[0].upper()}{text[1:]}.')
+        start += length
+    return ' '.join(sentences)
+
+
+def lognormal_price(rng, median, sigma=1.0, low=0.5, high=50_000):
+    """Prices are right-skewed: most are near ``median``, a few are much higher."""
+    return round(min(max(rng.lognormvariate(math.log(median), sigma), low), high), 2)
+
+
+def zipf_index(rng, count, exponent=1.1):
+    """An index in range(count), where low indexes are far more likely (popular products, power users)."""
+    # Inverse transform of a continuous power law, truncated to count.
+    u = rng.random()
+    if exponent == 1:
+        return min(int(count ** u) - 1, count - 1)
+    a = 1 - exponent
+    return min(int((1 + u * ((count + 1) ** a - 1)) ** (1 / a)) - 1, count - 1)
+
+
+def moment(rng, end, days):
+    """A time in the ``days`` before ``end``, more recent ones being more likely."""
+    return end - timedelta(days=days * rng.random() ** 2, seconds=rng.randrange(86400))
+
+
+def end_of(date):
+    """The fixed end of the seeded time range: midnight UTC after ``date`` (YYYY-MM-DD)."""
+    if date is None:
+        return datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+    return datetime.fromisoformat(date).replace(tzinfo=timezone.utc) + timedelta(days=1)
+
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+@contextmanager
+def bulk_load(using='default'):
+    """
+    Relax SQLite's durability for a bulk load: no fsync, an in-memory
+    rollback journal (databases in WAL mode keep it) and a large page cache.
+    A crash during the load can corrupt the database, which is fine for
+    throwaway test data. Other backends, and loads inside a transaction,
+    where SQLite refuses these changes, are left alone.
+    """
+    connection = connections[using]
+    if connection.vendor != 'sqlite' or connection.in_atomic_block:
+        yield
+        return
+    with connection.cursor() as cursor:
+        saved = {}
+        for pragma in ('synchronous', 'journal_mode', 'cache_size', 'temp_store'):
+            cursor.execute(f'PRAGMA {pragma}')
+            saved[pragma] = cursor.fetchone()[0]
+        cursor.execute('PRAGMA synchronous = OFF')
+        if saved['journal_mode'] != 'wal':
+            cursor.execute('PRAGMA journal_mode = MEMORY')
+        cursor.execute('PRAGMA cache_size = -262144')  # 256MB
+        cursor.execute('PRAGMA temp_store = MEMORY')
+    try:
+        yield
+    finally:
+        with connection.cursor() as cursor:
+            for pragma, value in saved.items():
+                cursor.execute(f'PRAGMA {pragma} = {value}')
+
+
+@contextmanager
+def preserve_dates(*models):
+    """Keep the auto_now and auto_now_add fields of ``models`` from overwriting seeded dates."""
+    fields = [
+        (field, field.auto_now, field.auto_now_add)
+        for model in models
+        for field in model._meta.concrete_fields
+        if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False)
+    ]
+    for field, _, _ in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in fields:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+def users(rng, count, end, prefix='seed', password='password'):
+    """
+    Yield ``count`` unsaved users named ``<prefix>-<n>``. They share one
+    password hash, as hashing a password per user would dominate the load.
+    """
+    if User.objects.filter(username__startswith=f'{prefix}-').exists():
+        raise CommandError(f'Users named {prefix}-* already exist; pass another --prefix.')
+    hashed = make_password(password)
+    for number in range(count):
+        first, last = words(rng, 2).title().split()
+        yield User(
+            username=f'{prefix}-{number:07d}',
+            first_name=first,
+            last_name=last,
+            email=f'{prefix}-{number:07d}@example.com',
+            password=hashed,
+            date_joined=moment(rng, end, 730),
+        )
+
+
+class Loader:
+    """Bulk-creates objects in chunks, one transaction each, and reports rows/sec."""
+
+    def __init__(self, stdout, chunk_size=10_000, using='default'):
+        self.stdout = stdout
+        self.chunk_size = chunk_size
+        self.using = using
+        self.rows = 0
+        self.started = time.perf_counter()
+
+    def load(self, model, objects, after_chunk=None):
+        """
+        Save ``objects`` and return how many there were. ``after_chunk`` is
+        called with each saved chunk, in its transaction, and may return the
+        number of related rows it created for it.
+        """
+        label = model._meta.label
+        count = 0
+        start = time.perf_counter()
+        for chunk in chunked(objects, self.chunk_size):
+            with transaction.atomic(using=self.using):
+                model.objects.using(self.using).bulk_create(chunk)
+                if after_chunk is not None:
+                    count += after_chunk(chunk) or 0
+            count += len(chunk)
+            elapsed = max(time.perf_counter() - start, 1e-9)
+            self.stdout.write(f'{label}: {count:,} rows ({count / elapsed:,.0f} rows/sec)', ending='\r')
+        elapsed = max(time.perf_counter() - start, 1e-9)
+        self.stdout.write(f'{label}: {count:,} rows in {elapsed:.1f}s ({count / elapsed:,.0f} rows/sec)')
+        self.rows += count
+        return count
+
+    def summary(self):
+        elapsed = max(time.perf_counter() - self.started, 1e-9)
+        return f'Seeded {self.rows:,} rows in {elapsed:.1f}s ({self.rows / elapsed:,.0f} rows/sec).'
@@ -0,0 +1,438 @@
+import datetime
+import json
+import os
+import sqlite3
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import StringIO
+from unittest import mock
+
+from django.contrib import admin
+from django.contrib.admin.templatetags.admin_list import date_hierarchy
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import connection, connections, router
+from django.http import HttpResponse
+from django.db.models import Max, Min
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLResolver, path
+from django.urls.resolvers import RegexPattern
+
+from . import coldstart, metrics, pagination, profiling, replicas, sqlite
+from .admin import EstimatedCountPaginator, LargeTableAdmin, with_indexed_dates
+from .lazy import LazyView
+from .replicas import replica_reads
+from .views import metrics_view
+
+
+def users_view(request):
+    return HttpResponse(str(User.objects.count()))
+
+
+def cached_view(request):
+    cache.get_many(['perftools:a', 'perftools:b'])
+    return HttpResponse()
+
+
+def routed_view(request):
+    if request.method == 'POST' or 'write' in request.GET:
+        router.db_for_write(User)
+    return HttpResponse(router.db_for_read(User))
+
+
+urlpatterns = [
+    path('users/', users_view, name='users'),
+    path('cached/', cached_view, name='cached'),
+    path('routed/', routed_view, name='routed'),
+    path('replica/', replica_reads(lambda request: routed_view(request)), name='replica'),
+    path('metrics', metrics_view, name='metrics'),
+]
+
+
+@override_settings(ROOT_URLCONF=__name__, PROFILING_SAMPLE_RATE=0.0, PROFILING_HEADER_TOKEN='s3cret')
+class ProfilingMiddlewareTestCase(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        patcher = override_settings(
+            PROFILING_DIR=self.directory,
+            PROFILING_MAX_FILES=3,
+            MIDDLEWARE=['perftools.profiling.ProfilingMiddleware'],
+        )
+        patcher.enable()
+        self.addCleanup(patcher.disable)
+
+    def test_only_sampled_or_trusted_requests_are_profiled(self):
+        self.client.get('/users/')
+        self.client.get('/users/', headers={'X-Profile': 'guess'})
+        self.assertEqual(profiling.profile_names(self.directory), [])
+
+        self.client.get('/users/', headers={'X-Profile': 's3cret'})
+        with override_settings(PROFILING_SAMPLE_RATE=1.0):
+            self.client.get('/users/')
+        records = list(profiling.read_profiles(self.directory))
+        self.assertEqual(len(records), 2)
+        self.assertEqual(records[0]['view'], 'users')
+        self.assertEqual(records[0]['status'], 200)
+        [(sql, (count, seconds))] = records[0]['queries'].items()
+        self.assertIn('COUNT(*)', sql)
+        self.assertEqual(count, 1)
+        self.assertTrue(any(function == 'users_view' for _, _, function in records[0]['stats']))
+
+    def test_header_is_ignored_without_a_token(self):
+        with override_settings(PROFILING_HEADER_TOKEN=''):
+            self.client.get('/users/', headers={'X-Profile': ''})
+        self.assertEqual(profiling.profile_names(self.directory), [])
+
+    def test_retention_and_report(self):
+        with override_settings(PROFILING_SAMPLE_RATE=1.0):
+            for _ in range(5):
+                self.client.get('/users/')
+        self.assertEqual(len(profiling.profile_names(self.directory)), 3)
+
+        out = StringIO()
+        call_command('profile_report', limit=5, stdout=out)
+        report = out.getvalue()
+        self.assertIn('users\n3 requests', report)
+        self.assertIn('COUNT(*)', report)
+        self.assertIn('users_view', report)
+
+    def test_unreadable_files_are_skipped(self):
+        with open(os.path.join(self.directory, f'0-1{profiling.SUFFIX}'), 'wb') as file:
+            file.write(b'truncated')
+        with mock.patch.object(profiling, 'sample_rate', return_value=1.0):
+            self.client.get('/users/')
+        self.assertEqual(len(list(profiling.read_profiles(self.directory))), 1)
+
+
+@override_settings(
+    ROOT_URLCONF=__name__,
+    MIDDLEWARE=['perftools.metrics.MetricsMiddleware'],
+    CACHES={'default': {'BACKEND': 'perftools.cache.LocMemCache'}},
+    METRICS_TOKEN='s3cret',
+)
+class MetricsTestCase(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        patcher = override_settings(METRICS_DIR=self.directory)
+        patcher.enable()
+        self.addCleanup(patcher.disable)
+        self.registry = metrics.Registry(dump_interval=float('inf'))
+        patcher = mock.patch.object(metrics, 'registry', self.registry)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_requests_are_recorded_per_view(self):
+        self.client.get('/users/')
+        self.client.get('/users/')
+        cache.set('perftools:a', 1)
+        self.client.get('/cached/')
+        self.client.get('/missing/')
+
+        views = self.registry.snapshot()
+        self.assertEqual(views['users'][metrics.COUNT], 2)
+        self.assertEqual(views['users'][metrics.QUERIES], 2)
+        self.assertEqual(views['users'][metrics.STATUS + 1], 2)
+        self.assertEqual(views['cached'][metrics.CACHE_HITS], 1)
+        self.assertEqual(views['cached'][metrics.CACHE_MISSES], 1)
+        self.assertEqual(views['<unresolved>'][metrics.STATUS + 3], 1)
+        # Queries outside a request are not counted.
+        User.objects.count()
+        self.assertEqual(self.registry.snapshot()['users'][metrics.QUERIES], 2)
+
+    def test_endpoint_merges_every_process(self):
+        self.client.get('/users/')
+        counters = [0] * metrics.SIZE
+        counters[metrics.BUCKET] = counters[metrics.COUNT] = counters[metrics.STATUS + 1] = 3
+        with open(os.path.join(self.directory, '1.json'), 'w') as file:
+            json.dump({'users': counters, 'other "view"': counters}, file)
+        with open(os.path.join(self.directory, '2.json'), 'w') as file:
+            json.dump({'users': counters}, file)
+        os.utime(os.path.join(self.directory, '2.json'), (time.time() - 7200,) * 2)
+
+        response = self.client.get('/metrics', headers={'Authorization': 'Bearer s3cret'})
+        self.assertEqual(response['Content-Type'], 'text/plain; version=0.0.4; charset=utf-8')
+        body = response.content.decode()
+        self.assertIn('# TYPE django_request_duration_seconds histogram', body)
+        self.assertIn('django_request_duration_seconds_count{view="users"} 4\n', body)
+        self.assertIn('django_request_duration_seconds_bucket{view="users",le="+Inf"} 4\n', body)
+        self.assertIn('django_responses_total{view="users",status="2xx"} 4\n', body)
+        self.assertIn('django_db_queries_total{view="users"} 1\n', body)
+        self.assertIn('view="other \\"view\\""', body)
+        self.assertFalse(os.path.exists(os.path.join(self.directory, '2.json')))
+
+    def test_endpoint_token(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 403)
+        self.assertEqual(self.client.get('/metrics', headers={'Authorization': 'Bearer wrong'}).status_code, 403)
+        with override_settings(METRICS_TOKEN=''):
+            self.assertEqual(self.client.get('/metrics').status_code, 403)
+            with override_settings(DEBUG=True):
+                self.assertEqual(self.client.get('/metrics').status_code, 200)
+
+    def test_concurrent_dumps(self):
+        self.client.get('/users/')
+        with ThreadPoolExecutor(8) as pool:
+            list(pool.map(lambda _: self.registry.dump(), range(64)))  # Re-raises their errors.
+        self.assertEqual(os.listdir(self.directory), [f'{os.getpid()}.json'])
+        self.assertEqual(metrics.collect()['users'][metrics.COUNT], 1)
+
+    def test_benchmark_command(self):
+        out = StringIO()
+        call_command('benchmark_metrics', requests=200, stdout=out)
+        self.assertIn('Overhead:', out.getvalue())
+        self.assertEqual(os.listdir(self.directory), [])
+
+
+class LazyViewTestCase(SimpleTestCase):
+    def test_view_is_imported_on_first_use(self):
+        view = LazyView('django.views.generic.RedirectView', url='/users/')
+        self.assertIsNone(view._view)
+        response = view(RequestFactory().get('/'))
+        self.assertEqual(response['Location'], '/users/')
+        self.assertEqual(view.view_class.__name__, 'RedirectView')
+
+    def test_view_attributes_are_those_of_the_real_view(self):
+        view = LazyView('perftools.tests.users_view')
+        self.assertEqual(view.__name__, 'users_view')
+        self.assertFalse(hasattr(view, 'csrf_exempt'))
+        with self.assertRaises(AttributeError):
+            view.__deepcopy__
+
+    def test_reverse_does_not_import_the_view(self):
+        view = LazyView('perftools.tests.users_view')
+        resolver = URLResolver(RegexPattern(r'^/'), [
+            path('lazy/', view, name='lazy'),
+            path('users/', users_view, name='users'),
+        ])
+        with mock.patch('perftools.lazy.import_string') as import_string:
+            self.assertEqual(resolver.reverse('users'), 'users/')
+            self.assertEqual(resolver.reverse('lazy'), 'lazy/')
+        import_string.assert_not_called()
+        self.assertEqual(resolver.url_patterns[0].lookup_str, 'perftools.tests.users_view')
+        self.assertFalse(hasattr(view, 'view_class'))
+
+
+class ColdStartTestCase(SimpleTestCase):
+    def measured(self):
+        """Fix the measurements: 300ms to import the entry point, 150ms for the URLconf."""
+        result = {'module': 'project.wsgi', 'process': 0.6, 'import': 0.3, 'urls': 0.15, 'modules': ['django']}
+        for name, value in (('measure', result), ('import_times', {'django.db': (900, 4000)})):
+            patcher = mock.patch.object(coldstart, name, return_value=value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_importtime_fails_over_budget(self):
+        self.measured()
+        with override_settings(COLD_START_BUDGET_MS=400):
+            with self.assertRaisesMessage(CommandError, 'Cold start took 450ms, over the 400ms budget.'):
+                call_command('importtime', runs=1, stdout=StringIO())
+        with self.assertRaisesMessage(CommandError, 'over the 440ms budget'):
+            call_command('importtime', runs=1, budget=440, stdout=StringIO())
+
+    def test_importtime_within_budget(self):
+        self.measured()
+        out = StringIO()
+        with override_settings(COLD_START_BUDGET_MS=500):
+            call_command('importtime', runs=1, stdout=out)
+        self.assertIn('Cold start 450ms, within the 500ms budget.', out.getvalue())
+        self.assertIn('django.db (self 0.9ms)', out.getvalue())
+
+    def test_import_breakdown(self):
+        times = coldstart.import_times()
+        self.assertIn(coldstart.entry_module('wsgi'), times)
+        self.assertGreater(coldstart.by_package(times)['django'], 0)
+
+
+@override_settings(ROOT_URLCONF=__name__, REPLICA_DATABASE='replica', REPLICA_PIN_COOKIE='pin', REPLICA_PIN_SECONDS=7)
+class ReplicaTestCase(SimpleTestCase):
+    def setUp(self):
+        patcher = mock.patch.object(replicas, 'available', return_value=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_marked_views_read_from_the_replica(self):
+        self.assertEqual(self.client.get('/replica/').content, b'replica')
+        self.assertEqual(self.client.head('/replica/').status_code, 200)
+        self.assertEqual(self.client.get('/routed/').content, b'default')
+        self.assertEqual(router.db_for_read(User), 'default')  # Outside requests
+
+    def test_writes_pin_the_client_to_the_primary(self):
+        response = self.client.post('/replica/')
+        self.assertEqual(response.content, b'default')
+        self.assertEqual(response.cookies['pin']['max-age'], 7)
+        # The client sends the cookie back until it expires.
+        self.assertEqual(self.client.get('/replica/').content, b'default')
+        self.client.cookies.clear()
+        self.assertEqual(self.client.get('/replica/').content, b'replica')
+
+    def test_reads_after_a_write_use_the_primary(self):
+        response = self.client.get('/replica/?write=1')
+        self.assertEqual(response.content, b'default')
+        self.assertIn('pin', response.cookies)
+        self.assertNotIn('pin', self.client.get('/replica/').cookies)
+
+    def test_transactions_read_from_the_primary(self):
+        with mock.patch.object(connections['default'], 'in_atomic_block', True):
+            self.assertEqual(self.client.get('/replica/').content, b'default')
+
+    def test_replica_is_never_migrated(self):
+        self.assertIs(router.allow_migrate('replica', 'auth'), False)
+        self.assertIs(router.allow_migrate('default', 'auth'), True)
+
+    def test_missing_replica_file(self):
+        mock.patch.stopall()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        name = os.path.join(directory.name, 'replica.sqlite3')
+        with mock.patch.dict(connections['replica'].settings_dict, NAME=name), \
+                mock.patch.object(replicas, '_available', set()):
+            self.assertFalse(replicas.available('replica'))
+            self.assertEqual(self.client.get('/replica/').content, b'default')
+            open(name, 'w').close()
+            self.assertTrue(replicas.available('replica'))
+
+    def test_sync(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        primary, replica = (os.path.join(directory.name, name) for name in ('primary', 'replica'))
+        with sqlite3.connect(primary) as db:
+            db.execute('CREATE TABLE item (id INTEGER PRIMARY KEY)')
+            db.executemany('INSERT INTO item VALUES (?)', [(1,), (2,)])
+        db.close()
+        replicas.sync(primary, replica)
+        with sqlite3.connect(replica) as db:
+            self.assertEqual(db.execute('SELECT COUNT(*) FROM item').fetchone(), (2,))
+        db.close()
+        with mock.patch.object(replicas, 'replica_alias', return_value=None), self.assertRaises(CommandError):
+            call_command('sync_replica', stdout=StringIO())
+
+    def test_benchmark_command(self):
+        out = StringIO()
+        call_command(
+            'benchmark_replica', rows=100, readers=1, writers=1, seconds=0.3, sync_interval=0.1,
+            write_rate=50, stdout=out,
+        )
+        self.assertIn('Replica reads: x', out.getvalue())
+
+
+class KeysetPaginationTestCase(TestCase):
+    def test_pages_follow_the_cursor(self):
+        joined = datetime.datetime(2026, 1, 1, tzinfo=datetime.timezone.utc)
+        users = [User.objects.create(username=f'user{number}', date_joined=joined) for number in range(5)]
+        pages = []
+        cursor = None
+        while True:
+            rows, cursor = pagination.keyset_page(User.objects.all(), 'date_joined', cursor, page_size=2)
+            pages.append([user.username for user in rows])
+            if cursor is None:
+                break
+        self.assertEqual(pages, [[user.username for user in users[::-1][start:start + 2]] for start in (0, 2, 4)])
+
+    def test_malformed_cursor_starts_over(self):
+        self.assertIsNone(pagination.decode_cursor('not a cursor'))
+        self.assertIsNone(pagination.decode_cursor(pagination.encode_cursor(datetime.date.today(), 'x')))
+
+
+class SqliteProfileTestCase(TestCase):
+    def test_options(self):
+        options = sqlite.options(timeout=3, synchronous='FULL', mmap_size=None)
+        self.assertEqual(options['timeout'], 3)
+        self.assertEqual(options['transaction_mode'], 'IMMEDIATE')
+        self.assertIn('PRAGMA synchronous=FULL', options['init_command'])
+        self.assertIn('PRAGMA journal_mode=WAL', options['init_command'])
+        self.assertNotIn('mmap_size', options['init_command'])
+        self.assertEqual(sqlite.database('db', CONN_MAX_AGE=0)['CONN_MAX_AGE'], 0)
+
+    def test_connections_use_the_profile(self):
+        self.assertEqual(connection.settings_dict['OPTIONS']['transaction_mode'], 'IMMEDIATE')
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA synchronous')
+            self.assertEqual(cursor.fetchone(), (1,))  # NORMAL
+            cursor.execute('PRAGMA cache_size')
+            self.assertEqual(cursor.fetchone(), (-20_000,))
+
+    def test_benchmark_command(self):
+        out = StringIO()
+        call_command('benchmark_sqlite', rows=100, writers=2, readers=1, seconds=0.3, stdout=out)
+        self.assertIn('Write throughput: x', out.getvalue())
+
+
+class UserAdmin(LargeTableAdmin):
+    list_display = ('username', 'date_joined')
+    date_hierarchy = 'date_joined'
+    ordering = ('-date_joined',)
+    search_fields = ('^username',)
+    deferred_fields = ('password',)
+
+
+@override_settings(TIME_ZONE='Europe/Athens')
+class LargeTableAdminTestCase(TestCase):
+    def setUp(self):
+        joined = [(2024, 12, 31, 23), (2025, 1, 1, 12), (2025, 1, 3, 8), (2025, 3, 1, 0), (2026, 6, 5, 9)]
+        for number, (year, month, day, hour) in enumerate(joined):
+            User.objects.create(
+                username=f'user{number}',
+                date_joined=datetime.datetime(year, month, day, hour, tzinfo=datetime.timezone.utc),
+            )
+        self.request = RequestFactory().get('/')
+        self.request.user = User(is_active=True, is_staff=True, is_superuser=True)
+
+    def test_dates_match_the_queryset_ones(self):
+        users = User.objects.all()
+        indexed = with_indexed_dates(users)
+        for kind in ('year', 'month', 'day'):
+            for order in ('ASC', 'DESC'):
+                self.assertEqual(
+                    indexed.datetimes('date_joined', kind, order), list(users.datetimes('date_joined', kind, order))
+                )
+        in_2025 = users.filter(date_joined__year=2025)
+        self.assertEqual(with_indexed_dates(in_2025).dates('date_joined', 'month'), list(in_2025.dates('date_joined', 'month')))
+        bounds = {'first': Min('date_joined'), 'last': Max('date_joined')}
+        self.assertEqual(indexed.aggregate(**bounds), users.aggregate(**bounds))
+
+    def test_count_is_bounded(self):
+        users = User.objects.order_by('pk')
+        self.assertEqual(EstimatedCountPaginator(users, 2).count, 5)
+        with mock.patch.object(EstimatedCountPaginator, 'exact_count_limit', 3):
+            User.objects.filter(username='user1').delete()
+            # The highest primary key, deleted rows included.
+            self.assertEqual(EstimatedCountPaginator(users, 2).count, User.objects.aggregate(Max('pk'))['pk__max'])
+            self.assertEqual(EstimatedCountPaginator(users.filter(is_active=True), 2).count, 4)
+
+    def test_changelist(self):
+        model_admin = UserAdmin(User, admin.site)
+        request = RequestFactory().get('/', {'date_joined__year': 2025})
+        request.user = self.request.user
+        with CaptureQueriesContext(connection) as queries:
+            response = model_admin.changelist_view(request)
+            response.render()
+        self.assertContains(response, 'user2')
+        self.assertNotContains(response, 'user4')
+        self.assertFalse(any('"password"' in query['sql'] for query in queries))
+        self.assertFalse(any('COUNT(' in query['sql'] and 'LIMIT' not in query['sql'] for query in queries))
+        # 2024-12-31 23:00 UTC is in January 2025 in Athens.
+        choices = date_hierarchy(response.context_data['cl'])['choices']
+        self.assertEqual([choice['title'] for choice in choices], ['January 2025', 'March 2025'])
+
+    def test_search(self):
+        User.objects.create(username='jane doe', date_joined=datetime.datetime(2026, 1, 1, tzinfo=datetime.timezone.utc))
+        model_admin = UserAdmin(User, admin.site)
+        users, may_have_duplicates = model_admin.get_search_results(self.request, User.objects.all(), ' jane doe ')
+        self.assertEqual([user.username for user in users], ['jane doe'])
+        self.assertFalse(may_have_duplicates)
+        with mock.patch.object(UserAdmin, 'search_limit', 2):
+            users, _ = model_admin.get_search_results(self.request, User.objects.order_by('-pk'), 'user')
+            self.assertEqual(len(users), 2)
+            self.assertTrue(all(user.username.startswith('user') for user in users))
+
+    def test_benchmark_command(self):
+        out = StringIO()
+        with mock.patch.dict(admin.site._registry, {User: UserAdmin(User, admin.site)}):
+            call_command('benchmark_admin', 'auth.User', runs=1, query=['q=user'], stdout=out)
+        self.assertIn('?date_joined__year=2026&date_joined__month=6', out.getvalue())
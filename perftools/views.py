@@ -0,0 +1,23 @@
+import secrets
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+
+from . import metrics
+
+
+def metrics_view(request):
+    """Serve the merged metrics of every worker process to a Prometheus scraper."""
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    if not token:
+        if not settings.DEBUG:
+            return HttpResponseForbidden()
+    elif not secrets.compare_digest(
+        request.headers.get('Authorization', '').encode(), f'Bearer {token}'.encode()
+    ):
+        return HttpResponseForbidden()
+    metrics.registry.dump()
+    return HttpResponse(
+        metrics.render(metrics.collect()),
+        content_type='text/plain; version=0.0.4; charset=utf-8',
+    )
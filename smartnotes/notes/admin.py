@@ -1,7 +1,19 @@
 from django.contrib import admin
+
+from perftools.admin import LargeTableAdmin
 from . import models
 
-class NotesAdmin(admin.ModelAdmin):
-    list_display = ('title', 'created_at', 'updated_at')
+class NotesAdmin(LargeTableAdmin):
+    list_display = ('title', 'user', 'is_public', 'likes', 'created_at', 'updated_at')
+    list_select_related = ('user',)
+    list_filter = ('is_public',)
+    # Title prefixes, on notes_title_nocase_idx.
+    search_fields = ('^title',)
+    date_hierarchy = 'created_at'
+    ordering = ('-created_at',)
+    sortable_by = ('created_at',)
+    # The changelist never shows the text; the change form loads it itself.
+    deferred_fields = ('text', 'html')
+    raw_id_fields = ('user',)
 
-admin.site.register(models.Notes, NotesAdmin)
\ No newline at end of file
+admin.site.register(models.Notes, NotesAdmin)
@@ -0,0 +1,78 @@
+"""
+Cached note snapshots for NotesDetailView.
+
+Public notes are cached under a key any visitor may read. Private notes go
+under a separate key that is only consulted after the reader has been
+checked to be the owner, so a private note can never be served from the
+public entry. The snapshot holds the note's rendered markdown rather than
+its text; the page itself is not cached, as it carries a per-user CSRF
+token and the template is cheap next to the query.
+
+Entries are dropped whenever a note is saved or deleted, and when buffered
+likes are written. NOTES_DETAIL_CACHE_TIMEOUT bounds how stale another
+process's entry can get with a per-process cache backend. Entries are
+filled from the primary database even when the page reads from a replica:
+a lagging replica could otherwise cache a note for the whole timeout right
+after it was edited or made private.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.http import Http404
+
+from . import markdown
+from .models import Notes
+
+FIELDS = ('id', 'user_id', 'title', 'html', 'html_version', 'is_public', 'likes')
+
+
+def public_key(pk):
+    return f'notes:detail:{pk}:public'
+
+
+def owner_key(pk):
+    return f'notes:detail:{pk}:owner'
+
+
+def timeout():
+    return getattr(settings, 'NOTES_DETAIL_CACHE_TIMEOUT', 300)
+
+
+def get_note(pk, user):
+    """Return the note ``pk`` if ``user`` may read it, or raise Http404."""
+    entries = cache.get_many([public_key(pk), owner_key(pk)])
+    data = entries.get(public_key(pk))
+    if data is None and owner_key(pk) in entries and entries[owner_key(pk)]['user_id'] == user.pk:
+        data = entries[owner_key(pk)]
+    if data is None:
+        data = Notes.objects.using(DEFAULT_DB_ALIAS).filter(pk=pk).values(*FIELDS).first()
+        if data is None:
+            raise Http404
+        if data['html_version'] != markdown.VERSION:
+            render_html(data)
+        if data['is_public']:
+            cache.set(public_key(pk), data, timeout())
+        elif data['user_id'] == user.pk:
+            cache.set(owner_key(pk), data, timeout())
+    if not data['is_public'] and data['user_id'] != user.pk:
+        raise Http404
+    return Notes(**data)
+
+
+def render_html(data):
+    """Render a note saved before its renderer version, and store the result."""
+    text = Notes.objects.using(DEFAULT_DB_ALIAS).filter(pk=data['id']).values_list('text', flat=True).get()
+    data['html'], data['html_version'] = markdown.render_cached(text), markdown.VERSION
+    Notes.objects.filter(pk=data['id']).update(html=data['html'], html_version=data['html_version'])
+
+
+def invalidate(*pks):
+    cache.delete_many([key for pk in pks for key in (public_key(pk), owner_key(pk))])
+
+
+@receiver(post_save, sender=Notes)
+@receiver(post_delete, sender=Notes)
+def invalidate_note(sender, instance, **kwargs):
+    invalidate(instance.pk)
@@ -0,0 +1,159 @@
+"""
+In-process pub/sub for live note updates, streamed as Server-Sent Events.
+
+Listeners are coroutines on the ASGI event loop, each waiting on its own
+small asyncio.Queue, so an idle connection costs a coroutine and a queue
+rather than a thread. Views publish from worker threads; events are handed
+to the loop with call_soon_threadsafe.
+
+Under WSGI a stream would hold a worker thread for as long as the page is
+open, so there the detail page leaves live updates out and a stream that is
+opened anyway (stream_sync) ends after one heartbeat window, telling the
+browser with ``retry:`` to wait as long again before reconnecting.
+
+Only listeners in the publishing process are reached. Run the ASGI server
+as a single process per host, or put a shared broker behind ``publish``,
+if likes can be posted to another process.
+"""
+import asyncio
+import json
+import queue
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+from django.conf import settings
+
+
+class Subscriber:
+    __slots__ = ('loop', 'queue')
+
+    def __init__(self, loop, maxsize=32):
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize)
+
+    def deliver(self, event):
+        # A slow reader only needs the latest state: drop the oldest event.
+        if self.queue.full():
+            self.queue.get_nowait()
+        self.queue.put_nowait(event)
+
+    def send(self, event):
+        self.loop.call_soon_threadsafe(self.deliver, event)
+
+
+class ThreadSubscriber:
+    """A subscriber read by a blocking worker thread rather than a coroutine."""
+
+    __slots__ = ('queue',)
+
+    def __init__(self, maxsize=32):
+        self.queue = queue.Queue(maxsize)
+
+    def send(self, event):
+        while True:
+            try:
+                self.queue.put_nowait(event)
+                return
+            except queue.Full:
+                try:
+                    self.queue.get_nowait()  # Drop the oldest event, as Subscriber does.
+                except queue.Empty:
+                    pass
+
+
+class Broker:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.subscribers = defaultdict(set)  # note id -> subscribers
+
+    @contextmanager
+    def subscribe(self, note_id, threaded=False):
+        """
+        Register a subscriber for ``note_id`` on the running event loop, or
+        for the calling thread if ``threaded``.
+        """
+        subscriber = ThreadSubscriber() if threaded else Subscriber(asyncio.get_running_loop())
+        with self.lock:
+            self.subscribers[note_id].add(subscriber)
+        try:
+            yield subscriber
+        finally:
+            with self.lock:
+                subscribers = self.subscribers[note_id]
+                subscribers.discard(subscriber)
+                if not subscribers:
+                    del self.subscribers[note_id]
+
+    def publish(self, note_id, event):
+        """Send ``event`` to every subscriber of ``note_id``; safe from any thread."""
+        with self.lock:
+            subscribers = list(self.subscribers.get(note_id, ()))
+        for subscriber in subscribers:
+            try:
+                subscriber.send(event)
+            except RuntimeError:
+                pass  # The subscriber's loop has closed.
+        return len(subscribers)
+
+    def listener_count(self, note_id=None):
+        with self.lock:
+            if note_id is not None:
+                return len(self.subscribers.get(note_id, ()))
+            return sum(len(subscribers) for subscribers in self.subscribers.values())
+
+
+broker = Broker()
+
+
+def format_event(data):
+    return f'data: {json.dumps(data)}\n\n'
+
+
+def heartbeat():
+    return getattr(settings, 'NOTES_EVENTS_HEARTBEAT', 15)
+
+
+def ends_stream(event, note, user_id):
+    return event.get('is_public') is False and note['user_id'] != user_id
+
+
+async def stream(note, user_id):
+    """
+    Yield the note's state, then every change published for it, as SSE
+    messages. Ends once the note turns private for a reader who is not its
+    owner.
+    """
+    interval = heartbeat()
+    with broker.subscribe(note['id']) as subscriber:
+        yield format_event({'likes': note['likes'], 'is_public': note['is_public']})
+        while True:
+            try:
+                event = await asyncio.wait_for(subscriber.queue.get(), interval)
+            except asyncio.TimeoutError:
+                # Keeps proxies from closing the idle connection.
+                yield ': keepalive\n\n'
+                continue
+            yield format_event(event)
+            if ends_stream(event, note, user_id):
+                return
+
+
+def stream_sync(note, user_id):
+    """
+    Like stream, for a worker thread: yields the changes published within one
+    heartbeat window, then ends.
+    """
+    interval = heartbeat()
+    deadline = time.monotonic() + interval
+    with broker.subscribe(note['id'], threaded=True) as subscriber:
+        yield f'retry: {interval * 1000:.0f}\n' + format_event({'likes': note['likes'], 'is_public': note['is_public']})
+        while (remaining := deadline - time.monotonic()) > 0:
+            try:
+                event = subscriber.queue.get(timeout=remaining)
+            except queue.Empty:
+                return
+            yield format_event(event)
+            if ends_stream(event, note, user_id):
+                return
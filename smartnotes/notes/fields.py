@@ -0,0 +1,61 @@
+import zlib
+
+from django.db import models
+
+# First byte of every stored value.
+RAW = b'\x00'
+ZLIB = b'\x01'
+
+
+class CompressedTextField(models.TextField):
+    """
+    A TextField stored as a BLOB, zlib-compressed once it is at least
+    ``min_length`` bytes long. Values are str in Python. Rows written before
+    the column was compressed still hold plain text and are read as is.
+
+    The database cannot see inside the values, so text lookups such as
+    ``contains`` or ``Substr`` do not work on this field.
+    """
+
+    def __init__(self, *args, min_length=256, level=6, **kwargs):
+        self.min_length = min_length
+        self.level = level
+        super().__init__(*args, **kwargs)
+
+    def deconstruct(self):
+        name, path, args, kwargs = super().deconstruct()
+        if self.min_length != 256:
+            kwargs['min_length'] = self.min_length
+        if self.level != 6:
+            kwargs['level'] = self.level
+        return name, path, args, kwargs
+
+    def get_internal_type(self):
+        return 'BinaryField'
+
+    def compress(self, value):
+        data = value.encode()
+        if len(data) >= self.min_length:
+            compressed = zlib.compress(data, self.level)
+            if len(compressed) < len(data):
+                return ZLIB + compressed
+        return RAW + data
+
+    def decompress(self, value):
+        if isinstance(value, str):
+            return value  # Written before compression was enabled.
+        value = bytes(value)
+        if value[:1] == ZLIB:
+            return zlib.decompress(value[1:]).decode()
+        return value[1:].decode()
+
+    def get_db_prep_value(self, value, connection, prepared=False):
+        value = super().get_db_prep_value(value, connection, prepared)
+        if value is None:
+            return None
+        return connection.Database.Binary(self.compress(value))
+
+    def from_db_value(self, value, expression, connection):
+        if value is None:
+            return None
+        return self.decompress(value)
@@ -1,9 +1,16 @@
 from django import forms
 from django.core.exceptions import ValidationError
 
-from .models import Notes
+from .models import Notes, Tag
+from .tagindex import normalize
 
 class NotesForm(forms.ModelForm):
+    tags = forms.CharField(
+        required=False,
+        help_text='Separate tags with commas.',
+        widget=forms.TextInput(attrs={'class': 'form-control mb-5', 'list': 'tag-suggestions', 'autocomplete': 'off'}),
+    )
+
     class Meta:
         model = Notes
         fields = ('title', 'text')
@@ -19,4 +26,28 @@ class NotesForm(forms.ModelForm):
         title = self.cleaned_data.get('title', '').strip()
         if 'Django' in title:
             raise ValidationError('We cannot accept notes about Django!')
-        return title
\ No newline at end of file
+        return title
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if self.instance.pk:
+            self.initial['tags'] = ', '.join(self.instance.tags.order_by('name').values_list('name', flat=True))
+
+    def clean_tags(self):
+        names = []
+        for name in self.cleaned_data.get('tags', '').split(','):
+            name = normalize(name)
+            if len(name) > Tag._meta.get_field('name').max_length:
+                raise ValidationError(f'Tag "{name}" is too long.')
+            if name and name not in names:
+                names.append(name)
+        return names
+
+    def _save_m2m(self):
+        super()._save_m2m()
+        note = self.instance
+        names = self.cleaned_data['tags']
+        tags = list(Tag.objects.filter(user=note.user, name__in=names))
+        existing = {tag.name for tag in tags}
+        tags += [Tag.objects.get_or_create(user=note.user, name=name)[0] for name in names if name not in existing]
+        note.tags.set(tags)
@@ -0,0 +1,143 @@
+"""
+Time-decayed popular-notes leaderboard.
+
+Every like is worth 1 when it arrives and half as much after
+POPULAR_NOTES_HALF_LIFE seconds. Because all scores decay at the same rate,
+the ranking never changes on its own: it can be kept as a log-space "hot
+score", ln(sum of e^(rate * (like time - EPOCH))), which only grows and is
+updated with one F() expression when likes are flushed. The score shown to
+readers is e^(hot_score - rate * (now - EPOCH)).
+
+The top POPULAR_NOTES_SIZE public notes are held in memory and merged with
+each batch of flushed likes, so serving the page costs no query. The list
+is re-read from the partial index on hot_score every
+POPULAR_NOTES_REFRESH_SECONDS to pick up likes flushed by other processes.
+"""
+import math
+import threading
+import time
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.db.models import Case, F, FloatField, Value, When
+from django.db.models.functions import Abs, Exp, Greatest, Ln
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Notes
+
+EPOCH = datetime(2024, 1, 1, tzinfo=timezone.utc).timestamp()
+FIELDS = ('id', 'title', 'likes', 'hot_score')
+
+
+def decay_rate():
+    return math.log(2) / getattr(settings, 'POPULAR_NOTES_HALF_LIFE', 24 * 60 * 60)
+
+
+def hot_score_increment(count, when=None):
+    """The hot score of ``count`` likes received at ``when`` (a POSIX timestamp)."""
+    if when is None:
+        when = time.time()
+    return math.log(count) + decay_rate() * (when - EPOCH)
+
+
+def add_likes_expression(count, when=None):
+    """An update expression adding ``count`` likes to hot_score, i.e. logaddexp in SQL."""
+    increment = Value(hot_score_increment(count, when))
+    current = F('hot_score')
+    return Case(
+        When(hot_score__isnull=True, then=increment),
+        default=Greatest(current, increment) + Ln(Value(1.0) + Exp(-Abs(current - increment))),
+        output_field=FloatField(),
+    )
+
+
+def decayed(hot_score, now=None):
+    if now is None:
+        now = time.time()
+    return math.exp(hot_score - decay_rate() * (now - EPOCH))
+
+
+class Leaderboard:
+    def __init__(self, size=None, refresh_interval=None):
+        if size is None:
+            size = getattr(settings, 'POPULAR_NOTES_SIZE', 20)
+        if refresh_interval is None:
+            refresh_interval = getattr(settings, 'POPULAR_NOTES_REFRESH_SECONDS', 30)
+        self.size = size
+        self.refresh_interval = refresh_interval
+        self.lock = threading.Lock()
+        self.top = []  # rows as dicts of FIELDS, best first
+        self.loaded_at = None
+
+    def load(self):
+        rows = list(
+            Notes.objects.filter(is_public=True, hot_score__isnull=False)
+            .order_by('-hot_score')
+            .values(*FIELDS)[:self.size]
+        )
+        with self.lock:
+            self.top = rows
+            self.loaded_at = time.monotonic()
+
+    def entries(self):
+        """The current leaderboard, each row with its decayed ``score``."""
+        if self.loaded_at is None or time.monotonic() - self.loaded_at >= self.refresh_interval:
+            self.load()
+        now = time.time()
+        with self.lock:
+            return [{**row, 'score': decayed(row['hot_score'], now)} for row in self.top]
+
+    def threshold(self):
+        """The lowest hot score that can still enter the leaderboard."""
+        with self.lock:
+            if self.loaded_at is None or len(self.top) < self.size:
+                return None
+            return self.top[-1]['hot_score']
+
+    def record(self, pks):
+        """Merge notes whose hot score just grew into the leaderboard."""
+        if self.loaded_at is None:
+            return  # Loaded from the database on first read.
+        rows = Notes.objects.filter(pk__in=pks, is_public=True, hot_score__isnull=False)
+        threshold = self.threshold()
+        if threshold is not None:
+            rows = rows.filter(hot_score__gte=threshold)
+        rows = list(rows.values(*FIELDS))
+        if not rows:
+            return
+        with self.lock:
+            changed = {row['id'] for row in rows}
+            merged = [row for row in self.top if row['id'] not in changed] + rows
+            merged.sort(key=lambda row: row['hot_score'], reverse=True)
+            self.top = merged[:self.size]
+
+    def discard(self, pk):
+        """Drop a note that was deleted or made private."""
+        with self.lock:
+            if any(row['id'] == pk for row in self.top):
+                # Whichever note was next in line is only known to the database.
+                self.loaded_at = None
+
+    def __contains__(self, pk):
+        with self.lock:
+            return any(row['id'] == pk for row in self.top)
+
+
+leaderboard = Leaderboard()
+
+
+@receiver(post_save, sender=Notes)
+def update_leaderboard(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and not {'title', 'is_public'} & set(update_fields):
+        return
+    if not instance.is_public:
+        leaderboard.discard(instance.pk)
+    elif instance.pk in leaderboard or (update_fields and 'is_public' in update_fields):
+        # A retitled entry, or a note made public again that may rank.
+        leaderboard.record([instance.pk])
+
+
+@receiver(post_delete, sender=Notes)
+def remove_from_leaderboard(sender, instance, **kwargs):
+    leaderboard.discard(instance.pk)
@@ -0,0 +1,106 @@
+"""
+Write-coalescing like counter.
+
+add_like_view only bumps an in-process counter. Pending likes are written to
+Notes.likes in batches with F() expressions, so a like never rewrites the
+note row or its updated_at, and concurrent likes are never lost. Each flush
+also bumps the notes' time-decayed hot_score for the leaderboard. A flush
+happens once LIKES_FLUSH_THRESHOLD likes are pending, every
+LIKES_FLUSH_INTERVAL seconds from a background thread, and at process exit.
+"""
+import atexit
+import logging
+import threading
+import time
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F
+
+from . import caching
+from .leaderboard import add_likes_expression, leaderboard
+from .models import Notes
+
+logger = logging.getLogger(__name__)
+
+
+class LikeCounter:
+    def __init__(self, flush_interval=None, flush_threshold=None):
+        if flush_interval is None:
+            flush_interval = getattr(settings, 'LIKES_FLUSH_INTERVAL', 5)
+        if flush_threshold is None:
+            flush_threshold = getattr(settings, 'LIKES_FLUSH_THRESHOLD', 500)
+        self.flush_interval = flush_interval
+        self.flush_threshold = flush_threshold
+        self.lock = threading.Lock()
+        self.pending = Counter()
+        self.pending_total = 0
+        self.flusher = None
+
+    def add(self, pk, count=1):
+        with self.lock:
+            self.pending[pk] += count
+            self.pending_total += count
+            due = self.pending_total >= self.flush_threshold
+            if self.flusher is None and self.flush_interval:
+                self.start_flusher()
+        if due:
+            self.flush()
+
+    def pending_for(self, pk):
+        """Likes recorded for ``pk`` that are not in the database yet."""
+        return self.pending.get(pk, 0)
+
+    def flush(self):
+        """Write pending likes to the database; returns how many were written."""
+        with self.lock:
+            pending, self.pending = self.pending, Counter()
+            self.pending_total = 0
+        if not pending:
+            return 0
+        # One UPDATE per distinct delta: most notes get the same small number
+        # of likes between flushes.
+        by_delta = defaultdict(list)
+        for pk, delta in pending.items():
+            by_delta[delta].append(pk)
+        now = time.time()
+        try:
+            with transaction.atomic():
+                for delta, pks in by_delta.items():
+                    Notes.objects.filter(pk__in=pks).update(
+                        likes=F('likes') + delta, hot_score=add_likes_expression(delta, now)
+                    )
+        except Exception:
+            with self.lock:
+                self.pending.update(pending)
+                self.pending_total += sum(pending.values())
+            raise
+        caching.invalidate(*pending)
+        leaderboard.record(list(pending))
+        return sum(pending.values())
+
+    def start_flusher(self):
+        self.flusher = threading.Thread(target=self.flush_periodically, name='like-flusher', daemon=True)
+        self.flusher.start()
+
+    def flush_periodically(self):
+        while True:
+            time.sleep(self.flush_interval)
+            try:
+                self.flush()
+            except Exception:
+                logger.exception('Flushing pending likes failed; will retry.')
+            finally:
+                connection.close()
+
+
+like_counter = LikeCounter()
+
+
+@atexit.register
+def flush_on_exit():
+    try:
+        like_counter.flush()
+    except Exception:
+        logger.exception('Pending likes were lost at exit.')
@@ -0,0 +1,66 @@
+import random
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from notes import revisions
+from notes.models import Notes
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare the storage of delta-encoded note revisions with keeping a '
+        'full copy of every revision. Runs in a transaction that is rolled back.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--edits', type=int, default=200)
+        parser.add_argument('--lines', type=int, default=200, help='Lines in the note.')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        lines = [f'Line {number}: ' + ' '.join(rng.choice(WORDS) for _ in range(10)) + '\n'
+                 for number in range(options['lines'])]
+        full_copy = compressed_copy = 0
+        field = Notes._meta.get_field('text')
+        with transaction.atomic():
+            user = User.objects.create(username=f'revision-benchmark-{time.time_ns()}')
+            note = Notes(user=user, title='Benchmark', text=''.join(lines))
+            start = time.perf_counter()
+            for edit in range(options['edits'] + 1):
+                if edit:
+                    # A typical edit touches a line or two.
+                    lines[rng.randrange(len(lines))] = ' '.join(rng.choice(WORDS) for _ in range(10)) + '\n'
+                    if rng.random() < 0.3:
+                        lines.insert(rng.randrange(len(lines)), 'Added line\n')
+                    note.text = ''.join(lines)
+                note.save()
+                full_copy += len(note.text.encode())
+                compressed_copy += len(field.compress(note.text))
+            elapsed = time.perf_counter() - start
+            delta = sum(
+                revisions.stored_size(data) for data in note.revisions.values_list('data', flat=True)
+            )
+            numbers = list(note.revisions.values_list('number', flat=True))
+            start = time.perf_counter()
+            for number in numbers:
+                revisions.get_revision(note.pk, number)
+            rebuild = (time.perf_counter() - start) / len(numbers)
+            transaction.set_rollback(True)
+
+        self.stdout.write(f'{len(numbers):,} revisions of a {len(lines):,}-line note, '
+                          f'saved in {elapsed:.2f}s')
+        self.stdout.write(f'Full copies:            {full_copy:>12,} bytes')
+        self.stdout.write(f'Compressed full copies: {compressed_copy:>12,} bytes')
+        self.stdout.write(f'Delta-encoded:          {delta:>12,} bytes '
+                          f'({full_copy / delta:.1f}x smaller than full copies)')
+        self.stdout.write(f'Rebuilding a revision takes {rebuild * 1000:.2f}ms on average')
+
+
+WORDS = (
+    'note', 'idea', 'meeting', 'todo', 'draft', 'list', 'plan', 'review', 'project',
+    'book', 'call', 'email', 'later', 'today', 'remember', 'follow', 'up', 'check',
+)
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from notes import revisions
+from notes.models import Notes
+
+
+class Command(BaseCommand):
+    help = (
+        'Re-encode note revision histories with the current snapshot interval, '
+        'optionally keeping only the most recent revisions.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--keep', type=int, help='Revisions to keep per note (default: all).')
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        keep = options['keep']
+        if keep is not None and keep < 1:
+            raise CommandError('--keep must be at least 1.')
+        notes = Notes.objects.filter(revisions__isnull=False).distinct().only('id').order_by('pk')
+        count = before = after = 0
+        for note in notes.iterator(chunk_size=options['batch_size']):
+            note_before, note_after = revisions.compact(note, keep=keep)
+            count += 1
+            before += note_before
+            after += note_after
+            if count % options['batch_size'] == 0:
+                self.stdout.write(f'{count:,} notes compacted')
+        saved = before - after
+        self.stdout.write(self.style.SUCCESS(
+            f'Compacted the history of {count:,} notes: {before:,} -> {after:,} bytes '
+            f'({saved / before if before else 0:.0%} saved).'
+        ))
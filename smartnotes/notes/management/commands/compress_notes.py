@@ -0,0 +1,77 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from notes import search
+from notes.models import Notes
+
+
+class Command(BaseCommand):
+    help = (
+        'Rewrite note bodies stored before compression was enabled, in batches, '
+        'and report the storage and list-view memory saved.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument(
+            '--vacuum', action='store_true', help='VACUUM the database afterwards to return the space.'
+        )
+
+    def handle(self, *args, **options):
+        field = Notes._meta.get_field('text')
+        table, column = Notes._meta.db_table, field.column
+        batch_size = options['batch_size']
+        start = time.perf_counter()
+        rows = rewritten = before = after = excerpt_bytes = 0
+        last_pk = 0
+        while True:
+            # Read raw values: legacy rows come back as str, compressed ones as bytes.
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f'SELECT id, {column}, excerpt FROM {table} WHERE id > %s ORDER BY id LIMIT %s',
+                    [last_pk, batch_size],
+                )
+                batch = cursor.fetchall()
+            if not batch:
+                break
+            last_pk = batch[-1][0]
+            updates = []
+            for pk, raw, excerpt in batch:
+                rows += 1
+                excerpt_bytes += len(excerpt.encode())
+                if isinstance(raw, str):
+                    before += len(raw.encode())
+                    after += len(field.compress(raw))
+                    updates.append(Notes(pk=pk, text=raw))
+                else:
+                    before += len(field.decompress(raw).encode())
+                    after += len(raw)
+            if updates:
+                with transaction.atomic():
+                    Notes.objects.bulk_update(updates, ['text'])
+                rewritten += len(updates)
+            self.stdout.write(f'{rows:,} notes checked, {rewritten:,} compressed')
+
+        if options['vacuum'] and connection.vendor == 'sqlite':
+            with connection.cursor() as cursor:
+                cursor.execute('VACUUM')
+
+        elapsed = time.perf_counter() - start
+        saved = before - after
+        self.stdout.write(self.style.SUCCESS(
+            f'Compressed {rewritten:,} of {rows:,} notes in {elapsed:.2f}s. '
+            f'Note bodies: {before:,} bytes as text, {after:,} bytes stored '
+            f'({saved:,} bytes, {saved / before if before else 0:.0%} saved).'
+        ))
+        self.stdout.write(
+            f'List views load {excerpt_bytes:,} bytes of excerpts instead of '
+            f'{before:,} bytes of text.'
+        )
+        if search.enabled():
+            copied, index = search.table_sizes()
+            self.stdout.write(
+                f'The full-text index keeps its own uncompressed copy of titles and text: '
+                f'{copied:,} bytes, plus {index:,} bytes of postings.'
+            )
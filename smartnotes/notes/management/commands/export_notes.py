@@ -0,0 +1,33 @@
+import sys
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from notes import transfer
+
+
+class Command(BaseCommand):
+    help = "Stream a user's notes as NDJSON or as a zip of markdown files."
+
+    def add_arguments(self, parser):
+        parser.add_argument('username')
+        parser.add_argument('--format', choices=transfer.FORMATS, default='ndjson')
+        parser.add_argument('--output', help='File to write to (default: standard output).')
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['username'])
+        except User.DoesNotExist:
+            raise CommandError(f"No user named {options['username']!r}.")
+        if options['output']:
+            output = open(options['output'], 'wb')
+        else:
+            output = sys.stdout.buffer
+        try:
+            for chunk in transfer.export(user, options['format']):
+                output.write(chunk.encode() if isinstance(chunk, str) else chunk)
+        finally:
+            if options['output']:
+                output.close()
+            else:
+                output.flush()
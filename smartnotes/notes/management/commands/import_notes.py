@@ -0,0 +1,43 @@
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from notes import transfer
+
+
+class Command(BaseCommand):
+    help = (
+        "Import notes for a user from an NDJSON file or a zip of markdown files, "
+        "skipping notes the user already has. An invalid record aborts the whole import."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('username')
+        parser.add_argument('path')
+        parser.add_argument(
+            '--format', choices=transfer.FORMATS, help='Defaults to the file extension.'
+        )
+        parser.add_argument('--chunk-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['username'])
+        except User.DoesNotExist:
+            raise CommandError(f"No user named {options['username']!r}.")
+        path = options['path']
+        format = options['format'] or ('zip' if path.endswith('.zip') else 'ndjson')
+        start = time.perf_counter()
+        try:
+            with open(path, 'rb') if format == 'zip' else open(path, encoding='utf-8') as file:
+                created, skipped = transfer.import_notes(
+                    user, transfer.reader(file, format), chunk_size=options['chunk_size']
+                )
+        except transfer.InvalidRecord as e:
+            raise CommandError(f'Nothing imported. {e}')
+        elapsed = time.perf_counter() - start
+        rate = (created + skipped) / elapsed if elapsed else 0
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {created:,} notes, skipped {skipped:,} duplicates '
+            f'in {elapsed:.2f}s ({rate:,.0f} notes/sec).'
+        ))
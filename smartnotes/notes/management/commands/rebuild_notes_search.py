@@ -0,0 +1,20 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from notes import search
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text search index over all notes.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        if not search.enabled():
+            raise CommandError('Full-text search needs the SQLite FTS5 extension.')
+        start = time.perf_counter()
+        count = search.rebuild(batch_size=options['batch_size'])
+        elapsed = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(f'Indexed {count:,} notes in {elapsed:.2f}s.'))
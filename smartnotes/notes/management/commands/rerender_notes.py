@@ -0,0 +1,56 @@
+import multiprocessing
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections, transaction
+
+from notes import caching, markdown
+from notes.models import Notes
+
+
+class Command(BaseCommand):
+    help = (
+        'Render the markdown of notes stored by an older renderer version, '
+        'across a pool of worker processes.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=multiprocessing.cpu_count())
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--all', action='store_true', help='Re-render notes that are up to date too.')
+
+    def handle(self, *args, **options):
+        if options['processes'] < 1:
+            raise CommandError('--processes must be at least 1.')
+        notes = Notes.objects.order_by('pk')
+        if not options['all']:
+            notes = notes.exclude(html_version=markdown.VERSION)
+        html_field = Notes._meta.get_field('html')
+        update = f'UPDATE {Notes._meta.db_table} SET html = %s, html_version = %s WHERE id = %s'
+        start = time.perf_counter()
+        count = 0
+        last_pk = 0
+        # Workers only render; all database work stays in this process.
+        connections.close_all()
+        with multiprocessing.get_context('fork').Pool(options['processes']) as pool:
+            while True:
+                batch = list(notes.filter(pk__gt=last_pk).values_list('pk', 'text')[:options['batch_size']])
+                if not batch:
+                    break
+                last_pk = batch[-1][0]
+                chunksize = max(1, len(batch) // (options['processes'] * 4))
+                rendered = pool.map(markdown.render, [text for _, text in batch], chunksize=chunksize)
+                rows = [
+                    [html_field.get_db_prep_value(html, connection), markdown.VERSION, pk]
+                    for (pk, _), html in zip(batch, rendered)
+                ]
+                with transaction.atomic(), connection.cursor() as cursor:
+                    cursor.executemany(update, rows)
+                caching.invalidate(*(pk for pk, _ in batch))
+                count += len(rows)
+                elapsed = time.perf_counter() - start
+                self.stdout.write(f'{count:,} notes rendered ({count / elapsed:,.0f} notes/sec)')
+        elapsed = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(
+            f'Rendered {count:,} notes with renderer version {markdown.VERSION} in {elapsed:.2f}s.'
+        ))
@@ -0,0 +1,82 @@
+import random
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from notes import revisions, search
+from notes.leaderboard import hot_score_increment
+from notes.models import EXCERPT_LENGTH, Notes, hash_content
+from perftools import seeding
+
+
+class Command(BaseCommand):
+    help = (
+        'Fill the database with synthetic users and notes for performance testing. '
+        'The same --seed and --until always give the same rows. Notes are indexed for '
+        'search and get their first revision; their markdown is rendered on first view, '
+        'or ahead of time by rerender_notes.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--notes', type=int, default=100_000)
+        parser.add_argument('--public', type=float, default=0.3, help='Fraction of public notes.')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--until', help='Last day of the seeded note dates, YYYY-MM-DD (default: today).')
+        parser.add_argument('--prefix', default='seed', help='Prefix of the usernames.')
+        parser.add_argument('--chunk-size', type=int, default=5000, help='Rows per bulk_create transaction.')
+
+    def handle(self, *args, **options):
+        if options['chunk_size'] < 1:
+            raise CommandError('--chunk-size must be at least 1.')
+        rng = random.Random(options['seed'])
+        end = seeding.end_of(options['until'])
+        loader = seeding.Loader(self.stdout, options['chunk_size'])
+        user_ids = []
+
+        with seeding.bulk_load(), seeding.preserve_dates(Notes):
+            loader.load(
+                User,
+                seeding.users(rng, options['users'], end, options['prefix']),
+                after_chunk=lambda chunk: user_ids.extend(user.pk for user in chunk),
+            )
+            if user_ids:
+                notes = (self.note(rng, end, user_ids, options['public']) for _ in range(options['notes']))
+                loader.load(Notes, notes, after_chunk=self.after_chunk)
+        self.stdout.write(self.style.SUCCESS(loader.summary()))
+
+    def note(self, rng, end, user_ids, public):
+        title = seeding.words(rng, seeding.between(rng, 2, 6)).capitalize()
+        blocks = []
+        for _ in range(1 + int(rng.expovariate(1 / 3))):
+            kind = rng.random()
+            if kind < 0.1:
+                blocks.append(f'## {seeding.words(rng, seeding.between(rng, 2, 5)).capitalize()}')
+            elif kind < 0.25:
+                blocks.append('\n'.join(f'- {seeding.sentence(rng, 3, 8)}' for _ in range(seeding.between(rng, 2, 5))))
+            else:
+                blocks.append(seeding.paragraph(rng))
+        text = '\n\n'.join(blocks)
+        created_at = seeding.moment(rng, end, 730)
+        is_public = rng.random() < public
+        # Most notes are never liked; a few collect thousands of likes.
+        likes = int(rng.paretovariate(1.2)) - 1 if rng.random() < 0.4 else 0
+        return Notes(
+            # Power users write most of the notes.
+            user_id=user_ids[seeding.zipf_index(rng, len(user_ids))],
+            title=title,
+            text=text,
+            excerpt=text[:EXCERPT_LENGTH],
+            content_hash=hash_content(title, text),
+            created_at=created_at,
+            updated_at=created_at + (end - created_at) * rng.random() ** 4,
+            likes=likes,
+            is_public=is_public,
+            hot_score=hot_score_increment(likes, created_at.timestamp()) if is_public and likes else None,
+        )
+
+    def after_chunk(self, notes):
+        # What the post_save receivers would do for each note.
+        search.index_new_notes(notes)
+        revisions.start_histories(notes)
+        return len(notes)
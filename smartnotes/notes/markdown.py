@@ -0,0 +1,139 @@
+"""
+A small, safe markdown renderer for note bodies.
+
+Supported: paragraphs, ``#`` headings, ``-``/``*`` and numbered lists,
+``>`` quotes, fenced code blocks, horizontal rules, ``**bold**``,
+``*italic*``, ```code``` and ``[links](https://...)``. Raw HTML is not: all
+text is escaped before any markup is added, and links are only kept for
+http(s), mailto and relative URLs, so the output is safe to mark safe.
+
+Rendered HTML is stored on the note (Notes.html) when it is saved. Bump
+VERSION whenever the output changes; rows rendered by an older version are
+re-rendered on first view or by the rerender_notes command.
+"""
+import hashlib
+import html
+import re
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.html import escape
+
+VERSION = 1
+
+HEADING_RE = re.compile(r'^(#{1,6})\s+(.*?)\s*#*\s*$')
+RULE_RE = re.compile(r'^\s*([-*_])(\s*\1){2,}\s*$')
+BULLET_RE = re.compile(r'^\s*[-*+]\s+(.*)$')
+NUMBERED_RE = re.compile(r'^\s*\d+[.)]\s+(.*)$')
+QUOTE_RE = re.compile(r'^\s*>\s?(.*)$')
+FENCE_RE = re.compile(r'^\s*```')
+CODE_RE = re.compile(r'`([^`]+)`')
+LINK_RE = re.compile(r'\[([^\]]+)\]\(([^)\s]+)\)')
+STRONG_RE = re.compile(r'\*\*(.+?)\*\*|__(.+?)__')
+EM_RE = re.compile(r'\*(.+?)\*|(?<!\w)_(.+?)_(?!\w)')
+SCHEME_RE = re.compile(r'([a-zA-Z][a-zA-Z0-9+.-]*):')
+SAFE_SCHEMES = ('http', 'https', 'mailto')
+# Marks a span that is already rendered, so later patterns leave it alone.
+PLACEHOLDER = '\x00{}\x00'
+PLACEHOLDER_RE = re.compile('\x00(\\d+)\x00')
+
+
+def safe_url(url):
+    # Browsers drop control characters and whitespace inside a scheme.
+    url = re.sub(r'[\x00-\x20]', '', html.unescape(url))
+    scheme = SCHEME_RE.match(url)
+    return scheme is None or scheme.group(1).lower() in SAFE_SCHEMES
+
+
+def inline(text):
+    spans = []
+
+    def keep(markup):
+        spans.append(markup)
+        return PLACEHOLDER.format(len(spans) - 1)
+
+    text = text.replace('\x00', '')
+    text = CODE_RE.sub(lambda match: keep(f'<code>{escape(match.group(1))}</code>'), text)
+    text = escape(text)
+
+    def link(match):
+        label, url = match.groups()
+        if not safe_url(url):
+            return label
+        return keep(f'<a href="{url}" rel="nofollow noopener">') + label + keep('</a>')
+
+    text = LINK_RE.sub(link, text)
+    text = STRONG_RE.sub(lambda match: f'<strong>{match.group(1) or match.group(2)}</strong>', text)
+    text = EM_RE.sub(lambda match: f'<em>{match.group(1) or match.group(2)}</em>', text)
+    return PLACEHOLDER_RE.sub(lambda match: spans[int(match.group(1))], text)
+
+
+def render(text):
+    """Render markdown ``text`` to sanitized HTML."""
+    lines = text.replace('\r\n', '\n').split('\n')
+    out = []
+    paragraph = []
+
+    def end_paragraph():
+        if paragraph:
+            out.append(f'<p>{inline(" ".join(paragraph))}</p>')
+            paragraph.clear()
+
+    i = 0
+    while i < len(lines):
+        line = lines[i]
+        if FENCE_RE.match(line):
+            end_paragraph()
+            code = []
+            i += 1
+            while i < len(lines) and not FENCE_RE.match(lines[i]):
+                code.append(lines[i])
+                i += 1
+            out.append(f'<pre><code>{escape(chr(10).join(code))}</code></pre>')
+            i += 1
+            continue
+        if not line.strip():
+            end_paragraph()
+        elif heading := HEADING_RE.match(line):
+            end_paragraph()
+            level = len(heading.group(1))
+            out.append(f'<h{level}>{inline(heading.group(2))}</h{level}>')
+        elif RULE_RE.match(line):
+            end_paragraph()
+            out.append('<hr>')
+        elif QUOTE_RE.match(line):
+            end_paragraph()
+            quoted = []
+            while i < len(lines) and (match := QUOTE_RE.match(lines[i])):
+                quoted.append(match.group(1))
+                i += 1
+            out.append(f'<blockquote>{render(chr(10).join(quoted))}</blockquote>')
+            continue
+        elif BULLET_RE.match(line) or NUMBERED_RE.match(line):
+            end_paragraph()
+            pattern, tag = (BULLET_RE, 'ul') if BULLET_RE.match(line) else (NUMBERED_RE, 'ol')
+            items = []
+            while i < len(lines) and (match := pattern.match(lines[i])):
+                items.append(f'<li>{inline(match.group(1))}</li>')
+                i += 1
+            out.append(f'<{tag}>{"".join(items)}</{tag}>')
+            continue
+        else:
+            paragraph.append(line.strip())
+        i += 1
+    end_paragraph()
+    return '\n'.join(out)
+
+
+def cache_key(text):
+    return f'notes:html:{VERSION}:{hashlib.sha256(text.encode()).hexdigest()}'
+
+
+def render_cached(text):
+    """Render ``text``, sharing the result between identical bodies through the cache."""
+    key = cache_key(text)
+    rendered = cache.get(key)
+    if rendered is None:
+        rendered = render(text)
+        cache.set(key, rendered, getattr(settings, 'NOTES_HTML_CACHE_TIMEOUT', 24 * 60 * 60))
+    return rendered
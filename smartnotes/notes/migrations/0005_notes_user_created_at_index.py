@@ -0,0 +1,19 @@
+# Generated by Django 5.2.1 on 2026-10-19 09:44
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notes', '0004_notes_is_public'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='notes',
+            index=models.Index(fields=['user', 'created_at', 'id'], name='notes_notes_user_id_775b12_idx'),
+        ),
+    ]
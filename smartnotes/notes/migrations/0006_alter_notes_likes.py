@@ -0,0 +1,18 @@
+# Generated by Django 5.2.1 on 2026-10-19 09:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notes', '0005_notes_user_created_at_index'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='notes',
+            name='likes',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.1 on 2026-10-19 11:02
+
+from django.db import migrations
+
+
+def create_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    Notes = apps.get_model('notes', 'Notes')
+    schema_editor.execute(
+        "CREATE VIRTUAL TABLE notes_notes_fts USING fts5("
+        "title, text, scope, tokenize='unicode61 remove_diacritics 2')"
+    )
+    for note in Notes.objects.only('id', 'title', 'text', 'user', 'is_public').iterator():
+        schema_editor.execute(
+            'INSERT INTO notes_notes_fts (rowid, title, text, scope) VALUES (%s, %s, %s, %s)',
+            [note.pk, note.title, note.text, f"u{note.user_id} {'public' if note.is_public else 'private'}"],
+        )
+
+
+def drop_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE IF EXISTS notes_notes_fts')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notes', '0006_alter_notes_likes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
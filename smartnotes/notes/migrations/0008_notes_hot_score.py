@@ -0,0 +1,43 @@
+# Generated by Django 5.2.1 on 2026-10-19 12:15
+
+import math
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_hot_scores(apps, schema_editor):
+    # Like times were never stored: count existing likes as given at the
+    # note's last update.
+    Notes = apps.get_model('notes', 'Notes')
+    epoch = datetime(2024, 1, 1, tzinfo=timezone.utc).timestamp()
+    rate = math.log(2) / getattr(settings, 'POPULAR_NOTES_HALF_LIFE', 24 * 60 * 60)
+    batch = []
+    for note in Notes.objects.filter(likes__gt=0).only('id', 'likes', 'updated_at').iterator():
+        note.hot_score = math.log(note.likes) + rate * (note.updated_at.timestamp() - epoch)
+        batch.append(note)
+        if len(batch) >= 1000:
+            Notes.objects.bulk_update(batch, ['hot_score'])
+            batch = []
+    Notes.objects.bulk_update(batch, ['hot_score'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notes', '0007_notes_fts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notes',
+            name='hot_score',
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='notes',
+            index=models.Index(condition=models.Q(('is_public', True)), fields=['-hot_score'], name='notes_public_hot_score_idx'),
+        ),
+        migrations.RunPython(backfill_hot_scores, migrations.RunPython.noop),
+    ]
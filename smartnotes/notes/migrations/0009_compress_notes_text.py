@@ -0,0 +1,33 @@
+# Generated by Django 5.2.1 on 2026-10-19 13:30
+
+from django.db import migrations, models
+from django.db.models.functions import Substr
+
+import notes.fields
+
+
+def fill_excerpts(apps, schema_editor):
+    # Runs while text is still plain, so the database can cut the excerpts.
+    Notes = apps.get_model('notes', 'Notes')
+    Notes.objects.update(excerpt=Substr('text', 1, 100))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notes', '0008_notes_hot_score'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notes',
+            name='excerpt',
+            field=models.CharField(blank=True, default='', editable=False, max_length=100),
+        ),
+        migrations.RunPython(fill_excerpts, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='notes',
+            name='text',
+            field=notes.fields.CompressedTextField(),
+        ),
+    ]
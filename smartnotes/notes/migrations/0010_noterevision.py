@@ -0,0 +1,45 @@
+# Generated by Django 5.2.1 on 2026-10-19 14:20
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+import notes.fields
+
+
+def snapshot_existing_notes(apps, schema_editor):
+    # Start every existing note's history with its current text.
+    Notes = apps.get_model('notes', 'Notes')
+    NoteRevision = apps.get_model('notes', 'NoteRevision')
+    batch = []
+    for note in Notes.objects.only('id', 'title', 'text').iterator(chunk_size=500):
+        batch.append(NoteRevision(note=note, number=1, title=note.title, is_snapshot=True, data=note.text))
+        if len(batch) >= 500:
+            NoteRevision.objects.bulk_create(batch)
+            batch = []
+    NoteRevision.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notes', '0009_compress_notes_text'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NoteRevision',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('number', models.PositiveIntegerField()),
+                ('title', models.CharField(max_length=200)),
+                ('is_snapshot', models.BooleanField(default=False)),
+                ('data', notes.fields.CompressedTextField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('note', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='revisions', to='notes.notes')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('note', 'number'), name='unique_note_revision')],
+            },
+        ),
+        migrations.RunPython(snapshot_existing_notes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.1 on 2026-10-19 15:05
+
+import hashlib
+
+from django.db import migrations, models
+
+
+def fill_content_hashes(apps, schema_editor):
+    Notes = apps.get_model('notes', 'Notes')
+    batch = []
+    for note in Notes.objects.only('id', 'title', 'text').iterator(chunk_size=500):
+        note.content_hash = hashlib.sha256(f'{note.title}\0{note.text}'.encode()).hexdigest()
+        batch.append(note)
+        if len(batch) >= 500:
+            Notes.objects.bulk_update(batch, ['content_hash'])
+            batch = []
+    Notes.objects.bulk_update(batch, ['content_hash'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notes', '0010_noterevision'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notes',
+            name='content_hash',
+            field=models.CharField(blank=True, default='', editable=False, max_length=64),
+        ),
+        migrations.AddIndex(
+            model_name='notes',
+            index=models.Index(fields=['user', 'content_hash'], name='notes_notes_user_id_fd5d5e_idx'),
+        ),
+        migrations.RunPython(fill_content_hashes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.1 on 2026-10-19 16:10
+
+from django.db import migrations, models
+
+import notes.fields
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notes', '0011_notes_content_hash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notes',
+            name='html',
+            field=notes.fields.CompressedTextField(blank=True, default='', editable=False),
+        ),
+        migrations.AddField(
+            model_name='notes',
+            name='html_version',
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+    ]
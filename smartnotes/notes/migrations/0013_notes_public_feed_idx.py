@@ -0,0 +1,17 @@
+# Generated by Django 5.2.1 on 2026-10-19 16:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notes', '0012_notes_html'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='notes',
+            index=models.Index(condition=models.Q(('is_public', True)), fields=['-created_at', '-id'], name='notes_public_feed_idx'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.1 on 2026-10-19 17:30
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notes', '0013_notes_public_feed_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tags', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('user', 'name'), name='unique_user_tag')],
+            },
+        ),
+        migrations.AddField(
+            model_name='notes',
+            name='tags',
+            field=models.ManyToManyField(blank=True, related_name='notes', to='notes.tag'),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.1 on 2026-10-19 10:48
+
+import django.db.models.functions.comparison
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("notes", "0014_tag"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="notes",
+            index=models.Index(fields=["created_at"], name="notes_created_at_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="notes",
+            index=models.Index(
+                django.db.models.functions.comparison.Collate("title", "NOCASE"),
+                name="notes_title_nocase_idx",
+            ),
+        ),
+    ]
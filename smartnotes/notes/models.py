@@ -1,11 +1,91 @@
+import hashlib
+
 from django.db import models
+from django.db.models.functions import Collate
 from django.contrib.auth.models import User
 
+from . import markdown
+from .fields import CompressedTextField
+
+# Characters of the text kept uncompressed in Notes.excerpt for listings.
+EXCERPT_LENGTH = 100
+
+
+def hash_content(title, text):
+    """Identify a note by its title and text, to find duplicates on import."""
+    return hashlib.sha256(f'{title}\0{text}'.encode()).hexdigest()
+
+class Tag(models.Model):
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='tags')
+    name = models.CharField(max_length=50)
+
+    class Meta:
+        constraints = [
+            # Also the index behind tag lookups and autocomplete.
+            models.UniqueConstraint(fields=['user', 'name'], name='unique_user_tag'),
+        ]
+
+    def __str__(self):
+        return self.name
+
+
 class Notes(models.Model):
     title = models.CharField(max_length=200)
-    text = models.TextField()
+    # Stored compressed; deferred wherever only the excerpt is shown.
+    text = CompressedTextField()
+    excerpt = models.CharField(max_length=EXCERPT_LENGTH, blank=True, default='', editable=False)
+    content_hash = models.CharField(max_length=64, blank=True, default='', editable=False)
+    # The text rendered from markdown by renderer version html_version.
+    html = CompressedTextField(blank=True, default='', editable=False)
+    html_version = models.PositiveSmallIntegerField(default=0, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
-    likes = models.PositiveSmallIntegerField(default=0)
+    likes = models.PositiveIntegerField(default=0)
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='notes')
-    is_public = models.BooleanField(default=True) #make every note private by default
\ No newline at end of file
+    is_public = models.BooleanField(default=True) #make every note private by default
+    tags = models.ManyToManyField(Tag, related_name='notes', blank=True)
+    # Time-decayed like score in log space, see notes.leaderboard.
+    hot_score = models.FloatField(null=True, blank=True, editable=False)
+
+    class Meta:
+        indexes = [
+            # Backs the per-user notes list, paginated on (created_at, id).
+            models.Index(fields=['user', 'created_at', 'id']),
+            # Finds notes a user already has when importing.
+            models.Index(fields=['user', 'content_hash']),
+            # Backs the public feed, paginated on (created_at, id).
+            models.Index(fields=['-created_at', '-id'], condition=models.Q(is_public=True), name='notes_public_feed_idx'),
+            # Backs the popular-notes leaderboard.
+            models.Index(fields=['-hot_score'], condition=models.Q(is_public=True), name='notes_public_hot_score_idx'),
+            # Back the admin changelist's ordering and date hierarchy, and its
+            # case-insensitive title prefix search.
+            models.Index(fields=['created_at'], name='notes_created_at_idx'),
+            models.Index(Collate('title', 'NOCASE'), name='notes_title_nocase_idx'),
+        ]
+
+    def save(self, **kwargs):
+        if not {'title', 'text'} & self.get_deferred_fields():
+            self.excerpt = self.text[:EXCERPT_LENGTH]
+            self.content_hash = hash_content(self.title, self.text)
+            self.html = markdown.render_cached(self.text)
+            self.html_version = markdown.VERSION
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None and {'title', 'text'} & set(update_fields):
+                kwargs['update_fields'] = {*update_fields, 'excerpt', 'content_hash', 'html', 'html_version'}
+        super().save(**kwargs)
+
+
+class NoteRevision(models.Model):
+    note = models.ForeignKey(Notes, on_delete=models.CASCADE, related_name='revisions')
+    number = models.PositiveIntegerField()
+    title = models.CharField(max_length=200)
+    # Full text for snapshots, otherwise a delta against the previous revision.
+    # See notes.revisions.
+    is_snapshot = models.BooleanField(default=False)
+    data = CompressedTextField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['note', 'number'], name='unique_note_revision'),
+        ]
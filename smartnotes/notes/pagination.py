@@ -0,0 +1,21 @@
+"""
+Keyset ("cursor") pagination for notes listings, newest first.
+
+The cursor is the (created_at, id) of the last note shown, so every page is
+an index range scan instead of an OFFSET that gets slower the deeper you go.
+"""
+from perftools.pagination import keyset_page
+
+
+class KeysetPaginationMixin:
+    """ListView mixin paginating object_list on (created_at, id) via ?cursor=."""
+    page_size = 20
+
+    def paginate_keyset(self, queryset):
+        return keyset_page(queryset, 'created_at', self.request.GET.get('cursor'), self.page_size)
+
+    def get_context_data(self, **kwargs):
+        objects, next_cursor = self.paginate_keyset(self.object_list)
+        kwargs['object_list'] = objects
+        kwargs['next_cursor'] = next_cursor
+        return super().get_context_data(**kwargs)
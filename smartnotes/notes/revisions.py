@@ -0,0 +1,187 @@
+"""
+Delta-encoded revision history for notes.
+
+Every save that changes a note's title or text appends a NoteRevision.
+Most revisions store only a line diff against the revision before them.
+Every NOTES_REVISION_SNAPSHOT_INTERVAL-th revision stores the full text, so
+rebuilding any revision reads at most one snapshot and the deltas after it,
+all in one query.
+
+A delta is a JSON list of operations applied to the previous revision's
+lines: ``[start, end]`` copies those lines, a string inserts new text.
+"""
+import difflib
+import json
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import OuterRef, Subquery
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from .models import NoteRevision, Notes
+
+
+def snapshot_interval():
+    return getattr(settings, 'NOTES_REVISION_SNAPSHOT_INTERVAL', 10)
+
+
+def diff(old, new):
+    """Return the JSON delta that turns ``old`` into ``new``."""
+    old_lines = old.splitlines(keepends=True)
+    new_lines = new.splitlines(keepends=True)
+    matcher = difflib.SequenceMatcher(None, old_lines, new_lines, autojunk=False)
+    ops = []
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == 'equal':
+            ops.append([i1, i2])
+        elif tag in ('replace', 'insert'):
+            ops.append(''.join(new_lines[j1:j2]))
+    return json.dumps(ops, separators=(',', ':'))
+
+
+def patch(old, delta):
+    lines = old.splitlines(keepends=True)
+    parts = []
+    for op in json.loads(delta):
+        if isinstance(op, str):
+            parts.append(op)
+        else:
+            parts.extend(lines[op[0]:op[1]])
+    return ''.join(parts)
+
+
+def encode(number, previous_text, text, interval):
+    """Return ``(is_snapshot, data)`` for revision ``number``."""
+    if previous_text is None or (number - 1) % interval == 0:
+        return True, text
+    delta = diff(previous_text, text)
+    if len(delta) >= len(text):
+        return True, text
+    return False, delta
+
+
+def stored_size(data):
+    return len(NoteRevision._meta.get_field('data').compress(data))
+
+
+def rebuild(rows):
+    """Apply revision rows, oldest first and starting at a snapshot; return the last text."""
+    text = None
+    for row in rows:
+        text = row['data'] if row['is_snapshot'] else patch(text, row['data'])
+    return text
+
+
+def revision_chain(note_id, number):
+    """Rows needed to rebuild revision ``number``: its snapshot and the deltas after it."""
+    snapshot = (
+        NoteRevision.objects.filter(
+            note_id=OuterRef('note_id'), number__lte=number, is_snapshot=True
+        )
+        .order_by('-number')
+        .values('number')[:1]
+    )
+    return (
+        NoteRevision.objects.filter(note_id=note_id, number__lte=number, number__gte=Subquery(snapshot))
+        .order_by('number')
+        .values('number', 'title', 'is_snapshot', 'data', 'created_at')
+    )
+
+
+def get_revision(note_id, number):
+    """
+    Return revision ``number`` of a note as a dict with its number, title,
+    text and created_at, or None if there is no such revision.
+    """
+    rows = list(revision_chain(note_id, number))
+    if not rows or rows[-1]['number'] != number:
+        return None
+    last = rows[-1]
+    return {
+        'number': number,
+        'title': last['title'],
+        'text': rebuild(rows),
+        'created_at': last['created_at'],
+    }
+
+
+def latest_revision(note_id):
+    number = (
+        NoteRevision.objects.filter(note_id=note_id)
+        .order_by('-number')
+        .values_list('number', flat=True)
+        .first()
+    )
+    return None if number is None else get_revision(note_id, number)
+
+
+def record(note):
+    """Append the note's current title and text as a revision, unless unchanged."""
+    for _ in range(3):
+        latest = latest_revision(note.pk)
+        if latest is not None and (latest['title'], latest['text']) == (note.title, note.text):
+            return None
+        number = 1 if latest is None else latest['number'] + 1
+        is_snapshot, data = encode(
+            number, None if latest is None else latest['text'], note.text, snapshot_interval()
+        )
+        try:
+            with transaction.atomic():
+                return NoteRevision.objects.create(
+                    note=note, number=number, title=note.title, is_snapshot=is_snapshot, data=data
+                )
+        except IntegrityError:
+            continue  # A concurrent edit took this number; diff against it instead.
+    raise IntegrityError(f'Could not record a revision of note {note.pk}.')
+
+
+def start_histories(notes):
+    """Record the first revision of notes saved without signals, e.g. by bulk_create."""
+    NoteRevision.objects.bulk_create(
+        NoteRevision(note=note, number=1, title=note.title, is_snapshot=True, data=note.text)
+        for note in notes
+    )
+
+
+def compact(note, keep=None, interval=None):
+    """
+    Re-encode a note's history with the current snapshot interval, dropping
+    all but the ``keep`` most recent revisions if given. Returns the stored
+    size of the history as ``(bytes before, bytes after)``.
+    """
+    if interval is None:
+        interval = snapshot_interval()
+    rows = list(
+        NoteRevision.objects.filter(note=note)
+        .order_by('number')
+        .values('id', 'number', 'title', 'is_snapshot', 'data')
+    )
+    before = sum(stored_size(row['data']) for row in rows)
+    texts = []
+    text = None
+    for row in rows:
+        text = row['data'] if row['is_snapshot'] else patch(text, row['data'])
+        texts.append(text)
+    if keep is not None:
+        rows, texts = rows[-keep:], texts[-keep:]
+    revisions = []
+    previous_text = None
+    for row, text in zip(rows, texts):
+        # The oldest kept revision always becomes a snapshot.
+        is_snapshot, data = encode(row['number'], previous_text, text, interval)
+        revisions.append(NoteRevision(pk=row['id'], is_snapshot=is_snapshot, data=data))
+        previous_text = text
+    with transaction.atomic():
+        NoteRevision.objects.filter(note=note).exclude(pk__in=[row['id'] for row in rows]).delete()
+        NoteRevision.objects.bulk_update(revisions, ['is_snapshot', 'data'], batch_size=500)
+    return before, sum(stored_size(revision.data) for revision in revisions)
+
+
+@receiver(post_save, sender=Notes)
+def record_revision(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and not {'title', 'text'} & set(update_fields):
+        return
+    if 'text' in instance.get_deferred_fields():
+        return
+    record(instance)
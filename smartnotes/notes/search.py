@@ -0,0 +1,173 @@
+"""
+Full-text search over notes with SQLite FTS5.
+
+notes_notes_fts stores a copy of each note's title and text, uncompressed
+as highlight() and snippet() read it, plus a "scope" column holding the
+tokens ``u<owner id>`` and ``public``/``private``. Scoping a search to
+"mine or public" is then part of the MATCH expression, so FTS5
+intersects posting lists instead of filtering every matching note in the
+table. The index is kept in sync by the Notes signals below and can be
+rebuilt with the rebuild_notes_search command.
+"""
+import re
+from datetime import timedelta
+
+from django.db import connection, transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from .models import Notes
+
+FTS_TABLE = 'notes_notes_fts'
+# Built by rebuild() next to FTS_TABLE, then renamed to replace it.
+NEW_TABLE = f'{FTS_TABLE}_new'
+COLUMNS = "title, text, scope, tokenize='unicode61 remove_diacritics 2'"
+# How far back from its start rebuild() re-indexes changed notes: further
+# than a transaction open when it started can run for.
+CATCH_UP_MARGIN = timedelta(minutes=1)
+TOKEN_RE = re.compile(r'\w+')
+# Control characters mark matches inside snippets, so the rest of the text
+# can be escaped before they are turned into <mark> tags.
+MATCH_START, MATCH_END = '\x02', '\x03'
+INSERT_SQL = f'INSERT INTO {FTS_TABLE} (rowid, title, text, scope) VALUES (%s, %s, %s, %s)'
+
+
+def enabled():
+    return connection.vendor == 'sqlite'
+
+
+def scope(note):
+    return f"u{note.user_id} {'public' if note.is_public else 'private'}"
+
+
+def index_note(note):
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [note.pk])
+        cursor.execute(INSERT_SQL, [note.pk, note.title, note.text, scope(note)])
+
+
+def index_new_notes(notes):
+    """Index notes saved without signals, e.g. by bulk_create."""
+    if not enabled():
+        return
+    with connection.cursor() as cursor:
+        cursor.executemany(INSERT_SQL, [[note.pk, note.title, note.text, scope(note)] for note in notes])
+
+
+def unindex_note(pk):
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [pk])
+
+
+def rebuild(batch_size=1000):
+    """
+    Re-index every note into a new table and swap it in for the old one;
+    returns the number of notes indexed. Each batch is written in a
+    transaction of its own, so writers wait for one batch at most, and
+    searches use the old index until the swap. Notes saved or deleted while
+    the new table was built are caught up with before it is swapped in.
+    """
+    started = timezone.now() - CATCH_UP_MARGIN
+    notes = Notes.objects.only('id', 'title', 'text', 'user', 'is_public').order_by('pk')
+    insert = INSERT_SQL.replace(FTS_TABLE, NEW_TABLE, 1)
+    count = last_pk = 0
+    with connection.cursor() as cursor:
+        cursor.execute(f'DROP TABLE IF EXISTS {NEW_TABLE}')  # Left by a failed rebuild.
+        cursor.execute(f'CREATE VIRTUAL TABLE {NEW_TABLE} USING fts5({COLUMNS})')
+        try:
+            while batch := list(notes.filter(pk__gt=last_pk)[:batch_size]):
+                last_pk = batch[-1].pk
+                rows = [[note.pk, note.title, note.text, scope(note)] for note in batch]
+                with transaction.atomic():
+                    cursor.executemany(insert, rows)
+                count += len(rows)
+            with transaction.atomic():
+                cursor.execute(f"INSERT INTO {NEW_TABLE} ({NEW_TABLE}) VALUES ('optimize')")
+            with transaction.atomic():
+                changed = [
+                    [note.pk, note.title, note.text, scope(note)] for note in notes.filter(updated_at__gte=started)
+                ]
+                cursor.executemany(f'DELETE FROM {NEW_TABLE} WHERE rowid = %s', [row[:1] for row in changed])
+                cursor.executemany(insert, changed)
+                cursor.execute(f'DELETE FROM {NEW_TABLE} WHERE rowid NOT IN (SELECT id FROM {Notes._meta.db_table})')
+                cursor.execute(f'DROP TABLE {FTS_TABLE}')
+                cursor.execute(f'ALTER TABLE {NEW_TABLE} RENAME TO {FTS_TABLE}')
+        except BaseException:
+            cursor.execute(f'DROP TABLE IF EXISTS {NEW_TABLE}')
+            raise
+    return count
+
+
+def table_sizes():
+    """
+    Return the bytes FTS_TABLE holds as ``(copied, index)``: its copy of
+    titles and texts, which is not compressed, and its postings.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'SELECT COALESCE(SUM(LENGTH(CAST(c0 AS BLOB)) + LENGTH(CAST(c1 AS BLOB))), 0) FROM {FTS_TABLE}_content'
+        )
+        copied = cursor.fetchone()[0]
+        cursor.execute(f'SELECT COALESCE(SUM(LENGTH(block)), 0) FROM {FTS_TABLE}_data')
+        index = cursor.fetchone()[0]
+    return copied, index
+
+
+def match_expression(query, user):
+    """Build an FTS5 MATCH expression; every word must match, the last as a prefix."""
+    words = TOKEN_RE.findall(query.lower())
+    if not words:
+        return None
+    terms = [f'"{word}"' for word in words]
+    terms[-1] += '*'
+    return f"(scope:u{user.pk} OR scope:public) AND {{title text}}: ({' AND '.join(terms)})"
+
+
+def highlight(fragment):
+    return mark_safe(escape(fragment).replace(MATCH_START, '<mark>').replace(MATCH_END, '</mark>'))
+
+
+def search(query, user, limit=20):
+    """Return the best matching notes the user may read, with highlighted snippets."""
+    expression = match_expression(query, user)
+    if expression is None or not enabled():
+        return []
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'''
+            SELECT rowid,
+                   highlight({FTS_TABLE}, 0, %s, %s),
+                   snippet({FTS_TABLE}, 1, %s, %s, '…', 16)
+            FROM {FTS_TABLE}
+            WHERE {FTS_TABLE} MATCH %s
+            ORDER BY bm25({FTS_TABLE}, 10.0, 1.0, 0.0)
+            LIMIT %s
+            ''',
+            [MATCH_START, MATCH_END, MATCH_START, MATCH_END, expression, limit],
+        )
+        rows = cursor.fetchall()
+    return [
+        {'id': pk, 'title': highlight(title), 'snippet': highlight(snippet)}
+        for pk, title, snippet in rows
+    ]
+
+
+@receiver(post_save, sender=Notes)
+def index_saved_note(sender, instance, update_fields=None, **kwargs):
+    if not enabled():
+        return
+    if update_fields is not None and not {'title', 'text'} & set(update_fields):
+        # Only visibility or counters changed: refresh the scope column.
+        with connection.cursor() as cursor:
+            cursor.execute(f'UPDATE {FTS_TABLE} SET scope = %s WHERE rowid = %s', [scope(instance), instance.pk])
+        return
+    index_note(instance)
+
+
+@receiver(post_delete, sender=Notes)
+def unindex_deleted_note(sender, instance, **kwargs):
+    if enabled():
+        unindex_note(instance.pk)
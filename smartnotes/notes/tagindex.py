@@ -0,0 +1,96 @@
+"""
+In-process tag autocomplete.
+
+Each user's tag names are kept in a sorted list, so completing a prefix is
+a bisect and a short slice: microseconds however many tags the user has.
+A user's list is built on their first autocomplete request, kept current by
+Tag signals in this process, and rebuilt after TAG_INDEX_MAX_AGE seconds to
+pick up tags created by other processes. Only the TAG_INDEX_MAX_USERS most
+recently active users are kept.
+"""
+import bisect
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Tag
+
+
+class TagIndex:
+    def __init__(self, max_users=None, max_age=None):
+        if max_users is None:
+            max_users = getattr(settings, 'TAG_INDEX_MAX_USERS', 1000)
+        if max_age is None:
+            max_age = getattr(settings, 'TAG_INDEX_MAX_AGE', 300)
+        self.max_users = max_users
+        self.max_age = max_age
+        self.lock = threading.Lock()
+        self.users = OrderedDict()  # user id -> (built at, sorted names)
+
+    def names(self, user_id):
+        with self.lock:
+            entry = self.users.get(user_id)
+            if entry is not None and time.monotonic() - entry[0] < self.max_age:
+                self.users.move_to_end(user_id)
+                return entry[1]
+        names = sorted(Tag.objects.filter(user_id=user_id).values_list('name', flat=True))
+        with self.lock:
+            self.users[user_id] = (time.monotonic(), names)
+            self.users.move_to_end(user_id)
+            while len(self.users) > self.max_users:
+                self.users.popitem(last=False)
+        return names
+
+    def complete(self, user_id, prefix, limit=10):
+        """Return up to ``limit`` of the user's tag names starting with ``prefix``."""
+        prefix = normalize(prefix)
+        names = self.names(user_id)
+        with self.lock:
+            start = bisect.bisect_left(names, prefix)
+            matches = []
+            for name in names[start:start + limit]:
+                if not name.startswith(prefix):
+                    break
+                matches.append(name)
+        return matches
+
+    def add(self, user_id, name):
+        with self.lock:
+            entry = self.users.get(user_id)
+            if entry is not None:
+                names = entry[1]
+                position = bisect.bisect_left(names, name)
+                if position == len(names) or names[position] != name:
+                    names.insert(position, name)
+
+    def remove(self, user_id, name):
+        with self.lock:
+            entry = self.users.get(user_id)
+            if entry is not None:
+                names = entry[1]
+                position = bisect.bisect_left(names, name)
+                if position < len(names) and names[position] == name:
+                    del names[position]
+
+
+def normalize(name):
+    """Tags are lowercase, with runs of whitespace collapsed to one space."""
+    return ' '.join(name.lower().split())
+
+
+index = TagIndex()
+
+
+@receiver(post_save, sender=Tag)
+def index_tag(sender, instance, created, **kwargs):
+    if created:
+        index.add(instance.user_id, instance.name)
+
+
+@receiver(post_delete, sender=Tag)
+def unindex_tag(sender, instance, **kwargs):
+    index.remove(instance.user_id, instance.name)
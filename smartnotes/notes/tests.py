@@ -1,3 +1,755 @@
-from django.test import TestCase
+import asyncio
+import contextlib
+import io
+import json
+import math
+import os
+import tempfile
+import threading
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import User
+from django.contrib import admin
+from django.core.cache import cache
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management import CommandError, call_command
+from django.core.signals import request_finished, request_started
+from django.db import close_old_connections, connection
+from django.db.models import F
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve, reverse
+
+from perftools.replicas import reads_from_replica
+
+from . import caching, events, markdown, revisions, search, tagindex, transfer
+from .leaderboard import Leaderboard, add_likes_expression, hot_score_increment
+from .likes import LikeCounter, like_counter
+from .models import NoteRevision, Notes, Tag
+
+
+class NotesListViewTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('alice', password='pw')
+        self.other = User.objects.create_user('bob', password='pw')
+        self.client.force_login(self.user)
+
+    def test_lists_only_own_notes_with_excerpt(self):
+        Notes.objects.create(user=self.user, title='Mine', text='A fairly long body of text')
+        Notes.objects.create(user=self.other, title='Theirs', text='Hidden')
+
+        response = self.client.get(reverse('notes.list'))
+        notes = response.context['notes']
+        self.assertEqual([note.title for note in notes], ['Mine'])
+        self.assertEqual(notes[0].excerpt, 'A fairly long body of text')
+        self.assertIn('text', notes[0].get_deferred_fields())
+        self.assertContains(response, 'A fairly …')
+
+    def test_keyset_pagination(self):
+        for number in range(25):
+            Notes.objects.create(user=self.user, title=f'Note {number}', text='...')
+
+        # Session, user, one page of notes and their tags.
+        with self.assertNumQueries(4):
+            response = self.client.get(reverse('notes.list'))
+        first_page = response.context['notes']
+        self.assertEqual(len(first_page), 20)
+        response = self.client.get(reverse('notes.list'), {'cursor': response.context['next_cursor']})
+        second_page = response.context['notes']
+        self.assertEqual(len(second_page), 5)
+        self.assertIsNone(response.context['next_cursor'])
+        titles = [note.title for note in first_page + second_page]
+        self.assertEqual(titles, [f'Note {number}' for number in reversed(range(25))])
+
+    def test_page_query_count_is_flat(self):
+        for number in range(10):
+            Notes.objects.create(user=self.user, title=f'Note {number}', text='...')
+        # The session, the user, the page of notes and their tags.
+        with self.assertNumQueries(4):
+            self.client.get(reverse('notes.list'))
+
+    def test_read_views_may_use_the_replica(self):
+        for url in [reverse('notes.list'), reverse('notes.public'), reverse('notes.detail', args=(1,))]:
+            self.assertTrue(reads_from_replica(resolve(url).func), url)
+        self.assertFalse(reads_from_replica(resolve(reverse('notes.new')).func))
+
+
+class LikeCounterTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('alice', password='pw')
+        self.note = Notes.objects.create(user=self.user, title='Popular', text='...', likes=40000)
+        patcher = mock.patch.object(like_counter, 'flush_interval', 0)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(like_counter.flush)
+
+    def test_likes_are_buffered_and_merged_on_read(self):
+        for _ in range(3):
+            self.client.post(reverse('notes.add_like', args=[self.note.pk]))
+
+        self.note.refresh_from_db()
+        self.assertEqual(self.note.likes, 40000)
+        response = self.client.get(reverse('notes.detail', args=[self.note.pk]))
+        self.assertEqual(response.context['note'].likes, 40003)
+
+    def test_flush_batches_without_touching_the_row(self):
+        other = Notes.objects.create(user=self.user, title='Other', text='...')
+        updated_at = self.note.updated_at
+        counter = LikeCounter(flush_interval=0, flush_threshold=1000)
+        counter.add(self.note.pk, 2)
+        counter.add(other.pk)
+        counter.add(other.pk)
+
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(counter.flush(), 4)
+        updates = [query for query in queries if query['sql'].startswith('UPDATE')]
+        self.assertEqual(len(updates), 1)
+        self.note.refresh_from_db()
+        other.refresh_from_db()
+        self.assertEqual((self.note.likes, other.likes), (40002, 2))
+        self.assertEqual(self.note.updated_at, updated_at)
+        self.assertEqual(counter.pending_for(self.note.pk), 0)
+
+    def test_threshold_triggers_flush(self):
+        counter = LikeCounter(flush_interval=0, flush_threshold=2)
+        counter.add(self.note.pk)
+        counter.add(self.note.pk)
+        self.note.refresh_from_db()
+        self.assertEqual(self.note.likes, 40002)
+
+
+class NotesSearchTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('alice', password='pw')
+        self.other = User.objects.create_user('bob', password='pw')
+        self.client.force_login(self.user)
+
+    def test_scoped_to_own_and_public_notes(self):
+        mine = Notes.objects.create(user=self.user, title='Groceries', text='Buy apples', is_public=False)
+        shared = Notes.objects.create(user=self.other, title='Recipes', text='Apple pie')
+        Notes.objects.create(user=self.other, title='Diary', text='Apples again', is_public=False)
+
+        ids = {result['id'] for result in search.search('appl', self.user)}
+        self.assertEqual(ids, {mine.pk, shared.pk})
+
+    def test_title_matches_rank_first_and_are_highlighted(self):
+        body = Notes.objects.create(user=self.user, title='Misc', text='Remember the <b>garden</b> party')
+        title = Notes.objects.create(user=self.user, title='Garden plans', text='Tomatoes')
+
+        results = search.search('garden', self.user)
+        self.assertEqual([result['id'] for result in results], [title.pk, body.pk])
+        self.assertEqual(results[0]['title'], '<mark>Garden</mark> plans')
+        self.assertIn('&lt;b&gt;<mark>garden</mark>&lt;/b&gt;', results[1]['snippet'])
+
+    def test_index_follows_edits_visibility_and_deletes(self):
+        note = Notes.objects.create(user=self.other, title='Plans', text='Holiday')
+        self.assertEqual(len(search.search('holiday', self.user)), 1)
+
+        note.is_public = False
+        note.save(update_fields=['is_public', 'updated_at'])
+        self.assertEqual(search.search('holiday', self.user), [])
+
+        note.is_public = True
+        note.text = 'Weekend'
+        note.save()
+        self.assertEqual(search.search('holiday', self.user), [])
+        self.assertEqual(len(search.search('weekend', self.user)), 1)
+
+        note.delete()
+        self.assertEqual(search.search('weekend', self.user), [])
+
+    def test_view_and_rebuild(self):
+        Notes.objects.create(user=self.user, title='Reading list', text='Dune')
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {search.FTS_TABLE}')
+        self.assertEqual(search.rebuild(), 1)
+
+        response = self.client.get(reverse('notes.search'), {'q': 'dune "'})
+        self.assertContains(response, '<mark>Dune</mark>')
+
+    def test_failed_rebuild_keeps_the_index(self):
+        Notes.objects.create(user=self.user, title='Reading list', text='Dune')
+        with mock.patch.object(search, 'scope', side_effect=RuntimeError), self.assertRaises(RuntimeError):
+            search.rebuild()
+        self.assertEqual(len(search.search('dune', self.user)), 1)
+
+    def test_rebuild_keeps_changes_made_meanwhile(self):
+        edited, deleted, last = (Notes.objects.create(user=self.user, title=title, text='Dune') for title in 'ABC')
+        scope = search.scope
+
+        def scope_while_writing(note):
+            # The first two are indexed by now; the signals update the old table.
+            if note.pk == last.pk and deleted.pk:
+                edited.text = 'Arrakis'
+                edited.save()
+                deleted.delete()
+            return scope(note)
+
+        with mock.patch.object(search, 'scope', side_effect=scope_while_writing):
+            search.rebuild(batch_size=1)
+        self.assertEqual([result['id'] for result in search.search('dune', self.user)], [last.pk])
+        self.assertEqual([result['id'] for result in search.search('arrakis', self.user)], [edited.pk])
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT name FROM sqlite_master WHERE name = %s', [search.NEW_TABLE])
+            self.assertIsNone(cursor.fetchone())
+
+
+class LeaderboardTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('alice', password='pw')
+        self.leaderboard = Leaderboard(size=2, refresh_interval=3600)
+        for target in ('notes.leaderboard.leaderboard', 'notes.likes.leaderboard'):
+            patcher = mock.patch(target, self.leaderboard)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def like(self, note, count, when):
+        Notes.objects.filter(pk=note.pk).update(likes=F('likes') + count, hot_score=add_likes_expression(count, when))
+
+    def test_hot_score_accumulates_in_log_space(self):
+        note = Notes.objects.create(user=self.user, title='Note', text='...')
+        self.like(note, 2, 1e9)
+        self.like(note, 3, 1e9)
+        note.refresh_from_db()
+        self.assertAlmostEqual(note.hot_score, hot_score_increment(5, 1e9))
+
+    def test_recent_likes_outrank_old_ones(self):
+        half_life = 24 * 60 * 60
+        now = 1.8e9
+        old = Notes.objects.create(user=self.user, title='Old', text='...')
+        new = Notes.objects.create(user=self.user, title='New', text='...')
+        hidden = Notes.objects.create(user=self.user, title='Hidden', text='...', is_public=False)
+        self.like(old, 10, now - 4 * half_life)
+        self.like(new, 1, now)
+        self.like(hidden, 100, now)
+
+        entries = self.leaderboard.entries()
+        self.assertEqual([entry['title'] for entry in entries], ['New', 'Old'])
+        with mock.patch('time.time', return_value=now):
+            self.assertTrue(math.isclose(self.leaderboard.entries()[1]['score'], 10 / 16))
+
+    def test_updates_incrementally_and_drops_private_notes(self):
+        first, second, third = (
+            Notes.objects.create(user=self.user, title=title, text='...') for title in ('First', 'Second', 'Third')
+        )
+        self.like(first, 3, 1e9)
+        self.like(second, 2, 1e9)
+        self.leaderboard.entries()
+
+        counter = LikeCounter(flush_interval=0, flush_threshold=1000)
+        for _ in range(5):
+            counter.add(third.pk)
+        counter.flush()
+        with self.assertNumQueries(0):
+            entries = self.leaderboard.entries()
+        self.assertEqual([entry['title'] for entry in entries], ['Third', 'First'])
+
+        third.is_public = False
+        third.save(update_fields=['is_public', 'updated_at'])
+        self.assertEqual([entry['title'] for entry in self.leaderboard.entries()], ['First', 'Second'])
+
+    def test_view_serves_the_leaderboard(self):
+        note = Notes.objects.create(user=self.user, title='Popular', text='...')
+        self.like(note, 1, 1e9)
+        response = self.client.get(reverse('notes.popular'))
+        self.assertEqual([entry['id'] for entry in response.context['notes']], [note.pk])
+        with self.assertNumQueries(0):
+            self.client.get(reverse('notes.popular'))
+
+
+class NotesDetailCacheTestCase(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user('alice', password='pw')
+        self.other = User.objects.create_user('bob', password='pw')
+        self.note = Notes.objects.create(user=self.owner, title='Shared', text='Hello')
+
+    def test_public_note_costs_no_queries_when_warm(self):
+        url = reverse('notes.detail', args=[self.note.pk])
+        self.client.get(url)
+        with self.assertNumQueries(0):
+            response = self.client.get(url)
+        self.assertContains(response, 'Hello')
+
+    def test_private_note_is_only_served_to_its_owner(self):
+        self.note.is_public = False
+        self.note.save()
+        url = reverse('notes.detail', args=[self.note.pk])
+        self.client.force_login(self.owner)
+        self.assertContains(self.client.get(url), 'Hello')
+
+        self.client.force_login(self.other)
+        self.assertEqual(self.client.get(url).status_code, 404)
+        self.client.logout()
+        self.assertEqual(self.client.get(url).status_code, 404)
+        self.assertIsNone(cache.get(caching.public_key(self.note.pk)))
+
+    def test_invalidated_on_edit_and_visibility_change(self):
+        url = reverse('notes.detail', args=[self.note.pk])
+        self.client.get(url)
+        self.client.force_login(self.owner)
+        self.client.post(reverse('notes.update', args=[self.note.pk]), {'title': 'Shared', 'text': 'Updated'})
+        self.assertContains(self.client.get(url), 'Updated')
+
+        self.client.post(reverse('notes.change_visibility', args=[self.note.pk]))
+        self.client.logout()
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_flushed_likes_refresh_the_entry(self):
+        url = reverse('notes.detail', args=[self.note.pk])
+        counter = LikeCounter(flush_interval=0, flush_threshold=1000)
+        counter.add(self.note.pk, 3)
+        self.client.get(url)
+        counter.flush()
+        self.assertEqual(self.client.get(url).context['note'].likes, 3)
+
+
+class CompressedTextTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('alice', password='pw')
+
+    def raw_text(self, note):
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT text FROM notes_notes WHERE id = %s', [note.pk])
+            return cursor.fetchone()[0]
+
+    def test_large_bodies_are_compressed_and_round_trip(self):
+        text = 'All work and no play makes Jack a dull boy. ' * 200
+        note = Notes.objects.create(user=self.user, title='Long', text=text)
+        short = Notes.objects.create(user=self.user, title='Short', text='Tiny')
+
+        self.assertLess(len(self.raw_text(note)), len(text) // 10)
+        self.assertEqual(Notes.objects.get(pk=note.pk).text, text)
+        self.assertEqual(Notes.objects.get(pk=short.pk).text, 'Tiny')
+        self.assertEqual(note.excerpt, text[:100])
+
+    def test_command_compresses_legacy_rows(self):
+        text = 'Plain text from before compression. ' * 100
+        note = Notes.objects.create(user=self.user, title='Legacy', text='...')
+        with connection.cursor() as cursor:
+            cursor.execute('UPDATE notes_notes SET text = %s WHERE id = %s', [text, note.pk])
+        self.assertEqual(Notes.objects.get(pk=note.pk).text, text)
+
+        out = StringIO()
+        call_command('compress_notes', batch_size=1, stdout=out)
+        self.assertIn('Compressed 1 of 1 notes', out.getvalue())
+        # The index was written when the note was created: 'Legacy' and '...'.
+        self.assertIn('uncompressed copy of titles and text: 9 bytes', out.getvalue())
+        self.assertIsInstance(self.raw_text(note), bytes)
+        self.assertEqual(Notes.objects.get(pk=note.pk).text, text)
+
+    def test_editing_refreshes_the_excerpt(self):
+        note = Notes.objects.create(user=self.user, title='Note', text='Before')
+        self.client.force_login(self.user)
+        self.client.post(reverse('notes.update', args=[note.pk]), {'title': 'Note', 'text': 'After'})
+        note.refresh_from_db()
+        self.assertEqual((note.text, note.excerpt), ('After', 'After'))
+
+
+@override_settings(NOTES_REVISION_SNAPSHOT_INTERVAL=3)
+class NoteRevisionTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('alice', password='pw')
+        # Each version edits one line of the previous one.
+        self.texts = [
+            ''.join(f'Line {line} of version {version if line == version else 0}\n' for line in range(20))
+            for version in range(8)
+        ]
+        self.note = Notes.objects.create(user=self.user, title='Draft', text=self.texts[0])
+        for text in self.texts[1:]:
+            self.note.text = text
+            self.note.save()
+
+    def test_every_revision_can_be_rebuilt(self):
+        stored = list(self.note.revisions.order_by('number').values_list('number', 'is_snapshot'))
+        self.assertEqual(stored, [(number, number % 3 == 1) for number in range(1, 9)])
+        for number, text in enumerate(self.texts, start=1):
+            with self.assertNumQueries(1):
+                self.assertEqual(revisions.get_revision(self.note.pk, number)['text'], text)
+        self.assertIsNone(revisions.get_revision(self.note.pk, 9))
+
+    def test_deltas_are_smaller_than_copies(self):
+        deltas = NoteRevision.objects.filter(note=self.note, is_snapshot=False).values_list('data', flat=True)
+        self.assertTrue(all(len(delta) < len(self.texts[0]) / 4 for delta in deltas))
+
+    def test_unchanged_saves_and_likes_add_no_revision(self):
+        self.note.save()
+        self.note.is_public = False
+        self.note.save(update_fields=['is_public', 'updated_at'])
+        self.assertEqual(self.note.revisions.count(), 8)
+
+    def test_compaction_keeps_the_latest_revisions(self):
+        before, after = revisions.compact(self.note, keep=4)
+        self.assertLess(after, before)
+        self.assertEqual(list(self.note.revisions.values_list('number', flat=True).order_by('number')), [5, 6, 7, 8])
+        for number in range(5, 9):
+            self.assertEqual(revisions.get_revision(self.note.pk, number)['text'], self.texts[number - 1])
+        self.note.text = 'Rewritten'
+        self.note.save()
+        self.assertEqual(revisions.get_revision(self.note.pk, 9)['text'], 'Rewritten')
+
+    def test_history_is_only_shown_to_the_owner(self):
+        url = reverse('notes.revision', args=[self.note.pk, 2])
+        self.client.force_login(self.user)
+        self.assertContains(self.client.get(url), 'Line 1 of version 1')
+        self.client.force_login(User.objects.create_user('bob', password='pw'))
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+
+class NotesTransferTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('alice', password='pw')
+        self.other = User.objects.create_user('bob', password='pw')
+        Notes.objects.create(user=self.user, title='First: draft', text='Line one\n---\n\nLine two')
+        Notes.objects.create(user=self.user, title='Second', text='Private thoughts', is_public=False)
+
+    def test_ndjson_endpoint_streams_own_notes(self):
+        Notes.objects.create(user=self.other, title='Not mine', text='...')
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('notes.export'))
+        self.assertTrue(response.streaming)
+        records = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+        self.assertEqual([record['title'] for record in records], ['First: draft', 'Second'])
+        self.assertFalse(records[1]['is_public'])
+
+    def test_zip_round_trip_into_another_account(self):
+        archive = io.BytesIO(b''.join(transfer.export(self.user, 'zip')))
+        self.assertEqual(transfer.import_notes(self.other, transfer.reader(archive, 'zip'), chunk_size=1), (2, 0))
+
+        original = Notes.objects.get(user=self.user, title='First: draft')
+        imported = Notes.objects.get(user=self.other, title='First: draft')
+        self.assertEqual(imported.text, original.text)
+        self.assertEqual(imported.created_at, original.created_at)
+        self.assertEqual(imported.content_hash, original.content_hash)
+        self.assertEqual(revisions.get_revision(imported.pk, 1)['text'], original.text)
+        self.assertEqual([result['id'] for result in search.search('thoughts', self.other)], [
+            Notes.objects.get(user=self.other, title='Second').pk
+        ])
+
+    def test_import_skips_duplicates(self):
+        lines = list(transfer.export(self.user, 'ndjson'))
+        lines.append(json.dumps({'title': 'Third', 'text': 'New'}) + '\n')
+        self.assertEqual(transfer.import_notes(self.user, lambda: transfer.read_ndjson(lines + lines)), (1, 5))
+        self.assertEqual(self.user.notes.count(), 3)
+
+    def test_tags_round_trip(self):
+        note = Notes.objects.get(title='Second')
+        note.tags.add(Tag.objects.create(user=self.user, name='work'), Tag.objects.create(user=self.user, name='ideas'))
+        Tag.objects.create(user=self.other, name='work')
+        lines = list(transfer.export(self.user, 'ndjson'))
+        self.assertEqual(json.loads(lines[1])['tags'], ['ideas', 'work'])
+
+        transfer.import_notes(self.other, lambda: transfer.read_ndjson(lines))
+        imported = Notes.objects.get(user=self.other, title='Second')
+        self.assertEqual(sorted(tag.name for tag in imported.tags.all()), ['ideas', 'work'])
+        self.assertEqual(self.other.tags.count(), 2)
+
+    def test_invalid_line_imports_nothing(self):
+        lines = list(transfer.export(self.user, 'ndjson'))
+        for bad in ('{"title": "Third"\n', '{"title": 3}\n', '{"tags": "work"}\n', '{"created_at": "yesterday"}\n'):
+            with self.subTest(bad), self.assertRaisesRegex(transfer.InvalidRecord, '^Line 3: '):
+                transfer.import_notes(self.other, lambda: transfer.read_ndjson(lines + [bad]), chunk_size=1)
+        self.assertFalse(self.other.notes.exists())
+
+    def test_markdown_is_rendered_outside_transactions(self):
+        lines = list(transfer.export(self.user, 'ndjson'))
+        depth = len(connection.atomic_blocks)  # The test case's own.
+        depths = []
+
+        def render(text):
+            depths.append(len(connection.atomic_blocks))
+            return markdown.render(text)
+
+        with mock.patch.object(markdown, 'render_cached', side_effect=render):
+            transfer.import_notes(self.other, lambda: transfer.read_ndjson(lines), chunk_size=1)
+        self.assertEqual(depths, [depth, depth])
+        self.assertEqual(self.other.notes.count(), 2)
+
+    def test_commands(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, 'notes.ndjson')
+        call_command('export_notes', 'alice', output=path)
+        out = StringIO()
+        call_command('import_notes', 'bob', path, stdout=out)
+        self.assertIn('Imported 2 notes, skipped 0 duplicates', out.getvalue())
+
+        with open(path, 'a') as file:
+            file.write('not json\n')
+        with self.assertRaisesMessage(CommandError, 'Nothing imported. Line 3: '):
+            call_command('import_notes', 'alice', path)
+
+
+class MarkdownTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('alice', password='pw')
+
+    def test_render(self):
+        html = markdown.render(
+            '# Plan\n\nSome **bold** and *em* text with `<b>`.\n\n- one\n- [two](https://example.com/a_b)\n'
+        )
+        self.assertEqual(html, (
+            '<h1>Plan</h1>\n'
+            '<p>Some <strong>bold</strong> and <em>em</em> text with <code>&lt;b&gt;</code>.</p>\n'
+            '<ul><li>one</li><li><a href="https://example.com/a_b" rel="nofollow noopener">two</a></li></ul>'
+        ))
+
+    def test_output_is_sanitized(self):
+        html = markdown.render(
+            '<script>alert(1)</script>\n[x](javascript:alert(1)) [y](JaVaScRiPt:x) [z](data:text/html,x) [w]("onclick=x)'
+        )
+        self.assertNotIn('<script', html)
+        self.assertEqual(html.count('<a '), 1)
+        self.assertIn('<a href="&quot;onclick=x"', html)
+
+    def test_rendered_on_save_and_shown(self):
+        note = Notes.objects.create(user=self.user, title='Note', text='Hello **world**')
+        self.assertEqual((note.html, note.html_version), ('<p>Hello <strong>world</strong></p>', markdown.VERSION))
+        response = self.client.get(reverse('notes.detail', args=[note.pk]))
+        self.assertContains(response, '<strong>world</strong>', html=True)
+
+    def test_old_rows_are_rendered_lazily_and_by_command(self):
+        first = Notes.objects.create(user=self.user, title='First', text='*one*')
+        second = Notes.objects.create(user=self.user, title='Second', text='*two*')
+        Notes.objects.update(html='', html_version=0)
+
+        self.client.get(reverse('notes.detail', args=[first.pk]))
+        first.refresh_from_db()
+        self.assertEqual((first.html, first.html_version), ('<p><em>one</em></p>', markdown.VERSION))
+
+        call_command('rerender_notes', processes=2, stdout=StringIO())
+        second.refresh_from_db()
+        self.assertEqual((second.html, second.html_version), ('<p><em>two</em></p>', markdown.VERSION))
+
+
+class PublicNotesFeedTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('alice', password='pw')
+        for number in range(25):
+            Notes.objects.create(user=self.user, title=f'Public {number}', text='...')
+        Notes.objects.create(user=self.user, title='Private', text='...', is_public=False)
+
+    def test_anonymous_feed_is_paginated_and_cacheable(self):
+        response = self.client.get(reverse('notes.public'))
+        titles = [note.title for note in response.context['notes']]
+        self.assertEqual(titles, [f'Public {number}' for number in range(24, 4, -1)])
+        self.assertIn('public', response['Cache-Control'])
+        self.assertIn('max-age=60', response['Cache-Control'])
+
+        response = self.client.get(reverse('notes.public'), {'cursor': response.context['next_cursor']})
+        self.assertEqual(len(response.context['notes']), 5)
+        self.assertNotContains(response, 'Private')
+
+    def test_revalidation(self):
+        response = self.client.get(reverse('notes.public'))
+        etag = response['ETag']
+        response = self.client.get(reverse('notes.public'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        note = Notes.objects.get(title='Public 24')
+        note.is_public = False
+        note.save(update_fields=['is_public', 'updated_at'])
+        response = self.client.get(reverse('notes.public'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_logged_in_readers_get_a_private_response(self):
+        etag = self.client.get(reverse('notes.public'))['ETag']
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('notes.public'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('private', response['Cache-Control'])
+
+    def test_feed_uses_the_partial_index(self):
+        queryset = Notes.objects.filter(is_public=True).order_by('-created_at', '-id')[:21]
+        self.assertIn('notes_public_feed_idx', queryset.explain())
+
+
+class TagsTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('alice', password='pw')
+        self.client.force_login(self.user)
+        self.index = tagindex.TagIndex()
+        patcher = mock.patch.object(tagindex, 'index', self.index)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_form_creates_and_reuses_tags(self):
+        self.client.post(reverse('notes.new'), {'title': 'Trip', 'text': '...', 'tags': 'Travel,  Summer  plans, travel'})
+        note = Notes.objects.get(title='Trip')
+        self.assertEqual(sorted(note.tags.values_list('name', flat=True)), ['summer plans', 'travel'])
+
+        self.client.post(reverse('notes.update', args=[note.pk]), {'title': 'Trip', 'text': '...', 'tags': 'travel, budget'})
+        self.assertEqual(sorted(note.tags.values_list('name', flat=True)), ['budget', 'travel'])
+        self.assertEqual(Tag.objects.filter(user=self.user, name='travel').count(), 1)
+
+    def test_list_filtered_by_tag(self):
+        tagged = Notes.objects.create(user=self.user, title='Tagged', text='...')
+        Notes.objects.create(user=self.user, title='Untagged', text='...')
+        tagged.tags.add(Tag.objects.create(user=self.user, name='work'))
+
+        response = self.client.get(reverse('notes.tag', args=['work']))
+        self.assertEqual([note.title for note in response.context['notes']], ['Tagged'])
+        self.assertContains(response, 'Notes tagged "work"')
+
+    def test_autocomplete_is_per_user_and_follows_signals(self):
+        other = User.objects.create_user('bob', password='pw')
+        Tag.objects.bulk_create([Tag(user=self.user, name=f'tag {number:05}') for number in range(20000)])
+        Tag.objects.create(user=other, name='tag secret')
+
+        response = self.client.get(reverse('notes.tag_autocomplete'), {'q': 'Tag 0001'})
+        self.assertEqual(response.json()['tags'], [f'tag {number:05}' for number in range(10, 20)])
+
+        Tag.objects.create(user=self.user, name='tag 0001a')
+        Tag.objects.get(user=self.user, name='tag 00010').delete()
+        with self.assertNumQueries(0):
+            matches = self.index.complete(self.user.pk, 'tag 0001', limit=3)
+        self.assertEqual(matches, ['tag 00011', 'tag 00012', 'tag 00013'])
+        self.assertEqual(self.index.complete(self.user.pk, 'tag 0001a'), ['tag 0001a'])
+        self.assertEqual(self.index.complete(other.pk, 'tag'), ['tag secret'])
+
+
+class NoteEventsTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('alice', password='pw')
+        self.other = User.objects.create_user('bob', password='pw')
+        self.note = Notes.objects.create(user=self.user, title='Live', text='...', is_public=True, likes=3)
+        self.broker = events.Broker()
+        patcher = mock.patch.object(events, 'broker', self.broker)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(like_counter.flush)
+
+    def test_publish_from_a_thread_reaches_every_listener(self):
+        async def listen(count):
+            with contextlib.ExitStack() as stack:
+                subscribers = [stack.enter_context(self.broker.subscribe(self.note.pk)) for _ in range(count)]
+                publisher = threading.Thread(target=self.broker.publish, args=(self.note.pk, {'likes': 4}))
+                publisher.start()
+                received = await asyncio.gather(*(subscriber.queue.get() for subscriber in subscribers))
+                publisher.join()
+                return received
+
+        received = asyncio.run(listen(2000))
+        self.assertEqual(len(received), 2000)
+        self.assertTrue(all(event == {'likes': 4} for event in received))
+        self.assertEqual(self.broker.listener_count(), 0)
+
+    def test_stream_ends_when_note_turns_private_for_other_readers(self):
+        async def read():
+            stream = events.stream({'id': self.note.pk, 'user_id': self.user.pk, 'likes': 3, 'is_public': True}, self.other.pk)
+            messages = [await anext(stream)]
+            self.broker.publish(self.note.pk, {'likes': 4})
+            self.broker.publish(self.note.pk, {'is_public': False})
+            messages += [message async for message in stream]
+            return messages
+
+        self.assertEqual(asyncio.run(read()), [
+            'data: {"likes": 3, "is_public": true}\n\n',
+            'data: {"likes": 4}\n\n',
+            'data: {"is_public": false}\n\n',
+        ])
+
+    def test_likes_and_visibility_changes_are_published(self):
+        with mock.patch.object(self.broker, 'publish') as publish:
+            self.client.post(reverse('notes.add_like', args=[self.note.pk]))
+            self.client.force_login(self.user)
+            self.client.post(reverse('notes.change_visibility', args=[self.note.pk]))
+        self.assertEqual(publish.call_args_list, [
+            mock.call(self.note.pk, {'likes': 4}),
+            mock.call(self.note.pk, {'is_public': False}),
+        ])
+
+    async def test_view_streams_state_to_allowed_readers(self):
+        await self.async_client.aforce_login(self.other)
+        response = await self.async_client.get(reverse('notes.events', args=[self.note.pk]))
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        self.assertEqual(await anext(response.streaming_content), b'data: {"likes": 3, "is_public": true}\n\n')
+        await response.streaming_content.aclose()
+
+        await Notes.objects.filter(pk=self.note.pk).aupdate(is_public=False)
+        response = await self.async_client.get(reverse('notes.events', args=[self.note.pk]))
+        self.assertEqual(response.status_code, 404)
+
+    @override_settings(NOTES_EVENTS_HEARTBEAT=1)
+    def test_wsgi_stream_ends_after_one_heartbeat(self):
+        # The handler closes the test's database connection around requests.
+        for signal in (request_started, request_finished):
+            signal.disconnect(close_old_connections)
+            self.addCleanup(signal.connect, close_old_connections)
+        environ = RequestFactory().get(reverse('notes.events', args=[self.note.pk])).environ
+        response = WSGIHandler()(environ, mock.Mock())
+        self.addCleanup(response.close)
+        received = []
+
+        def read():
+            chunks = iter(response)
+            received.append(next(chunks))
+            self.broker.publish(self.note.pk, {'likes': 4})
+            received.extend(chunks)
+
+        reader = threading.Thread(target=read, daemon=True)
+        reader.start()
+        reader.join(5)
+        self.assertFalse(reader.is_alive())
+        self.assertEqual(received, [
+            b'retry: 1000\ndata: {"likes": 3, "is_public": true}\n\n',
+            b'data: {"likes": 4}\n\n',
+        ])
+        self.assertEqual(self.broker.listener_count(), 0)
+
+    async def test_detail_page_listens_only_under_asgi(self):
+        url = reverse('notes.detail', args=[self.note.pk])
+        self.assertContains(await self.async_client.get(url), 'EventSource')
+        self.assertNotContains(await sync_to_async(self.client.get)(url), 'EventSource')
+
+
+class SeedCommandTestCase(TestCase):
+    def test_seed_is_deterministic_and_complete(self):
+        for prefix in ('a', 'b'):
+            call_command('seed', users=10, notes=40, seed=5, until='2026-01-31', prefix=prefix, chunk_size=15, stdout=StringIO())
+
+        def rows(prefix):
+            return list(
+                Notes.objects.filter(user__username__startswith=f'{prefix}-').order_by('pk')
+                .values_list('user__username', 'title', 'text', 'likes', 'is_public', 'created_at')
+            )
+
+        first, second = rows('a'), rows('b')
+        self.assertEqual(len(first), 40)
+        self.assertEqual([row[1:] for row in first], [row[1:] for row in second])
+        self.assertEqual(NoteRevision.objects.count(), 80)
+        note = Notes.objects.exclude(html_version=markdown.VERSION).first()
+        self.assertEqual(note.excerpt, note.text[:100])
+        user = note.user
+        word = note.title.split()[0]
+        self.assertIn(note.pk, [result['id'] for result in search.search(word, user, limit=100)])
+        # Rendered on first view.
+        self.client.force_login(user)
+        self.assertContains(self.client.get(reverse('notes.detail', args=[note.pk])), note.title)
+
+
+class NotesAdminTestCase(TestCase):
+    def setUp(self):
+        self.admin_user = User.objects.create_superuser('admin', password='pw')
+        self.client.force_login(self.admin_user)
+        for title in ('Groceries', 'Great ideas', 'Books'):
+            Notes.objects.create(user=self.admin_user, title=title, text='x' * 1000)
+
+    def test_changelist(self):
+        year = Notes.objects.values_list('created_at', flat=True).first().year
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('admin:notes_notes_changelist'), {'q': 'gr', 'created_at__year': year})
+        self.assertContains(response, 'Groceries')
+        self.assertContains(response, 'Great ideas')
+        self.assertNotContains(response, 'Books')
+        self.assertFalse(any('"notes_notes"."text"' in query['sql'] for query in queries))
+
+    def test_search_uses_the_title_index(self):
+        model_admin = admin.site._registry[Notes]
+        request = RequestFactory().get('/')
+        request.user = self.admin_user
+        notes, _ = model_admin.get_search_results(request, model_admin.get_queryset(request), 'gro')
+        self.assertEqual([note.title for note in notes], ['Groceries'])
+        self.assertIn('notes_title_nocase_idx', notes.explain())
@@ -0,0 +1,283 @@
+"""
+Streaming export and import of a user's notes.
+
+Exports are generators: notes are read with a server-side iterator and
+every note is serialized and handed on as soon as it is read, so memory
+use does not grow with the number of notes. Two formats are supported:
+
+* ``ndjson``: one JSON object per line.
+* ``zip``: one markdown file per note, with the metadata in a front matter
+  block, written as a zip stream that needs no seeking.
+
+Imports read either format back, insert notes with bulk_create in chunks
+and skip notes the user already has, by content hash. The file is read
+twice: a first pass only validates it, so a record that doesn't parse or
+validate raises InvalidRecord, naming its line or file, before anything is
+written. The second pass renders each chunk's markdown, then writes the
+chunk in a transaction of its own, so the database's write lock is only
+held while rows are inserted.
+"""
+import io
+import json
+import zipfile
+from datetime import datetime
+
+from django.db import connection, transaction
+from django.db.models import Prefetch
+from django.utils import timezone
+from django.utils.text import slugify
+
+from . import markdown, revisions, search
+from .models import EXCERPT_LENGTH, Notes, Tag, hash_content
+from .tagindex import normalize
+
+FORMATS = ('ndjson', 'zip')
+CONTENT_TYPES = {'ndjson': 'application/x-ndjson', 'zip': 'application/zip'}
+# user is loaded too, or the related manager fetches it again for every note.
+FIELDS = ('id', 'user', 'title', 'text', 'is_public', 'created_at', 'updated_at')
+
+
+class InvalidRecord(ValueError):
+    """A record of an import that can't be read; its message says where."""
+
+
+def iter_notes(user, chunk_size=500):
+    notes = user.notes.order_by('pk').only(*FIELDS).prefetch_related(
+        Prefetch('tags', queryset=Tag.objects.only('id', 'name').order_by('name'))
+    )
+    return notes.iterator(chunk_size=chunk_size)
+
+
+def to_record(note):
+    return {
+        'title': note.title,
+        'text': note.text,
+        'is_public': note.is_public,
+        'created_at': note.created_at.isoformat(),
+        'updated_at': note.updated_at.isoformat(),
+        'tags': [tag.name for tag in note.tags.all()],
+    }
+
+
+def export_ndjson(user):
+    for note in iter_notes(user):
+        yield json.dumps(to_record(note), ensure_ascii=False) + '\n'
+
+
+def to_markdown(record):
+    meta = {key: value for key, value in record.items() if key != 'text'}
+    # JSON-encoded values keep titles with colons or newlines unambiguous.
+    front_matter = ''.join(f'{key}: {json.dumps(value, ensure_ascii=False)}\n' for key, value in meta.items())
+    return f'---\n{front_matter}---\n\n{record["text"]}'
+
+
+def from_markdown(content):
+    if not content.startswith('---\n'):
+        return {'title': '', 'text': content}
+    front_matter, _, text = content[4:].partition('\n---\n\n')
+    record = {}
+    for line in front_matter.splitlines():
+        key, _, value = line.partition(': ')
+        record[key] = json.loads(value)
+    record['text'] = text
+    return record
+
+
+class ZipStream(io.RawIOBase):
+    """A write-only, unseekable file whose contents are taken out as they are written."""
+
+    def __init__(self):
+        self.chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def export_zip(user):
+    stream = ZipStream()
+    with zipfile.ZipFile(stream, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        for note in iter_notes(user):
+            name = f'{note.pk}-{slugify(note.title)[:50] or "note"}.md'
+            archive.writestr(name, to_markdown(to_record(note)))
+            yield stream.drain()
+    yield stream.drain()
+
+
+def export(user, format):
+    """Yield the user's notes in ``format``, as str for ndjson and bytes for zip."""
+    if format == 'zip':
+        return export_zip(user)
+    return export_ndjson(user)
+
+
+def reader(file, format):
+    """Return a callable reading the records of ``file`` from its start on each call."""
+    def read():
+        file.seek(0)
+        return read_zip(file) if format == 'zip' else read_ndjson(file)
+    return read
+
+
+def read_ndjson(file):
+    for number, line in enumerate(file, 1):
+        line = line.strip()
+        if line:
+            try:
+                yield clean_record(json.loads(line))
+            except ValueError as e:
+                raise InvalidRecord(f'Line {number}: {e}') from e
+
+
+def read_zip(file):
+    try:
+        archive = zipfile.ZipFile(file)
+    except zipfile.BadZipFile as e:
+        raise InvalidRecord(f'Not a zip file: {e}') from e
+    with archive:
+        for info in archive.infolist():
+            if not info.is_dir() and info.filename.endswith('.md'):
+                try:
+                    yield clean_record(from_markdown(archive.read(info).decode()))
+                except ValueError as e:  # UnicodeDecodeError and JSONDecodeError included.
+                    raise InvalidRecord(f'{info.filename}: {e}') from e
+
+
+def clean_record(record):
+    """Check the types of an exported record's values, filling in the optional ones."""
+    if not isinstance(record, dict):
+        raise ValueError('expected a JSON object.')
+    for key, kind in (('title', str), ('text', str), ('is_public', bool)):
+        if key in record and not isinstance(record[key], kind):
+            raise ValueError(f'"{key}" must be a {kind.__name__}.')
+    tags = record.get('tags', [])
+    if not isinstance(tags, list) or not all(isinstance(name, str) for name in tags):
+        raise ValueError('"tags" must be a list of strings.')
+    max_length = Tag._meta.get_field('name').max_length
+    names = []
+    for name in map(normalize, tags):
+        if len(name) > max_length:
+            raise ValueError(f'Tag "{name}" is too long.')
+        if name and name not in names:
+            names.append(name)
+    cleaned = {
+        'title': record.get('title', '')[:Notes._meta.get_field('title').max_length],
+        'text': record.get('text', ''),
+        'is_public': record.get('is_public', False),
+        'tags': names,
+    }
+    for key in ('created_at', 'updated_at'):
+        try:
+            cleaned[key] = parse_datetime(record.get(key))
+        except (TypeError, ValueError):
+            raise ValueError(f'"{key}" must be an ISO 8601 date and time.')
+    return cleaned
+
+
+def parse_datetime(value):
+    if not value:
+        return None
+    moment = datetime.fromisoformat(value)
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+def restore_dates(notes, dates):
+    created_field = Notes._meta.get_field('created_at')
+    updated_field = Notes._meta.get_field('updated_at')
+    rows = []
+    for note, (created_at, updated_at) in zip(notes, dates):
+        note.created_at, note.updated_at = created_at, updated_at
+        rows.append([
+            created_field.get_db_prep_value(created_at, connection),
+            updated_field.get_db_prep_value(updated_at, connection),
+            note.pk,
+        ])
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f'UPDATE {Notes._meta.db_table} SET created_at = %s, updated_at = %s WHERE id = %s', rows
+        )
+
+
+def tag_notes(user, notes, names, tags):
+    """Tag notes saved by bulk_create; ``tags`` caches the user's Tags by name."""
+    links = []
+    for note, note_names in zip(notes, names):
+        for name in note_names:
+            if name not in tags:
+                tags[name] = Tag.objects.get_or_create(user=user, name=name)[0]
+            links.append(Notes.tags.through(notes_id=note.pk, tag_id=tags[name].pk))
+    Notes.tags.through.objects.bulk_create(links)
+
+
+def import_notes(user, read, chunk_size=1000):
+    """
+    Create notes for ``user`` from the cleaned records ``read()`` yields,
+    skipping any whose title and text the user already has. Returns
+    ``(created, skipped)``. ``read`` is called twice, as the records are all
+    validated before the first is written: nothing is imported if one is
+    invalid (InvalidRecord).
+    """
+    for _ in read():
+        pass
+    created = skipped = 0
+    seen = set()
+    tags = {}
+    chunk = []
+
+    def flush():
+        nonlocal created, skipped
+        with transaction.atomic():
+            existing = set(
+                user.notes.filter(content_hash__in=[note.content_hash for note, _ in chunk])
+                .values_list('content_hash', flat=True)
+            )
+            new = [(note, names) for note, names in chunk if note.content_hash not in existing]
+            notes = [note for note, _ in new]
+            dates = [(note.created_at, note.updated_at) for note in notes]
+            Notes.objects.bulk_create(notes)
+            # bulk_create overwrites auto_now_add and auto_now fields and sends
+            # no signals: restore the dates and do what the signals would.
+            restore_dates(notes, dates)
+            search.index_new_notes(notes)
+            revisions.start_histories(notes)
+            tag_notes(user, notes, [names for _, names in new], tags)
+        skipped += len(chunk) - len(new)
+        created += len(new)
+        chunk.clear()
+
+    for record in read():
+        title, text = record['title'], record['text']
+        content_hash = hash_content(title, text)
+        if content_hash in seen:
+            skipped += 1
+            continue
+        seen.add(content_hash)
+        now = timezone.now()
+        note = Notes(
+            user=user,
+            title=title,
+            text=text,
+            excerpt=text[:EXCERPT_LENGTH],
+            content_hash=content_hash,
+            html=markdown.render_cached(text),
+            html_version=markdown.VERSION,
+            is_public=record['is_public'],
+        )
+        note.created_at = record['created_at'] or now
+        note.updated_at = record['updated_at'] or now
+        chunk.append((note, record['tags']))
+        if len(chunk) >= chunk_size:
+            flush()
+    if chunk:
+        flush()
+    return created, skipped
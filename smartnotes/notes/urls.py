@@ -4,10 +4,19 @@ from . import views
 
 urlpatterns = [
     path('notes/', views.NotesListView.as_view(), name='notes.list'),
+    path('notes/tags/autocomplete/', views.tag_autocomplete_view, name='notes.tag_autocomplete'),
+    path('notes/tags/<str:tag>/', views.NotesListView.as_view(), name='notes.tag'),
     path('notes/<int:pk>/', views.NotesDetailView.as_view(), name='notes.detail'),
     path('notes/<int:pk>/edit', views.NotesUpdateView.as_view(), name='notes.update'),
     path('notes/<int:pk>/delete', views.NotesDeleteView.as_view(), name='notes.delete'),
+    path('notes/<int:pk>/revisions/', views.NoteRevisionsView.as_view(), name='notes.revisions'),
+    path('notes/<int:pk>/revisions/<int:number>/', views.NoteRevisionsView.as_view(), name='notes.revision'),
+    path('notes/public/', views.PublicNotesListView.as_view(), name='notes.public'),
+    path('notes/popular/', views.PopularNotesListView.as_view(), name='notes.popular'),
+    path('notes/export/', views.NotesExportView.as_view(), name='notes.export'),
+    path('notes/search/', views.NotesSearchView.as_view(), name='notes.search'),
     path('notes/new/', views.NotesCreateView.as_view(), name='notes.new'),
     path('notes/<int:pk>/add_like/', views.add_like_view, name='notes.add_like'),
+    path('notes/<int:pk>/events/', views.note_events_view, name='notes.events'),
     path('notes/<int:pk>/change_visibility/', views.change_visibility_view, name='notes.change_visibility'),
 ]
\ No newline at end of file
@@ -1,26 +1,56 @@
+import hashlib
+
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
 from django.shortcuts import render, get_object_or_404
-from django.http import Http404, HttpResponseRedirect
+from django.http import Http404, HttpResponseBadRequest, HttpResponseRedirect, JsonResponse, StreamingHttpResponse
 from django.urls import reverse
-from django.views.generic import ListView, DetailView, CreateView, UpdateView
+from django.views.generic import ListView, DetailView, CreateView, UpdateView, TemplateView, View
 from django.views.generic.edit import DeleteView
 from django.contrib.auth.mixins import LoginRequiredMixin
+from django.db.models import Prefetch
+from django.utils.cache import get_conditional_response, patch_cache_control
+
+from perftools.replicas import replica_reads
 
+from . import caching, events, revisions, tagindex, transfer
 from .forms import NotesForm
-from .models import Notes
+from .leaderboard import leaderboard
+from .likes import like_counter
+from .models import Notes, Tag
+from .pagination import KeysetPaginationMixin
+from . import search
 
 def add_like_view(request, pk):
     if request.method == 'POST':
-        note = get_object_or_404(Notes, pk=pk)
-        note.likes += 1 
-        note.save()
+        likes = Notes.objects.filter(pk=pk).values_list('likes', flat=True).first()
+        if likes is None:
+            raise Http404
+        events.broker.publish(pk, {'likes': likes + like_counter.pending_for(pk) + 1})
+        like_counter.add(pk)  # Written to Notes.likes in batches
         return HttpResponseRedirect(reverse("notes.detail", args=(pk,)))
     raise Http404
 
+async def note_events_view(request, pk):
+    """Stream like and visibility changes of a note as Server-Sent Events."""
+    user = await request.auser()
+    note = await Notes.objects.filter(pk=pk).values('id', 'user_id', 'is_public', 'likes').afirst()
+    if note is None or (not note['is_public'] and note['user_id'] != user.pk):
+        raise Http404
+    note['likes'] += like_counter.pending_for(pk)
+    # Under WSGI an endless stream would hold a worker: end it in time.
+    stream = events.stream if isinstance(request, ASGIRequest) else events.stream_sync
+    response = StreamingHttpResponse(stream(note, user.pk), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # Don't let nginx buffer the stream.
+    return response
+
 def change_visibility_view(request, pk):
     if request.method == 'POST':
-        note = get_object_or_404(Notes, pk=pk)
+        note = get_object_or_404(Notes.objects.only('is_public', 'user'), pk=pk)
         note.is_public = not note.is_public
-        note.save()
+        note.save(update_fields=['is_public', 'updated_at'])
+        events.broker.publish(pk, {'is_public': note.is_public})
         return HttpResponseRedirect(reverse("notes.detail", args=(pk,)))
     raise Http404
 
@@ -33,6 +63,7 @@ class NotesCreateView(CreateView):
         self.object = form.save(commit=False)
         self.object.user = self.request.user
         self.object.save()
+        form.save_m2m()
         return HttpResponseRedirect(self.get_success_url())
 
 class NotesUpdateView(UpdateView):
@@ -40,29 +71,138 @@ class NotesUpdateView(UpdateView):
     success_url = '/smart/notes/'
     form_class = NotesForm
 
+    def form_valid(self, form):
+        # Save only the edited fields so likes flushed meanwhile are kept.
+        self.object = form.save(commit=False)
+        self.object.save(update_fields=['title', 'text', 'updated_at'])
+        form.save_m2m()
+        return HttpResponseRedirect(self.get_success_url())
+
 class NotesDeleteView(DeleteView):
     model = Notes
     success_url = '/smart/notes/'
     template_name = 'notes/notes_delete.html'
     
     def get_queryset(self):
-        return self.request.user.notes.all()
+        return self.request.user.notes.defer('text')
     
-class NotesListView(LoginRequiredMixin, ListView):
+@replica_reads
+class NotesListView(LoginRequiredMixin, KeysetPaginationMixin, ListView):
     model = Notes
     context_object_name = 'notes'
     template_name = 'notes/notes_list.html'
     login_url = '/admin'
+
+    def get_queryset(self):
+        # Only the title and a short excerpt are shown, so never load the full text.
+        # user must be loaded, or the related manager fetches it for every note.
+        notes = self.request.user.notes.only('id', 'user', 'title', 'created_at', 'excerpt')
+        if 'tag' in self.kwargs:
+            notes = notes.filter(tags__name=self.kwargs['tag'])
+        return notes.prefetch_related(Prefetch('tags', queryset=Tag.objects.only('id', 'name')))
+
+    def get_context_data(self, **kwargs):
+        kwargs['tag'] = self.kwargs.get('tag')
+        return super().get_context_data(**kwargs)
     
+def tag_autocomplete_view(request):
+    if not request.user.is_authenticated:
+        raise Http404
+    prefix = request.GET.get('q', '')
+    return JsonResponse({'tags': tagindex.index.complete(request.user.pk, prefix)})
+
+@replica_reads
+class PublicNotesListView(KeysetPaginationMixin, ListView):
+    context_object_name = 'notes'
+    template_name = 'notes/notes_public.html'
+
+    def get_queryset(self):
+        return Notes.objects.filter(is_public=True).only('id', 'title', 'created_at', 'updated_at', 'excerpt')
+
+    def get(self, request, *args, **kwargs):
+        response = super().get(request, *args, **kwargs)
+        # The page is still unrendered here: answer a revalidation with a 304
+        # before spending time on the template.
+        etag = self.get_etag(response.context_data)
+        not_modified = get_conditional_response(request, etag=etag)
+        if not_modified is not None:
+            response = not_modified
+        response['ETag'] = etag
+        if request.user.is_authenticated:
+            # The page shows the reader's own navigation.
+            patch_cache_control(response, private=True, no_cache=True)
+        else:
+            patch_cache_control(response, public=True, max_age=getattr(settings, 'PUBLIC_NOTES_MAX_AGE', 60))
+        return response
+
+    def get_etag(self, context):
+        state = [str(self.request.user.pk), context['next_cursor'] or '']
+        state += [f'{note.pk}:{note.updated_at.isoformat()}' for note in context['notes']]
+        return f'"{hashlib.sha256("|".join(state).encode()).hexdigest()[:32]}"'
+
+@replica_reads
 class NotesDetailView(DetailView):
     model = Notes
     template_name = 'notes/notes_detail.html'
     context_object_name = 'note'
 
+    def get_object(self, queryset=None):
+        # Private notes are only shown to their owner.
+        note = caching.get_note(self.kwargs['pk'], self.request.user)
+        note.likes += like_counter.pending_for(note.pk)
+        return note
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        # Live updates stream for as long as the page is open: ASGI only.
+        context['live_updates'] = isinstance(self.request, ASGIRequest)
+        return context
+
+class NotesSearchView(LoginRequiredMixin, TemplateView):
+    template_name = 'notes/notes_search.html'
+    login_url = '/admin'
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        query = self.request.GET.get('q', '').strip()
+        context['query'] = query
+        context['results'] = search.search(query, self.request.user) if query else []
+        return context
+
+class NoteRevisionsView(LoginRequiredMixin, TemplateView):
+    template_name = 'notes/notes_revisions.html'
+    login_url = '/admin'
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        note = get_object_or_404(self.request.user.notes.only('id', 'user', 'title'), pk=self.kwargs['pk'])
+        context['note'] = note
+        context['revisions'] = note.revisions.order_by('-number').values('number', 'title', 'created_at')
+        if 'number' in self.kwargs:
+            context['revision'] = revisions.get_revision(note.pk, self.kwargs['number'])
+            if context['revision'] is None:
+                raise Http404
+        return context
+
+class NotesExportView(LoginRequiredMixin, View):
+    login_url = '/admin'
+
+    def get(self, request):
+        format = request.GET.get('format', 'ndjson')
+        if format not in transfer.FORMATS:
+            return HttpResponseBadRequest('Unknown export format.')
+        response = StreamingHttpResponse(
+            transfer.export(request.user, format), content_type=transfer.CONTENT_TYPES[format]
+        )
+        response['Content-Disposition'] = f'attachment; filename="notes.{format}"'
+        return response
+
 class PopularNotesListView(ListView):
-    model = Notes
     context_object_name = 'notes'
-    template_name = 'notes/notes_list.html'
-    queryset = Notes.objects.filter(likes__gte=1)
+    template_name = 'notes/notes_popular.html'
+
+    def get_queryset(self):
+        # Served from the in-memory leaderboard, not the notes table.
+        return leaderboard.entries()
     
     
\ No newline at end of file
@@ -2,6 +2,9 @@
 ASGI config for smartnotes project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Serve it with an ASGI server (e.g. ``uvicorn smartnotes.asgi:application``)
+so the live note event streams (notes.events) run as coroutines instead of
+holding a worker thread each.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
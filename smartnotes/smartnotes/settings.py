@@ -10,11 +10,20 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
+import sys
+import tempfile
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
+# Apps shared by the projects in this repository (perftools) live in its root.
+if str(BASE_DIR.parent) not in sys.path:
+    sys.path.append(str(BASE_DIR.parent))
+
+from perftools import sqlite  # noqa: E402
+
 
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/5.2/howto/deployment/checklist/
@@ -41,9 +50,13 @@ INSTALLED_APPS = [
     # apps
     'home',
     'notes',
+    'perftools',
 ]
 
 MIDDLEWARE = [
+    'perftools.metrics.MetricsMiddleware',
+    'perftools.profiling.ProfilingMiddleware',
+    'perftools.replicas.ReplicaMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -79,12 +92,16 @@ WSGI_APPLICATION = 'smartnotes.wsgi.application'
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
 DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
-    }
+    # perftools.sqlite: WAL, immediate transactions, a busy timeout and
+    # connections kept across requests.
+    'default': sqlite.database(BASE_DIR / 'db.sqlite3'),
+    # Read replica for list and detail pages (perftools.replicas), refreshed
+    # from the primary by "manage.py sync_replica --interval 5".
+    'replica': sqlite.database(BASE_DIR / 'db.replica.sqlite3', TEST={'MIRROR': 'default'}),
 }
 
+DATABASE_ROUTERS = ['perftools.replicas.ReplicaRouter']
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -129,6 +146,47 @@ STATICFILES_DIRS = [
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+CACHES = {
+    # Per-process; point this at a shared backend (e.g. Memcached or Redis)
+    # when running several workers so invalidations reach all of them.
+    # perftools.cache backends count hits and misses for the metrics.
+    'default': {
+        'BACKEND': 'perftools.cache.LocMemCache',
+    },
+}
+
+# Seconds a cached note detail lives without being invalidated.
+NOTES_DETAIL_CACHE_TIMEOUT = 300
+
 LOGIN_REDIRECT_URL = '/smart/notes'
 
+# Likes are buffered in memory and written to the database in batches, every
+# LIKES_FLUSH_INTERVAL seconds or once LIKES_FLUSH_THRESHOLD are pending.
+LIKES_FLUSH_INTERVAL = 5
+LIKES_FLUSH_THRESHOLD = 500
+
 LOGOUT_REDIRECT_URL = '/login'
+
+# The popular-notes page ranks the top POPULAR_NOTES_SIZE public notes by
+# likes that lose half their weight every POPULAR_NOTES_HALF_LIFE seconds.
+POPULAR_NOTES_SIZE = 20
+POPULAR_NOTES_HALF_LIFE = 24 * 60 * 60
+POPULAR_NOTES_REFRESH_SECONDS = 30
+
+# Every Nth note revision stores the full text, the others a diff against the
+# previous revision; rebuilding one reads at most N rows.
+NOTES_REVISION_SNAPSHOT_INTERVAL = 10
+
+# Seconds browsers and shared caches may reuse the public notes feed for
+# anonymous readers before revalidating it with its ETag.
+PUBLIC_NOTES_MAX_AGE = 60
+
+# Seconds between keepalive comments on idle note event streams; under WSGI,
+# how long a stream stays open before the browser is told to reconnect.
+NOTES_EVENTS_HEARTBEAT = 15
+
+# Runtime metrics served at /metrics; see perftools.metrics.
+METRICS_DIR = os.path.join(tempfile.gettempdir(), 'smartnotes-metrics')
+
+# Cold start budget in ms for the importtime command; see perftools.coldstart.
+COLD_START_BUDGET_MS = 1000